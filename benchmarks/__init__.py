@@ -0,0 +1,13 @@
+"""
+离线性能基准测试喵～ ⏱️
+用假的 AstrBot 事件、OneBot 客户端和本地媒体服务器回放合成的群聊流量，
+测量监听、序列化、转发和发送各阶段的延迟、吞吐量和内存分配！
+
+用法（在插件目录下运行，需要已安装 AstrBot）:
+    python -m benchmarks
+    python -m benchmarks --messages 500 --save baseline.json
+    python -m benchmarks --baseline baseline.json --tolerance 0.3
+
+Note:
+    整个过程不访问外部网络，图片和表情都来自本地 HTTP 服务器喵～ 🏠
+"""
@@ -0,0 +1,84 @@
+"""
+基准测试命令行入口喵～ 🚀
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from .runner import BenchmarkRunner, compare_with_baseline, format_report
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    解析参数并运行基准测试喵～ ⏱️
+
+    Args:
+        argv: 命令行参数，为None时使用 sys.argv 喵
+
+    Returns:
+        进程退出码，发现回归时为1喵
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="TurnRig 离线性能基准测试"
+    )
+    parser.add_argument("--messages", type=int, default=200, help="每个阶段的消息数")
+    parser.add_argument("--batch-size", type=int, default=20, help="每批转发的消息数")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="模拟的 OneBot 调用延迟（秒）"
+    )
+    parser.add_argument(
+        "--alloc-samples", type=int, default=50, help="统计内存分配的样本数，0 表示跳过"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="流量生成的随机种子")
+    parser.add_argument(
+        "--stages",
+        default=",".join(BenchmarkRunner.STAGES),
+        help=f"要运行的阶段，逗号分隔（{','.join(BenchmarkRunner.STAGES)}）",
+    )
+    parser.add_argument("--save", help="把结果保存为 JSON，作为以后对比的基线")
+    parser.add_argument("--baseline", help="与之前保存的基线 JSON 对比")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="允许的 p95 和分配增幅"
+    )
+    parser.add_argument("--log-level", default="ERROR", help="插件日志级别")
+    args = parser.parse_args(argv)
+
+    stages = tuple(s.strip() for s in args.stages.split(",") if s.strip())
+    unknown = [s for s in stages if s not in BenchmarkRunner.STAGES]
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(unknown)}")
+
+    logging.getLogger("astrbot").setLevel(args.log_level.upper())
+
+    runner = BenchmarkRunner(
+        messages=args.messages,
+        batch_size=args.batch_size,
+        latency=args.latency,
+        alloc_samples=args.alloc_samples,
+        seed=args.seed,
+        stages=stages,
+    )
+    summaries = asyncio.run(runner.run())
+    print(format_report(summaries))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.save}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(summaries, args.baseline, args.tolerance)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项性能回归（容差 {args.tolerance:.0%}）:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\n与基线 {args.baseline} 相比没有超过 {args.tolerance:.0%} 的回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
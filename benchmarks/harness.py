@@ -0,0 +1,398 @@
+"""
+基准测试用的假 AstrBot / OneBot 环境喵～ 🧪
+提供事件、消息对象、OneBot 客户端、平台上下文、本地媒体服务器和精简的插件实例！
+"""
+
+import asyncio
+import importlib
+import itertools
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+# 插件目录本身就是一个包，基准测试按包名导入插件模块喵～ 📦
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+
+# 本地媒体服务器不能走代理喵～ 🏠
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+os.environ.setdefault("no_proxy", "127.0.0.1,localhost")
+
+
+def load_plugin_module(name: str):
+    """
+    按模块路径导入插件模块喵～ 📦
+
+    Args:
+        name: 相对插件根目录的模块路径，例如 messaging.forward_manager 喵
+
+    Returns:
+        导入的模块喵
+    """
+    parent = str(PLUGIN_DIR.parent)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    return importlib.import_module(f"{PLUGIN_DIR.name}.{name}")
+
+
+def make_png(width: int = 64, height: int = 64, seed: int = 0) -> bytes:
+    """
+    生成一张不可压缩的灰度 PNG 图片喵～ 🖼️
+
+    Args:
+        width: 宽度喵
+        height: 高度喵
+        seed: 随机种子，不同种子得到不同内容喵
+
+    Returns:
+        PNG 文件内容喵
+    """
+    rng = random.Random(seed)
+    raw = b"".join(
+        b"\x00" + bytes(rng.getrandbits(8) for _ in range(width)) for _ in range(height)
+    )
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 0))
+        + chunk(b"IEND", b"")
+    )
+
+
+# 1x1 的透明 GIF，用作特殊表情喵～ 😸
+GIF_BYTES = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01"
+    b"\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+
+class MediaServer:
+    """
+    本地 HTTP 媒体服务器喵～ 🏠
+    在后台线程里提供 /img/<n>.png 和 /gif/<n>.gif，代替 QQ 的图片 CDN！
+
+    Note:
+        作为上下文管理器使用，退出时自动关闭喵～ 🔚
+    """
+
+    def __init__(self, image_size: int = 64, variants: int = 16):
+        """
+        初始化媒体服务器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            image_size: 图片边长（像素）喵
+            variants: 不同内容的图片数量喵
+        """
+        self.images = [
+            make_png(image_size, image_size, seed) for seed in range(variants)
+        ]
+        self.hits = 0
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def image_url(self, index: int) -> str:
+        return f"{self.base_url}/img/{index % len(self.images)}.png"
+
+    def gif_url(self, index: int) -> str:
+        return f"{self.base_url}/gif/{index}.gif"
+
+    def __enter__(self) -> "MediaServer":
+        media = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                media.hits += 1
+                name = self.path.rsplit("/", 1)[-1].split(".", 1)[0]
+                if self.path.startswith("/img/") and name.isdigit():
+                    body, content_type = media.images[int(name)], "image/png"
+                elif self.path.startswith("/gif/"):
+                    body, content_type = GIF_BYTES, "image/gif"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeOneBotClient:
+    """
+    假的 OneBot 客户端喵～ 🤖
+    记录每个 call_action 的调用次数，可以模拟网络延迟和随机失败！
+    """
+
+    def __init__(
+        self,
+        self_id: str = "10000",
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        forward_nodes=None,
+        seed: int = 0,
+    ):
+        """
+        初始化假客户端喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            self_id: 机器人QQ号喵
+            latency: 每次调用的模拟延迟（秒）喵
+            fail_rate: 发送类调用的失败概率喵
+            forward_nodes: get_forward_msg 返回的节点，参数是转发ID喵
+            seed: 随机种子喵
+        """
+        self.self_id = self_id
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.forward_nodes = forward_nodes or (lambda forward_id: [])
+        self.calls: dict[str, int] = {}
+        self._message_ids = itertools.count(1)
+        self._rng = random.Random(seed)
+
+    @property
+    def api(self) -> "FakeOneBotClient":
+        # 真实的 CQHttp 通过 bot.api.call_action 调用喵～
+        return self
+
+    async def call_action(self, action: str, **params):
+        self.calls[action] = self.calls.get(action, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if action.startswith("send_"):
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                raise RuntimeError(f"simulated {action} failure")
+            return {"message_id": next(self._message_ids)}
+        if action.startswith("upload_"):
+            return {"data": {"file": f"bench_{next(self._message_ids)}"}}
+        if action == "get_forward_msg":
+            return {"messages": self.forward_nodes(params.get("id", ""))}
+        if action == "get_msg":
+            return {
+                "message_id": params.get("message_id"),
+                "message": [{"type": "text", "data": {"text": "被引用的消息"}}],
+            }
+        if action in ("get_group_member_info", "get_stranger_info"):
+            user_id = params.get("user_id")
+            return {"user_id": user_id, "nickname": f"用户{user_id}", "card": ""}
+        if action == "get_login_info":
+            return {"user_id": self.self_id, "nickname": "bench"}
+        return {}
+
+    @property
+    def sent_count(self) -> int:
+        return sum(
+            count for action, count in self.calls.items() if action.startswith("send_")
+        )
+
+
+class FakePlatform:
+    """假的 aiocqhttp 平台实例喵～ 🔌"""
+
+    def __init__(self, client: FakeOneBotClient):
+        self.client = client
+
+    def get_client(self):
+        return self.client
+
+    def meta(self):
+        return SimpleNamespace(name="aiocqhttp", id="aiocqhttp")
+
+
+class FakeContext:
+    """
+    假的 AstrBot 上下文喵～ 🌐
+    只提供插件用到的 get_platform 和 send_message！
+    """
+
+    def __init__(self, client: FakeOneBotClient):
+        self.client = client
+        self.platform = FakePlatform(client)
+        self.sent_messages = 0
+
+    def get_platform(self, platform_name: str):
+        return self.platform if platform_name == "aiocqhttp" else None
+
+    async def send_message(self, session, message_chain):
+        if self.client.latency:
+            await asyncio.sleep(self.client.latency)
+        self.sent_messages += 1
+        return True
+
+
+class FakeMessageObj:
+    """
+    假的 AstrBotMessage 喵～ 📨
+    raw_message 是 OneBot 的原始事件字典，message 是原始消息段列表！
+    """
+
+    def __init__(
+        self, message_id, self_id, group_id, user_id, nickname, segments, text
+    ):
+        self.message_id = message_id
+        self.self_id = self_id
+        self.group_id = group_id
+        self.sender = SimpleNamespace(user_id=user_id, nickname=nickname)
+        self.message = segments
+        self.message_str = text
+        self.raw_message = {
+            "post_type": "message",
+            "message_type": "group",
+            "sub_type": "normal",
+            "message_id": message_id,
+            "group_id": int(group_id),
+            "user_id": int(user_id),
+            "self_id": int(self_id),
+            "message": segments,
+            "raw_message": text,
+            "sender": {"user_id": int(user_id), "nickname": nickname},
+        }
+
+    @classmethod
+    def from_raw(cls, raw: dict, message_str: str = "") -> "FakeMessageObj":
+        """
+        用录制下来的 OneBot 原始事件还原消息对象喵～ 📼
+
+        Args:
+            raw: OneBot 原始事件字典喵
+            message_str: 消息纯文本喵
+
+        Returns:
+            消息对象喵
+        """
+        message_obj = cls.__new__(cls)
+        sender = raw.get("sender") or {}
+        message_obj.message_id = str(raw.get("message_id", ""))
+        message_obj.self_id = str(raw.get("self_id", ""))
+        message_obj.group_id = str(raw.get("group_id", "") or "")
+        message_obj.sender = SimpleNamespace(
+            user_id=str(raw.get("user_id", sender.get("user_id", ""))),
+            nickname=sender.get("card") or sender.get("nickname", ""),
+        )
+        message_obj.message = raw.get("message", [])
+        message_obj.message_str = message_str
+        message_obj.raw_message = raw
+        return message_obj
+
+
+class FakeEvent:
+    """
+    假的 AstrMessageEvent 喵～ 🎭
+    实现了监听器和序列化器会调用的方法！
+    """
+
+    def __init__(
+        self,
+        message_obj: FakeMessageObj,
+        components: list,
+        client,
+        session: str | None = None,
+        message_type: str = "GROUP_MESSAGE",
+    ):
+        self.message_obj = message_obj
+        self.message_str = message_obj.message_str
+        self.unified_msg_origin = (
+            session or f"aiocqhttp:GroupMessage:{message_obj.group_id}"
+        )
+        self.bot = client
+        self._components = components
+        self._message_type = message_type
+
+    def get_messages(self) -> list:
+        # 监听器可能会往列表里追加组件，每次都给一个新列表喵～
+        return list(self._components)
+
+    def get_sender_name(self) -> str:
+        return self.message_obj.sender.nickname
+
+    def get_sender_id(self) -> str:
+        return str(self.message_obj.sender.user_id)
+
+    def get_group_id(self) -> str:
+        return str(self.message_obj.group_id)
+
+    def get_platform_name(self) -> str:
+        return "aiocqhttp"
+
+    def get_message_type(self):
+        return SimpleNamespace(name=self._message_type)
+
+
+class BenchPlugin:
+    """
+    基准测试用的精简插件实例喵～ 🐾
+    和 TurnRigPlugin 一样提供配置、缓存和平台解析，但数据写到临时目录！
+    """
+
+    def __init__(self, context: FakeContext, config: dict):
+        """
+        初始化精简插件喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            context: 假的 AstrBot 上下文喵
+            config: 插件配置喵
+        """
+        config_manager_module = load_plugin_module("config.config_manager")
+        resolver_module = load_plugin_module("utils.platform_resolver")
+        tracker_module = load_plugin_module("messaging.activity_tracker")
+        registry_module = load_plugin_module("config.task_registry")
+        state_module = load_plugin_module("config.runtime_state")
+
+        self._tmp = tempfile.TemporaryDirectory(prefix="turnrig_bench_")
+        self.data_dir = self._tmp.name
+        self.temp_dir = os.path.join(self.data_dir, "temp")
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        self.context = context
+        self.config = config
+        self.config_manager = config_manager_module.ConfigManager(self.data_dir)
+        self.platform_resolver = resolver_module.PlatformResolver(context)
+        self.activity_tracker = tracker_module.ActivityTracker()
+        self.task_registry = registry_module.TaskRegistry(config)
+        self.runtime_state = state_module.RuntimeState(self.data_dir)
+        self.message_cache = {}
+        self.forward_manager = None
+
+    def get_task_by_id(self, task_id):
+        return self.task_registry.get(task_id)
+
+    def get_all_enabled_tasks(self):
+        return self.task_registry.enabled()
+
+    def save_message_cache(self):
+        self.config_manager.save_message_cache(self.message_cache, self.config)
+
+    def save_config_file(self):
+        self.config_manager.save_config(self.config)
+
+    def cleanup(self):
+        self._tmp.cleanup()
@@ -0,0 +1,369 @@
+"""
+回放 /turnrig capture 录制的消息流量喵～ 📼
+把录制文件里的事件按原速或加速喂给监听器和转发流水线，目标是假的 OneBot 客户端！
+
+用法（在插件目录下运行，需要已安装 AstrBot）:
+    python -m benchmarks.replay data/plugins_data/astrbot_plugin_turnrig/captures/trace_xxx.jsonl.gz
+    python -m benchmarks.replay trace.jsonl.gz --speed 10 --threshold 50 --task-copies 5
+    python -m benchmarks.replay trace.jsonl.gz --config config.json --send-single-messages
+
+Note:
+    媒体地址都会改写到本地媒体服务器，表情是 GIF，其他媒体一律是 PNG 图片喵～ 🏠
+    录制文件里没有合并转发的内容，get_forward_msg 返回的是合成的嵌套节点喵！
+"""
+
+import argparse
+import asyncio
+import copy
+import gzip
+import json
+import logging
+import sys
+import time
+import zlib
+from typing import Any
+
+from astrbot.api import message_components as Comp
+
+from .harness import FakeEvent, FakeMessageObj, MediaServer
+from .runner import (
+    TARGET_SESSION,
+    StageResult,
+    close_plugin,
+    drain_pipeline,
+    format_report,
+    make_config,
+    make_plugin,
+    measure,
+)
+from .traffic import TrafficGenerator
+
+# 支持的录制文件格式版本喵～ 🏷️
+SUPPORTED_VERSIONS = (1,)
+
+_REMOTE_PREFIXES = ("http://", "https://", "anon://")
+
+
+def load_trace(path: str) -> tuple[dict, list[dict]]:
+    """
+    读取录制文件喵～ 📖
+
+    Args:
+        path: 录制文件路径，.gz 结尾时按 gzip 读取喵
+
+    Returns:
+        (文件头, 事件列表) 喵
+
+    Raises:
+        ValueError: 文件格式版本不支持时喵
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    header: dict = {}
+    events: list[dict] = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 录制中途被强行中断时最后一行可能不完整喵～ ✂️
+                break
+            if record.get("kind") == "header":
+                header = record
+            elif record.get("kind") == "event":
+                events.append(record)
+
+    version = header.get("version", 1)
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"不支持的录制文件版本: {version}")
+    return header, events
+
+
+def localize_media(value: Any, media: MediaServer, kind: str = "") -> Any:
+    """
+    把媒体地址改写成本地媒体服务器的地址喵～ 🏠
+
+    Args:
+        value: 录制的原始事件或组件喵
+        media: 本地媒体服务器喵
+        kind: 外层的消息段或组件类型喵
+
+    Returns:
+        改写后的副本喵
+    """
+    if isinstance(value, list):
+        return [localize_media(item, media, kind) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    kind = str(value.get("type", kind)).lower()
+    is_emoji = kind == "mface" or "emoji_id" in value
+    localized = {}
+    for key, item in value.items():
+        if (
+            key in ("url", "file")
+            and isinstance(item, str)
+            and item.startswith(_REMOTE_PREFIXES)
+        ):
+            index = zlib.crc32(item.encode("utf-8"))
+            localized[key] = (
+                media.gif_url(index) if is_emoji else media.image_url(index)
+            )
+        else:
+            localized[key] = localize_media(item, media, kind)
+    return localized
+
+
+def decode_component(encoded: dict):
+    """
+    把录制的 {"type": 类名, "data": 属性} 还原成 AstrBot 消息组件喵～ 🧩
+
+    Args:
+        encoded: 录制的组件喵
+
+    Returns:
+        消息组件，无法还原时返回纯文本占位喵
+    """
+    name = encoded.get("type", "")
+    data = {
+        key: (
+            [decode_component(item) for item in value]
+            if isinstance(value, list)
+            and value
+            and all(isinstance(item, dict) and "type" in item for item in value)
+            else value
+        )
+        for key, value in (encoded.get("data") or {}).items()
+    }
+    component_cls = getattr(Comp, name, None)
+    if isinstance(component_cls, type) and issubclass(
+        component_cls, Comp.BaseMessageComponent
+    ):
+        try:
+            return component_cls(**data)
+        except Exception:
+            pass
+    return Comp.Plain(text=str(data.get("text") or f"[{name}]"))
+
+
+def build_event(record: dict, media: MediaServer, client) -> FakeEvent | None:
+    """
+    用一条录制事件构造假的消息事件喵～ 🎭
+
+    Args:
+        record: 录制事件喵
+        media: 本地媒体服务器喵
+        client: 假的 OneBot 客户端喵
+
+    Returns:
+        消息事件，录制里没有原始数据时返回None喵
+    """
+    raw = record.get("raw")
+    if not isinstance(raw, dict):
+        return None
+    raw = localize_media(raw, media)
+    components = [
+        decode_component(encoded)
+        for encoded in localize_media(record.get("components", []), media)
+    ]
+    message_obj = FakeMessageObj.from_raw(raw, record.get("message_str", ""))
+    return FakeEvent(
+        message_obj,
+        components,
+        client,
+        session=record.get("session") or None,
+        message_type=record.get("message_type", "GROUP_MESSAGE"),
+    )
+
+
+def build_config(
+    events: list[dict],
+    config_path: str | None = None,
+    threshold: int | None = None,
+    task_copies: int = 1,
+    send_single_messages: bool | None = None,
+) -> dict:
+    """
+    生成回放用的插件配置喵～ ⚙️
+
+    Args:
+        events: 录制事件喵
+        config_path: 插件的 config.json，为None时监听录制里出现的所有会话喵
+        threshold: 覆盖所有任务的转发阈值喵
+        task_copies: 每个任务复制的份数，用来测试任务数量的影响喵
+        send_single_messages: 覆盖单条发送开关喵
+
+    Returns:
+        配置字典喵
+    """
+    if config_path:
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        # 去掉运行时状态，只保留任务定义和全局开关喵～ 🧹
+        config = {
+            key: value
+            for key, value in config.items()
+            if not key.startswith(("processed_message_ids_", "img_cache_"))
+        }
+    else:
+        groups, users = set(), set()
+        for record in events:
+            raw = record.get("raw") or {}
+            if record.get("message_type") == "GROUP_MESSAGE" and raw.get("group_id"):
+                groups.add(str(raw["group_id"]))
+            elif raw.get("user_id"):
+                users.add(str(raw["user_id"]))
+        config = make_config(threshold or 20, sorted(groups), sorted(users))
+
+    for task in config.get("tasks", []):
+        # 没有转发目标的任务不会转发，统一发到假目标喵～ 🎯
+        if not task.get("target_sessions"):
+            task["target_sessions"] = [TARGET_SESSION]
+        if threshold:
+            task["max_messages"] = threshold
+    if threshold:
+        config["default_max_messages"] = threshold
+
+    if task_copies > 1:
+        copies = []
+        for task in config.get("tasks", []):
+            for i in range(1, task_copies):
+                clone = copy.deepcopy(task)
+                clone["id"] = f"{task.get('id')}_{i}"
+                clone["name"] = f"{task.get('name', '')} #{i}"
+                copies.append(clone)
+        config["tasks"] = config.get("tasks", []) + copies
+
+    if send_single_messages is not None:
+        config["send_single_messages"] = send_single_messages
+    config.setdefault("bot_self_ids", [])
+    return config
+
+
+async def replay(
+    events: list[dict],
+    config: dict,
+    speed: float = 0.0,
+    latency: float = 0.0,
+    seed: int = 0,
+) -> dict[str, dict]:
+    """
+    回放录制事件并测量监听和转发流水线喵～ 🔁
+
+    Args:
+        events: 录制事件喵
+        config: 插件配置喵
+        speed: 回放倍速，1 为原速，0 表示不等待喵
+        latency: 假 OneBot 客户端每次调用的延迟（秒）喵
+        seed: 随机种子喵
+
+    Returns:
+        {"replay": 汇总结果} 喵
+    """
+    result = StageResult("replay")
+    with MediaServer() as media:
+        plugin, client = make_plugin(config, latency=latency, seed=seed)
+        # 合并转发的内容没有录制下来，用合成的嵌套节点代替喵～ 📨
+        TrafficGenerator(media, client, [], seed=seed)
+
+        pairs = [
+            (record.get("t", 0.0), event)
+            for record in events
+            if (event := build_event(record, media, client)) is not None
+        ]
+        first = pairs[0][0] if pairs else 0.0
+        started = time.perf_counter()
+
+        async def setup(pair):
+            recorded_at, event = pair
+            if speed > 0:
+                delay = started + (recorded_at - first) / speed - time.perf_counter()
+                await asyncio.sleep(max(0.0, delay))
+            else:
+                # 不等待时也让出事件循环，转发和发送能和消息到达交替进行喵～ 🔀
+                await asyncio.sleep(0)
+            return event
+
+        try:
+            await measure(
+                result, pairs, plugin.message_listener.on_all_message, setup=setup
+            )
+            await drain_pipeline(plugin, client, media, result, started)
+            result.extra["tasks"] = len(config.get("tasks", []))
+            result.extra["trace_seconds"] = (
+                round(pairs[-1][0] - first, 1) if pairs else 0
+            )
+            result.extra["send_single"] = bool(config.get("send_single_messages"))
+        finally:
+            await close_plugin(plugin)
+    return {"replay": result.summary()}
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    解析参数并回放录制文件喵～ 🚀
+
+    Args:
+        argv: 命令行参数，为None时使用 sys.argv 喵
+
+    Returns:
+        进程退出码喵
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.replay", description="回放 TurnRig 录制的消息流量"
+    )
+    parser.add_argument("trace", help="/turnrig capture 录制的 .jsonl.gz 文件")
+    parser.add_argument(
+        "--speed", type=float, default=0.0, help="回放倍速，1 为原速，0 表示不等待"
+    )
+    parser.add_argument("--config", help="使用插件的 config.json 里的任务")
+    parser.add_argument("--threshold", type=int, help="覆盖所有任务的转发阈值")
+    parser.add_argument("--task-copies", type=int, default=1, help="每个任务复制的份数")
+    parser.add_argument(
+        "--send-single-messages",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="覆盖单条发送开关",
+    )
+    parser.add_argument("--limit", type=int, help="只回放前 N 条事件")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="模拟的 OneBot 调用延迟（秒）"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--save", help="把结果保存为 JSON")
+    parser.add_argument("--log-level", default="ERROR", help="插件日志级别")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("astrbot").setLevel(args.log_level.upper())
+
+    header, events = load_trace(args.trace)
+    if args.limit:
+        events = events[: args.limit]
+    config = build_config(
+        events,
+        config_path=args.config,
+        threshold=args.threshold,
+        task_copies=max(1, args.task_copies),
+        send_single_messages=args.send_single_messages,
+    )
+    print(
+        f"回放 {len(events)} 条事件（匿名化: {header.get('anonymized', False)}，"
+        f"倍速: {args.speed or '不等待'}）"
+    )
+
+    summaries = asyncio.run(
+        replay(events, config, speed=args.speed, latency=args.latency, seed=args.seed)
+    )
+    print(format_report(summaries))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+"""
+基准测试的各个阶段和结果统计喵～ 📊
+每个阶段先跑一遍计时，再用 tracemalloc 跑一遍统计内存分配！
+"""
+
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from .harness import (
+    BenchPlugin,
+    FakeContext,
+    FakeOneBotClient,
+    MediaServer,
+    load_plugin_module,
+    make_png,
+)
+from .traffic import TrafficGenerator
+
+SOURCE_GROUPS = ["100001", "100002", "100003", "100004"]
+TARGET_SESSION = "aiocqhttp:GroupMessage:200001"
+
+
+@dataclass
+class StageResult:
+    """
+    一个阶段的测量结果喵～ 📋
+    """
+
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    total_seconds: float = 0.0
+    alloc_bytes: list[int] = field(default_factory=list)
+    peak_bytes: list[int] = field(default_factory=list)
+    extra: dict = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        """
+        汇总成可以保存和对比的字典喵～ 📊
+
+        Returns:
+            包含次数、延迟分位数、吞吐量和内存分配的字典喵
+        """
+        ops = len(self.latencies)
+        ordered = sorted(self.latencies)
+
+        def percentile(q: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(ops - 1, int(q * ops))] * 1000
+
+        return {
+            "ops": ops,
+            "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "ops_per_s": ops / self.total_seconds if self.total_seconds else 0.0,
+            "alloc_kb": (
+                statistics.fmean(self.alloc_bytes) / 1024 if self.alloc_bytes else 0.0
+            ),
+            "peak_kb": (
+                statistics.fmean(self.peak_bytes) / 1024 if self.peak_bytes else 0.0
+            ),
+            **self.extra,
+        }
+
+
+async def measure(
+    result: StageResult,
+    items: list,
+    run: Callable[..., Awaitable],
+    setup: Callable | None = None,
+    traced: bool = False,
+):
+    """
+    逐个执行并记录耗时（或内存分配）喵～ ⏱️
+
+    Args:
+        result: 写入结果的对象喵
+        items: 每次调用的输入喵
+        run: 被测的异步函数，参数是 setup 的返回值（或输入本身）喵
+        setup: 不计入耗时的准备函数喵
+        traced: 为True时统计内存分配，否则统计耗时喵
+    """
+    started = time.perf_counter()
+    for item in items:
+        arg = await setup(item) if setup else item
+        if traced:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await run(arg)
+            current, peak = tracemalloc.get_traced_memory()
+            result.alloc_bytes.append(current - before)
+            result.peak_bytes.append(peak - before)
+        else:
+            t0 = time.perf_counter()
+            await run(arg)
+            result.latencies.append(time.perf_counter() - t0)
+    if not traced:
+        result.total_seconds = time.perf_counter() - started
+
+
+def make_config(
+    max_messages: int,
+    groups: list[str] = SOURCE_GROUPS,
+    private_users: list[str] | None = None,
+) -> dict:
+    """
+    生成基准测试用的插件配置喵～ ⚙️
+
+    Args:
+        max_messages: 转发阈值喵
+        groups: 监听的群号喵
+        private_users: 监听的私聊QQ号喵
+
+    Returns:
+        配置字典喵
+    """
+    return {
+        "tasks": [
+            {
+                "id": "1",
+                "name": "bench",
+                "enabled": True,
+                "monitor_groups": list(groups),
+                "monitor_private_users": list(private_users or []),
+                "monitored_users_in_groups": {},
+                "target_sessions": [TARGET_SESSION],
+                "max_messages": max_messages,
+            }
+        ],
+        "default_max_messages": max_messages,
+        "bot_self_ids": [],
+        "send_rate_per_second": 0,
+        "retry_base_delay": 3600,
+    }
+
+
+def make_plugin(
+    config: dict, latency: float = 0.0, seed: int = 0, with_forwarding: bool = True
+):
+    """
+    创建带监听器（和转发管理器）的精简插件喵～ 🐾
+
+    Args:
+        config: 插件配置喵
+        latency: 假 OneBot 客户端每次调用的延迟（秒）喵
+        seed: 随机种子喵
+        with_forwarding: 是否创建转发管理器喵
+
+    Returns:
+        (插件, 假客户端) 喵
+    """
+    client = FakeOneBotClient(latency=latency, seed=seed)
+    plugin = BenchPlugin(FakeContext(client), config)
+    listener_module = load_plugin_module("messaging.message_listener")
+    plugin.message_listener = listener_module.MessageListener(plugin)
+    if with_forwarding:
+        forward_module = load_plugin_module("messaging.forward_manager")
+        plugin.forward_manager = forward_module.ForwardManager(plugin)
+    return plugin, client
+
+
+async def close_plugin(plugin):
+    """停止转发管理器的后台任务并删除临时目录喵～ 🔚"""
+    forward_manager = plugin.forward_manager
+    if forward_manager is not None:
+        forward_manager.stop()
+        forward_manager.retry_manager.stop()
+        await forward_manager.send_queue.close()
+    plugin.cleanup()
+
+
+async def drain_pipeline(
+    plugin, client, media, result: StageResult, started: float, timeout: float = 60
+):
+    """
+    等待转发请求和发送队列处理完，记录流水线的统计信息喵～ ⏳
+
+    Args:
+        plugin: 精简插件喵
+        client: 假 OneBot 客户端喵
+        media: 本地媒体服务器喵
+        result: 写入结果的对象喵
+        started: 开始回放时的 perf_counter 喵
+        timeout: 最长等待秒数喵
+    """
+    forward_manager = plugin.forward_manager
+
+    def drained() -> bool:
+        return (
+            not forward_manager._pending_forward_requests
+            and not forward_manager._forward_workers
+            and not forward_manager._processing_forwards
+            and forward_manager.send_queue.pending_count() == 0
+        )
+
+    deadline = time.perf_counter() + timeout
+    while not drained() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    result.total_seconds = time.perf_counter() - started
+    result.extra["drained"] = drained()
+    result.extra["batches_sent"] = client.sent_count
+    result.extra["messages_left"] = sum(
+        len(cache)
+        for sessions in plugin.message_cache.values()
+        for cache in sessions.values()
+    )
+    result.extra["media_requests"] = media.hits
+
+
+class BenchmarkRunner:
+    """
+    基准测试运行器喵～ 🏃
+    依次测量 serialize、listener、forward、send 四个阶段，再跑一遍完整流水线，
+    最后对比两种消息缓存文件格式的保存、加载耗时和磁盘占用！ ฅ(^•ω•^ฅ
+    """
+
+    STAGES = (
+        "serialize",
+        "listener",
+        "forward",
+        "send",
+        "pipeline",
+        "cache_json",
+        "cache_bin",
+    )
+
+    def __init__(
+        self,
+        messages: int = 200,
+        batch_size: int = 20,
+        latency: float = 0.0,
+        alloc_samples: int = 50,
+        seed: int = 0,
+        stages: tuple[str, ...] = STAGES,
+    ):
+        """
+        初始化运行器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            messages: 每个阶段回放的消息数量喵
+            batch_size: 每批转发的消息数量喵
+            latency: 假 OneBot 客户端每次调用的延迟（秒）喵
+            alloc_samples: 统计内存分配时使用的样本数量喵
+            seed: 随机种子喵
+            stages: 要运行的阶段喵
+        """
+        self.messages = messages
+        self.batch_size = max(1, batch_size)
+        self.latency = latency
+        self.alloc_samples = alloc_samples
+        self.seed = seed
+        self.stages = stages
+
+        self.serializer = load_plugin_module("messaging.message_serializer")
+
+    def _make_plugin(self, max_messages: int, with_forwarding: bool):
+        return make_plugin(
+            make_config(max_messages),
+            latency=self.latency,
+            seed=self.seed,
+            with_forwarding=with_forwarding,
+        )
+
+    async def _close_plugin(self, plugin):
+        await close_plugin(plugin)
+
+    async def run(self) -> dict[str, dict]:
+        """
+        运行所有选中的阶段喵～ 🚀
+
+        Returns:
+            {阶段名: 汇总结果} 喵
+        """
+        results: dict[str, StageResult] = {}
+        with MediaServer() as media:
+            for stage in self.stages:
+                result = StageResult(stage)
+                await getattr(self, f"_stage_{stage}")(media, result, traced=False)
+                if self.alloc_samples and stage != "pipeline":
+                    tracemalloc.start()
+                    try:
+                        await getattr(self, f"_stage_{stage}")(
+                            media, result, traced=True
+                        )
+                    finally:
+                        tracemalloc.stop()
+                results[stage] = result
+        return {name: result.summary() for name, result in results.items()}
+
+    def _count(self, traced: bool) -> int:
+        return min(self.messages, self.alloc_samples) if traced else self.messages
+
+    async def _stage_serialize(self, media, result: StageResult, traced: bool):
+        """序列化消息组件（含嵌套转发的 get_forward_msg）喵～ 📦"""
+        client = FakeOneBotClient(latency=self.latency, seed=self.seed)
+        traffic = TrafficGenerator(media, client, SOURCE_GROUPS, seed=self.seed)
+        events = [event for _, event in traffic.events(self._count(traced))]
+
+        async def run(event):
+            await self.serializer.async_serialize_message(event.get_messages(), event)
+
+        await measure(result, events, run, traced=traced)
+
+    async def _fill_cache(self, media, count: int):
+        """
+        用监听器把合成消息写进缓存，返回插件和按批次切好的消息喵～ 📥
+        """
+        plugin, client = self._make_plugin(10**9, with_forwarding=False)
+        traffic = TrafficGenerator(media, client, SOURCE_GROUPS, seed=self.seed)
+        for _, event in traffic.events(count):
+            await plugin.message_listener.on_all_message(event)
+        messages = [
+            message
+            for sessions in plugin.message_cache.values()
+            for cache in sessions.values()
+            for message in cache
+        ]
+        batches = [
+            messages[i : i + self.batch_size]
+            for i in range(0, len(messages), self.batch_size)
+        ]
+        return plugin, batches
+
+    async def _stage_listener(self, media, result: StageResult, traced: bool):
+        """监听器处理一条消息（筛选、序列化、缓存、保存）喵～ 👂"""
+        plugin, client = self._make_plugin(10**9, with_forwarding=False)
+        traffic = TrafficGenerator(media, client, SOURCE_GROUPS, seed=self.seed)
+        events = [event for _, event in traffic.events(self._count(traced))]
+        try:
+            await measure(
+                result, events, plugin.message_listener.on_all_message, traced=traced
+            )
+        finally:
+            await self._close_plugin(plugin)
+
+    async def _stage_forward(self, media, result: StageResult, traced: bool):
+        """构建转发节点并写入发送队列（不投递）喵～ 📬"""
+        source, batches = await self._fill_cache(media, self._count(traced))
+        await self._close_plugin(source)
+
+        plugin, _ = self._make_plugin(self.batch_size, with_forwarding=True)
+        forward_manager = plugin.forward_manager
+        session_cache = load_plugin_module("messaging.session_cache")
+
+        # 只测构建和入队，投递回调直接确认喵～ 📮
+        async def discard(job):
+            return True
+
+        forward_manager.send_queue.handler = discard
+        session_id = f"aiocqhttp:GroupMessage:{SOURCE_GROUPS[0]}"
+
+        async def setup(batch):
+            plugin.message_cache["1"] = {session_id: session_cache.SessionCache(batch)}
+            return batch
+
+        async def run(batch):
+            await forward_manager.forward_messages("1", session_id, force=True)
+
+        try:
+            await measure(result, batches, run, setup=setup, traced=traced)
+            if not traced:
+                result.extra["batch_size"] = self.batch_size
+        finally:
+            await self._close_plugin(plugin)
+
+    async def _stage_send(self, media, result: StageResult, traced: bool):
+        """通过 OneBot 发送一批合并转发（含图片下载和上传）喵～ 📤"""
+        source, batches = await self._fill_cache(media, self._count(traced))
+        await self._close_plugin(source)
+
+        plugin, client = self._make_plugin(self.batch_size, with_forwarding=True)
+        forward_manager = plugin.forward_manager
+
+        async def setup(batch):
+            nodes = [
+                await forward_manager.message_builder.build_forward_node(message)
+                for message in batch
+            ]
+            nodes.append(
+                forward_manager.message_builder.build_footer_node("bench", len(batch))
+            )
+            return nodes
+
+        async def run(nodes):
+            await forward_manager.message_sender.send_forward_message_via_api(
+                TARGET_SESSION, nodes
+            )
+
+        try:
+            await measure(result, batches, run, setup=setup, traced=traced)
+            if not traced:
+                result.extra["batch_size"] = self.batch_size
+                result.extra["onebot_calls"] = sum(client.calls.values())
+        finally:
+            await self._close_plugin(plugin)
+
+    async def _stage_pipeline(self, media, result: StageResult, traced: bool):
+        """完整流水线：监听 → 阈值触发 → 构建 → 发送队列 → OneBot 喵～ 🔁"""
+        plugin, client = self._make_plugin(self.batch_size, with_forwarding=True)
+        traffic = TrafficGenerator(media, client, SOURCE_GROUPS, seed=self.seed)
+        events = [event for _, event in traffic.events(self.messages)]
+
+        try:
+            started = time.perf_counter()
+            # 每条消息之间让出事件循环，转发和发送与消息到达交替进行喵～ 🔀
+            await measure(
+                result,
+                events,
+                plugin.message_listener.on_all_message,
+                setup=lambda event: asyncio.sleep(0, event),
+            )
+            await drain_pipeline(plugin, client, media, result, started)
+        finally:
+            await self._close_plugin(plugin)
+
+    async def _stage_cache_json(self, media, result: StageResult, traced: bool):
+        """用原来的缩进 JSON 格式保存消息缓存喵～ 💾"""
+        await self._measure_cache_io(media, result, traced, "json")
+
+    async def _stage_cache_bin(self, media, result: StageResult, traced: bool):
+        """用紧凑格式（zlib 压缩 + 媒体目录）保存消息缓存喵～ 🗜️"""
+        await self._measure_cache_io(media, result, traced, "compact")
+
+    async def _measure_cache_io(
+        self, media, result: StageResult, traced: bool, cache_format: str
+    ):
+        """
+        测量一种缓存格式的保存耗时，并记录加载耗时和磁盘占用喵～ 💾
+
+        Note:
+            合成流量里没有内联图片，每10条消息追加一张 base64 图片（16种轮换），
+            让两种格式都要处理大块数据喵～ 🖼️
+        """
+        plugin, _ = await self._fill_cache(media, self._count(traced))
+        images = [
+            base64.b64encode(make_png(128, 128, seed=i)).decode("ascii")
+            for i in range(16)
+        ]
+        for sessions in plugin.message_cache.values():
+            for cache in sessions.values():
+                for index, message in enumerate(cache):
+                    if index % 10 == 0:
+                        message["messages"] = [
+                            *message["messages"],
+                            {"type": "image", "base64": images[index // 10 % 16]},
+                        ]
+
+        plugin.config["cache_format"] = cache_format
+        manager = plugin.config_manager
+
+        async def run(_):
+            manager.save_message_cache(plugin.message_cache, plugin.config)
+
+        try:
+            await measure(
+                result, range(min(self._count(traced), 50)), run, traced=traced
+            )
+            if traced:
+                return
+
+            loads = []
+            for _ in range(10):
+                t0 = time.perf_counter()
+                manager.load_message_cache()
+                loads.append(time.perf_counter() - t0)
+            path = (
+                manager.compact_cache_path
+                if cache_format == "compact"
+                else manager.cache_path
+            )
+            media_dir = manager.media_store.blob_dir
+            media_bytes = (
+                sum(
+                    os.path.getsize(os.path.join(media_dir, name))
+                    for name in os.listdir(media_dir)
+                )
+                if os.path.isdir(media_dir)
+                else 0
+            )
+            result.extra["load_ms"] = round(statistics.fmean(loads) * 1000, 2)
+            result.extra["file_kb"] = round(os.path.getsize(path) / 1024, 1)
+            result.extra["media_kb"] = round(media_bytes / 1024, 1)
+        finally:
+            await self._close_plugin(plugin)
+
+
+def format_report(summaries: dict[str, dict]) -> str:
+    """
+    把结果整理成表格喵～ 📋
+
+    Args:
+        summaries: {阶段名: 汇总结果} 喵
+
+    Returns:
+        表格文本喵
+    """
+    header = (
+        f"{'stage':<10}{'ops':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'ops/s':>10}{'alloc KB':>10}{'peak KB':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    for name, s in summaries.items():
+        lines.append(
+            f"{name:<10}{s['ops']:>7}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}"
+            f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['ops_per_s']:>10.1f}"
+            f"{s['alloc_kb']:>10.1f}{s['peak_kb']:>10.1f}"
+        )
+        extra = {
+            key: value
+            for key, value in s.items()
+            if key
+            not in (
+                "ops",
+                "mean_ms",
+                "p50_ms",
+                "p95_ms",
+                "p99_ms",
+                "ops_per_s",
+                "alloc_kb",
+                "peak_kb",
+            )
+        }
+        if extra:
+            lines.append("          " + ", ".join(f"{k}={v}" for k, v in extra.items()))
+    return "\n".join(lines)
+
+
+def compare_with_baseline(
+    summaries: dict[str, dict], baseline_path: str, tolerance: float
+) -> list[str]:
+    """
+    和保存的基线对比，找出变慢或分配变多的阶段喵～ 🔍
+
+    Args:
+        summaries: 本次结果喵
+        baseline_path: 基线 JSON 文件路径喵
+        tolerance: 允许的相对增幅，0.25 表示 25% 喵
+
+    Returns:
+        回归描述列表，为空表示没有回归喵
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for stage, current in summaries.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        for metric in ("p95_ms", "alloc_kb"):
+            old, new = previous.get(metric, 0), current.get(metric, 0)
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(
+                    f"{stage}.{metric}: {old:.2f} -> {new:.2f} (+{(new / old - 1):.0%})"
+                )
+    return regressions
@@ -0,0 +1,208 @@
+"""
+合成群聊流量生成器喵～ 🎲
+按固定比例生成文本、图片、特殊表情、引用、嵌套转发和 QQ 表情消息！
+"""
+
+import itertools
+import random
+import time
+
+from astrbot.api import message_components as Comp
+
+from .harness import FakeEvent, FakeMessageObj, MediaServer
+
+# 各类消息的默认占比喵～ 📊
+DEFAULT_MIX = {
+    "text": 0.45,
+    "image": 0.2,
+    "mface": 0.1,
+    "reply": 0.1,
+    "forward": 0.05,
+    "face": 0.05,
+    "at": 0.05,
+}
+
+# 同一进程里的消息ID和转发ID不重复，避免命中 get_forward_msg 的响应缓存喵～ 🆔
+_message_ids = itertools.count(1)
+
+_WORDS = ["喵", "今天", "转发", "测试", "消息", "图片", "好耶", "哈哈", "收到", "晚安"]
+
+
+class TrafficGenerator:
+    """
+    合成流量生成器喵～ 🎲
+    同样的种子总是生成同样的消息序列，方便前后对比！ ฅ(^•ω•^ฅ
+    """
+
+    def __init__(
+        self,
+        media: MediaServer,
+        client,
+        groups: list[str],
+        mix: dict[str, float] | None = None,
+        seed: int = 0,
+        self_id: str = "10000",
+    ):
+        """
+        初始化流量生成器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            media: 本地媒体服务器喵
+            client: 假的 OneBot 客户端（作为 event.bot）喵
+            groups: 产生消息的群号列表喵
+            mix: 各类消息的占比喵
+            seed: 随机种子喵
+            self_id: 机器人QQ号喵
+        """
+        self.media = media
+        self.client = client
+        self.groups = groups
+        self.mix = mix or DEFAULT_MIX
+        self.self_id = self_id
+        self._rng = random.Random(seed)
+        # 让假客户端按转发ID返回嵌套节点喵～ 📨
+        client.forward_nodes = self.forward_nodes
+
+    def _text(self, words: int = 8) -> str:
+        return "".join(self._rng.choice(_WORDS) for _ in range(words))
+
+    def forward_nodes(self, forward_id: str) -> list[dict]:
+        """
+        get_forward_msg 返回的节点：文本、图片和一层嵌套转发喵～ 📨
+
+        Args:
+            forward_id: 转发消息ID喵
+
+        Returns:
+            OneBot 格式的节点列表喵
+        """
+        rng = random.Random(forward_id)
+        nodes = []
+        for i in range(rng.randint(2, 5)):
+            segments = [{"type": "text", "data": {"text": f"{forward_id} 第{i}条"}}]
+            if i % 2:
+                url = self.media.image_url(rng.randrange(1000))
+                segments.append({"type": "image", "data": {"url": url, "file": url}})
+            if i == 0 and not forward_id.endswith("_inner"):
+                segments.append(
+                    {"type": "forward", "data": {"id": f"{forward_id}_inner"}}
+                )
+            nodes.append(
+                {
+                    "sender": {"user_id": 20000 + i, "nickname": f"转发者{i}"},
+                    "time": int(time.time()),
+                    "message": segments,
+                }
+            )
+        return nodes
+
+    def _build(self, kind: str, index: int) -> tuple[list, list[dict], str]:
+        """
+        生成一条消息的组件、原始消息段和纯文本喵～ 🧩
+        """
+        text = self._text()
+        if kind == "image":
+            url = self.media.image_url(index)
+            return (
+                [Comp.Plain(text=text), Comp.Image.fromURL(url)],
+                [
+                    {"type": "text", "data": {"text": text}},
+                    {"type": "image", "data": {"url": url, "file": url}},
+                ],
+                text,
+            )
+        if kind == "mface":
+            url = self.media.gif_url(index)
+            data = {
+                "url": url,
+                "summary": "[表情]",
+                "emoji_id": str(index),
+                "emoji_package_id": "1",
+                "key": f"k{index}",
+            }
+            return [Comp.Image.fromURL(url)], [{"type": "mface", "data": data}], ""
+        if kind == "reply":
+            quoted = self._text(4)
+            reply = Comp.Reply(
+                id=str(max(1, index - 1)),
+                chain=[Comp.Plain(text=quoted)],
+                sender_id=20001,
+                sender_nickname="被引用者",
+                time=int(time.time()),
+                message_str=quoted,
+            )
+            return (
+                [reply, Comp.Plain(text=text)],
+                [
+                    {"type": "reply", "data": {"id": str(max(1, index - 1))}},
+                    {"type": "text", "data": {"text": text}},
+                ],
+                text,
+            )
+        if kind == "forward":
+            forward_id = f"fwd_{index}"
+            return (
+                [Comp.Forward(id=forward_id)],
+                [{"type": "forward", "data": {"id": forward_id}}],
+                "",
+            )
+        if kind == "face":
+            face_id = index % 200
+            return (
+                [Comp.Face(id=face_id), Comp.Plain(text=text)],
+                [
+                    {"type": "face", "data": {"id": str(face_id)}},
+                    {"type": "text", "data": {"text": text}},
+                ],
+                text,
+            )
+        if kind == "at":
+            qq = str(20000 + index % 50)
+            return (
+                [Comp.At(qq=qq, name=f"用户{qq}"), Comp.Plain(text=text)],
+                [
+                    {"type": "at", "data": {"qq": qq}},
+                    {"type": "text", "data": {"text": text}},
+                ],
+                text,
+            )
+        return [Comp.Plain(text=text)], [{"type": "text", "data": {"text": text}}], text
+
+    def next_event(self, kind: str | None = None) -> tuple[str, FakeEvent]:
+        """
+        生成下一条消息事件喵～ 📨
+
+        Args:
+            kind: 指定消息类型，为None时按占比随机选择喵
+
+        Returns:
+            (消息类型, 事件) 喵
+        """
+        if kind is None:
+            kind = self._rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        index = next(_message_ids)
+
+        components, segments, text = self._build(kind, index)
+        user_id = str(30000 + self._rng.randrange(200))
+        message_obj = FakeMessageObj(
+            message_id=str(index),
+            self_id=self.self_id,
+            group_id=self._rng.choice(self.groups),
+            user_id=user_id,
+            nickname=f"群友{user_id}",
+            segments=segments,
+            text=text,
+        )
+        return kind, FakeEvent(message_obj, components, self.client)
+
+    def events(self, count: int) -> list[tuple[str, FakeEvent]]:
+        """
+        生成一批消息事件喵～ 📦
+
+        Args:
+            count: 消息数量喵
+
+        Returns:
+            [(消息类型, 事件), ...] 喵
+        """
+        return [self.next_event() for _ in range(count)]
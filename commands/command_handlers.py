@@ -4,6 +4,7 @@ from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 
 # 更新导入路径喵～ 📦
+from ..utils.profiler import PROFILE_MODES
 from ..utils.session_formatter import normalize_session_id
 
 
@@ -33,41 +34,6 @@ class CommandHandlers:
         """
         self.plugin = plugin_instance
 
-        # 迁移旧格式的processed_message_ids到新格式喵～ 🔄
-        self._migrate_processed_message_ids()
-
-    def _migrate_processed_message_ids(self):
-        """
-        将旧格式的processed_message_ids迁移到新格式喵～ 🔄
-        把全局的消息ID记录按任务分组存储！
-
-        Note:
-            这样可以更好地管理不同任务的消息处理记录喵～ ✨
-        """
-        if "processed_message_ids" in self.plugin.config and isinstance(
-            self.plugin.config["processed_message_ids"], list
-        ):
-            logger.info("检测到旧格式的processed_message_ids，正在迁移到新格式喵～ 🔄")
-
-            # 获取所有任务ID喵～ 📋
-            task_ids = [str(task.get("id", "")) for task in self.plugin.config["tasks"]]
-
-            if task_ids:
-                # 如果有任务，将所有消息ID分配给第一个任务（简单处理）喵～ 📤
-                first_task_id = task_ids[0]
-                self.plugin.config[f"processed_message_ids_{first_task_id}"] = [
-                    {"id": msg_id, "timestamp": int(time.time())}
-                    for msg_id in self.plugin.config["processed_message_ids"]
-                ]
-                logger.info(
-                    f"已将 {len(self.plugin.config['processed_message_ids'])} 个消息ID迁移到任务 {first_task_id} 喵～ ✅"
-                )
-
-            # 删除旧的全局processed_message_ids喵～ 🗑️
-            del self.plugin.config["processed_message_ids"]
-            self.plugin.save_config_file()
-            logger.info("迁移完成喵～ 🎉")
-
     def _ensure_full_session_id(self, session_id):
         """
         确保会话ID是完整格式喵～ 🔍
@@ -353,6 +319,7 @@ class CommandHandlers:
         if action == "add":
             if storage_id not in task[actual_list_name]:
                 task[actual_list_name].append(storage_id)
+                self.plugin.task_registry.task_changed(task.get("id"))
                 self.plugin.save_config_file()
                 return f"已将{session_type} {actual_id} 添加到任务 [{task_name}] 的 {actual_list_name} 列表中喵～ ✅"
             else:
@@ -362,6 +329,7 @@ class CommandHandlers:
         elif action == "remove":
             if storage_id in task[actual_list_name]:
                 task[actual_list_name].remove(storage_id)
+                self.plugin.task_registry.task_changed(task.get("id"))
                 self.plugin.save_config_file()
                 return f"已将{session_type} {actual_id} 从任务 [{task_name}] 的 {actual_list_name} 列表中移除喵～ ✅"
             else:
@@ -499,14 +467,24 @@ class CommandHandlers:
             result += f"  🎯目标: {', '.join(task.get('target_sessions', ['无']))}\n"
             result += f"  📊消息阈值: {task.get('max_messages', self.plugin.config.get('default_max_messages', 20))}\n"
 
+            # 显示时间和大小触发条件喵～ ⏰
+            if self.plugin.forward_manager:
+                max_wait, max_bytes = self.plugin.forward_manager.get_flush_limits(task)
+                if max_wait or max_bytes:
+                    result += (
+                        f"  ⏰最长等待: {f'{max_wait:g} 秒' if max_wait else '不限'}, "
+                        f"批次上限: {f'{max_bytes} 字节' if max_bytes else '不限'}\n"
+                    )
+
         return event.plain_result(result)
 
     async def handle_status(self, event: AstrMessageEvent, task_id: str = None):
         """查看特定任务的缓存状态喵～"""
         if task_id is None:
             # 显示所有任务的状态统计
+            circuit_status = self._format_circuit_status() + self._format_loop_status()
             if not self.plugin.message_cache:
-                return event.plain_result("当前没有任何消息缓存喵～")
+                return event.plain_result("当前没有任何消息缓存喵～" + circuit_status)
 
             result = "消息缓存状态喵～：\n"
             for tid, sessions in self.plugin.message_cache.items():
@@ -519,7 +497,7 @@ class CommandHandlers:
                     f"- {task_name}: {session_count} 个会话, 共 {total_msgs} 条消息\n"
                 )
 
-            return event.plain_result(result)
+            return event.plain_result(result + circuit_status)
         else:
             # 显示指定任务的详细缓存
             if task_id not in self.plugin.message_cache:
@@ -534,6 +512,37 @@ class CommandHandlers:
 
             return event.plain_result(result)
 
+    def _format_circuit_status(self) -> str:
+        """整理目标会话的熔断状态喵～ 🔌"""
+        forward_manager = getattr(self.plugin, "forward_manager", None)
+        if not forward_manager:
+            return ""
+        circuits = forward_manager.message_sender.circuit_breaker.snapshot()
+        if not circuits:
+            return ""
+
+        state_names = {"open": "🔴熔断", "half_open": "🟡探测", "closed": "🟢正常"}
+        now = time.time()
+        result = "\n目标会话熔断状态喵～：\n"
+        for target_session, circuit in circuits.items():
+            line = (
+                f"- {target_session}: {state_names.get(circuit.state, circuit.state)}, "
+                f"连续失败 {circuit.failures} 次"
+            )
+            if circuit.state == "open":
+                line += f", {max(0, int(circuit.open_until - now))} 秒后探测"
+            if circuit.last_retcode is not None:
+                line += f", 错误码 {circuit.last_retcode}"
+            if circuit.last_error:
+                line += f"\n  最近错误: {circuit.last_error[:80]}"
+            result += line + "\n"
+        return result
+
+    def _format_loop_status(self) -> str:
+        """整理事件循环延迟分位数和最近的阻塞喵～ 🐕"""
+        watchdog = getattr(self.plugin, "loop_watchdog", None)
+        return watchdog.render_text() if watchdog else ""
+
     async def handle_create_task(self, event: AstrMessageEvent, task_name: str = None):
         """创建新的转发任务喵～"""
         # 权限检查
@@ -559,7 +568,7 @@ class CommandHandlers:
             "enabled": True,
         }
 
-        self.plugin.config["tasks"].append(new_task)
+        self.plugin.task_registry.add(new_task)
         self.plugin.save_config_file()
 
         # 确保消息中的换行符正确显示
@@ -584,35 +593,21 @@ class CommandHandlers:
                 "请提供要删除的任务ID喵～\n用法: /turnrig delete <任务ID>"
             )
 
-        # 查找并删除任务
+        # 从任务注册表删除任务，同时更新配置中的任务列表
         task_id_str = str(task_id)  # 确保使用字符串比较
-        deleted = False
-        tasks_to_keep = []
+        deleted_task = self.plugin.task_registry.remove(task_id_str)
 
-        # 使用列表推导而不是直接修改遍历中的列表
-        for task in self.plugin.config["tasks"]:
-            if str(task.get("id", "")) != task_id_str:
-                tasks_to_keep.append(task)
-            else:
-                deleted = True
-                task_name = task.get("name", "未命名")
-                logger.info(f"找到要删除的任务: {task_name} (ID: {task_id})")
-
-        # 只有在确实找到并删除了任务后才更新配置
-        if deleted:
-            # 更新配置中的任务列表
-            self.plugin.config["tasks"] = tasks_to_keep
+        # 只有在确实找到并删除了任务后才清理缓存
+        if deleted_task is not None:
+            task_name = deleted_task.get("name", "未命名")
+            logger.info(f"找到要删除的任务: {task_name} (ID: {task_id})")
 
             # 删除相关的消息缓存
             if task_id_str in self.plugin.message_cache:
                 del self.plugin.message_cache[task_id_str]
                 logger.info(f"已删除任务 {task_id} 的消息缓存")
 
-            # 删除任务特定的processed_message_ids
-            processed_msg_key = f"processed_message_ids_{task_id_str}"
-            if processed_msg_key in self.plugin.config:
-                logger.info(f"删除任务 {task_id} 的processed_message_ids")
-                del self.plugin.config[processed_msg_key]
+            # 任务的processed_message_ids由运行时状态订阅删除事件一并清理
 
             # 立即保存更新后的配置和缓存
             self.plugin.save_config_file()
@@ -646,6 +641,7 @@ class CommandHandlers:
             return event.plain_result(error_msg)
 
         task["enabled"] = True
+        self.plugin.task_registry.task_changed(task.get("id"))
         self.plugin.save_config_file()
 
         return event.plain_result(f"已启用任务 [{task.get('name')}]，ID: {task_id}")
@@ -665,6 +661,7 @@ class CommandHandlers:
             return event.plain_result(error_msg)
 
         task["enabled"] = False
+        self.plugin.task_registry.task_changed(task.get("id"))
         self.plugin.save_config_file()
 
         return event.plain_result(f"已禁用任务 [{task.get('name')}]，ID: {task_id}")
@@ -808,11 +805,54 @@ class CommandHandlers:
             return event.plain_result("消息阈值必须大于0喵～")
 
         task["max_messages"] = threshold
+        self.plugin.task_registry.task_changed(task.get("id"))
         self.plugin.save_config_file()
         return event.plain_result(
             f"已将任务 [{task.get('name')}] 的消息阈值设为 {threshold} 喵～"
         )
 
+    async def handle_set_flush(
+        self,
+        event: AstrMessageEvent,
+        task_id: str = None,
+        max_wait_seconds: int = None,
+        max_batch_bytes: int = None,
+    ):
+        """设置按等待时间和批次大小触发转发喵～"""
+        # 权限检查
+        is_admin, response = await self._check_admin(
+            event, "只有管理员才能设置转发触发条件喵～"
+        )
+        if not is_admin:
+            return response
+
+        # 获取并验证任务
+        task, error_msg = self._get_validated_task(event, task_id)
+        if error_msg:
+            return event.plain_result(error_msg)
+
+        if max_wait_seconds is None:
+            return event.plain_result("请指定最长等待秒数喵～（0 表示不按时间触发）")
+
+        if max_wait_seconds < 0 or (
+            max_batch_bytes is not None and max_batch_bytes < 0
+        ):
+            return event.plain_result("等待秒数和批次字节数不能小于0喵～")
+
+        task["max_wait_seconds"] = max_wait_seconds
+        if max_batch_bytes is not None:
+            task["max_batch_bytes"] = max_batch_bytes
+        # 转发管理器收到变更事件后按新的条件重新安排已有缓存的定时器喵～ ⏰
+        self.plugin.task_registry.task_changed(task.get("id"))
+        self.plugin.save_config_file()
+
+        max_bytes = task.get("max_batch_bytes", 0)
+        return event.plain_result(
+            f"已将任务 [{task.get('name')}] 的最长等待设为 "
+            f"{f'{max_wait_seconds} 秒' if max_wait_seconds else '不限'}，"
+            f"批次上限设为 {f'{max_bytes} 字节' if max_bytes else '不限'} 喵～"
+        )
+
     async def handle_rename_task(
         self, event: AstrMessageEvent, task_id: str = None, new_name: str = None
     ):
@@ -834,6 +874,7 @@ class CommandHandlers:
 
         old_name = task.get("name", "未命名")
         task["name"] = new_name
+        self.plugin.task_registry.task_changed(task.get("id"))
         self.plugin.save_config_file()
         return event.plain_result(f"已将任务 [{old_name}] 重命名为 [{new_name}] 喵～")
 
@@ -949,6 +990,8 @@ class CommandHandlers:
 
 · /turnrig threshold <任务ID> <数量> - 设置消息阈值
 
+· /turnrig flush <任务ID> <秒数> [字节数] - 设置最长等待时间和批次大小上限
+
 【其他功能】
 
 · /turnrig rename <任务ID> <名称> - 重命名任务
@@ -957,6 +1000,14 @@ class CommandHandlers:
 
 · /turnrig cleanup <天数> - 清理指定天数前的已处理消息ID
 
+· /turnrig metrics [reset] - 查看或重置运行指标
+
+· /turnrig sendstats [群聊/私聊 <会话ID>] - 查看各发送策略的成功率和耗时
+
+· /turnrig capture [start [anon]|stop] - 录制消息流量用于离线回放
+
+· /turnrig profile [start [秒数] [cprofile|sample]|stop] - 按需性能分析
+
 【机器人ID管理】
 
 · /turnrig addbot <机器人QQ号> - 添加机器人ID到过滤列表
@@ -1015,6 +1066,205 @@ class CommandHandlers:
             f"已清理 {cleaned_count} 个超过 {days} 天的消息ID喵～ ✅"
         )
 
+    async def handle_metrics(self, event: AstrMessageEvent, action: str = None):
+        """
+        查看或重置运行指标喵～ 📊
+
+        Args:
+            event: 消息事件对象喵
+            action: 传 reset 时清空计数器和直方图喵
+
+        Returns:
+            指标摘要消息喵～
+        """
+        # 权限检查喵～ 👮
+        is_admin, response = await self._check_admin(
+            event, "只有管理员才能查看运行指标喵～ 🚫"
+        )
+        if not is_admin:
+            return response
+
+        if (action or "").lower() == "reset":
+            self.plugin.metrics.reset()
+            return event.plain_result("已重置运行指标喵～ 🧹")
+
+        return event.plain_result(self.plugin.metrics.render_text())
+
+    async def handle_send_stats(
+        self, event: AstrMessageEvent, chat_type: str = None, chat_id: str = None
+    ):
+        """
+        查看各目标、各发送策略的成功率和耗时喵～ 📡
+
+        Args:
+            event: 消息事件对象喵
+            chat_type: 群聊/私聊，或完整会话ID，不传时显示全部目标喵
+            chat_id: 会话ID喵
+
+        Returns:
+            发送策略统计消息喵～
+        """
+        # 权限检查喵～ 👮
+        is_admin, response = await self._check_admin(
+            event, "只有管理员才能查看发送统计喵～ 🚫"
+        )
+        if not is_admin:
+            return response
+
+        target = None
+        if chat_type:
+            chat_type = str(chat_type)
+            if ":" not in chat_type and chat_id is None:
+                return event.plain_result(
+                    "请明确指定会话类型喵～ 🤔\n正确格式：/turnrig sendstats [群聊/私聊 <会话ID>]"
+                )
+            target = self._ensure_full_session_id(
+                chat_type if ":" in chat_type else f"{chat_type} {chat_id}"
+            )
+
+        telemetry = self.plugin.forward_manager.message_sender.telemetry
+        return event.plain_result(telemetry.render_text(target))
+
+    async def handle_capture(
+        self, event: AstrMessageEvent, action: str = None, option: str = None
+    ):
+        """
+        开始、停止或查看消息流量录制喵～ 🎙️
+
+        Args:
+            event: 消息事件对象喵
+            action: start、stop，不填时查看录制状态喵
+            option: start 时传 anon 表示匿名化录制喵
+
+        Returns:
+            录制状态消息喵～
+
+        Note:
+            录制文件可以用 python -m benchmarks.replay 离线回放喵！ ✨
+        """
+        # 权限检查喵～ 👮
+        is_admin, response = await self._check_admin(
+            event, "只有管理员才能录制消息流量喵～ 🚫"
+        )
+        if not is_admin:
+            return response
+
+        recorder = self.plugin.traffic_recorder
+        action = (action or "").lower()
+
+        if action == "start":
+            anonymize = (option or "").lower() in ("anon", "anonymize", "匿名")
+            max_events = self.plugin.config.get("capture_max_events", 50000)
+            path = recorder.start(anonymize=anonymize, max_events=max_events)
+            limit = f"，最多 {max_events} 条" if max_events else ""
+            return event.plain_result(
+                f"开始录制消息流量喵～ 🎙️\n文件: {path}\n"
+                f"匿名化: {'是' if anonymize else '否'}{limit}"
+            )
+
+        if action == "stop":
+            if not recorder.active:
+                return event.plain_result("当前没有在录制喵～ 📭")
+            path, count = recorder.stop()
+            return event.plain_result(
+                f"已停止录制，共 {count} 条消息喵～ ⏹️\n文件: {path}"
+            )
+
+        if action:
+            return event.plain_result(
+                "用法: /turnrig capture [start [anon]|stop] 喵～ 📖"
+            )
+
+        if recorder.active:
+            elapsed = int(time.time() - recorder.started_at)
+            return event.plain_result(
+                f"正在录制喵～ 🔴 已录制 {recorder.count} 条，持续 {elapsed} 秒\n"
+                f"文件: {recorder.path}\n匿名化: {'是' if recorder.anonymize else '否'}"
+            )
+        return event.plain_result(
+            "当前没有在录制喵～ 使用 /turnrig capture start [anon] 开始录制 🎙️"
+        )
+
+    async def handle_profile(
+        self,
+        event: AstrMessageEvent,
+        action: str = None,
+        option: str = None,
+        mode: str = None,
+    ):
+        """
+        开始、停止或查看按需性能分析喵～ 🔬
+
+        Args:
+            event: 消息事件对象喵
+            action: start、stop，不传时查看状态喵
+            option: 分析秒数或模式喵
+            mode: 分析模式（cprofile 或 sample）或秒数喵
+
+        Returns:
+            分析状态消息喵～
+
+        Note:
+            分析时长不会超过 profile_max_seconds，到时自动停止并写出文件喵！ ⏰
+        """
+        # 权限检查喵～ 👮
+        is_admin, response = await self._check_admin(
+            event, "只有管理员才能进行性能分析喵～ 🚫"
+        )
+        if not is_admin:
+            return response
+
+        profiler = self.plugin.profiler
+        action = (action or "").lower()
+        usage = "用法: /turnrig profile [start [秒数] [cprofile|sample]|stop] 喵～ 📖"
+
+        if action == "start":
+            max_seconds = self.plugin.config.get("profile_max_seconds", 300)
+            seconds = min(60, max_seconds)
+            profile_mode = "cprofile"
+            for value in (option, mode):
+                value = str(value).lower() if value is not None else ""
+                if value.isdigit():
+                    seconds = min(int(value), max_seconds)
+                elif value in PROFILE_MODES:
+                    profile_mode = value
+                elif value:
+                    return event.plain_result(usage)
+            if seconds <= 0:
+                return event.plain_result("分析秒数必须大于0喵～ ❌")
+
+            try:
+                path = profiler.start(mode=profile_mode, seconds=seconds)
+            except Exception as e:
+                logger.error(f"启动性能分析失败喵: {e} 😿")
+                return event.plain_result(f"启动性能分析失败喵: {e} 😿")
+            return event.plain_result(
+                f"开始性能分析喵～ 🔬\n模式: {profile_mode}，{seconds} 秒后自动停止\n"
+                f"文件: {path}"
+            )
+
+        if action == "stop":
+            if not profiler.active:
+                return event.plain_result("当前没有在进行性能分析喵～ 📭")
+            path, summary = profiler.stop()
+            result = f"已停止性能分析喵～ ⏹️\n文件: {path}"
+            if summary:
+                result += f"\n{summary}"
+            return event.plain_result(result)
+
+        if action:
+            return event.plain_result(usage)
+
+        if profiler.active:
+            elapsed = int(time.time() - profiler.started_at)
+            return event.plain_result(
+                f"正在进行性能分析喵～ 🔴 模式: {profiler.mode}，"
+                f"已进行 {elapsed}/{profiler.duration:g} 秒\n文件: {profiler.path}"
+            )
+        return event.plain_result(
+            "当前没有在进行性能分析喵～ 使用 /turnrig profile start 开始 🔬"
+        )
+
     # tr 简化命令组处理方法喵～ 🎯
     async def handle_tr_add_monitor(self, event: AstrMessageEvent, task_id: str = None):
         """
@@ -1243,6 +1493,7 @@ class CommandHandlers:
 
         # 添加用户到监听列表
         task["monitored_users_in_groups"][full_group_id].append(user_id_str)
+        self.plugin.task_registry.task_changed(task.get("id"))
         self.plugin.save_config_file()
 
         return event.plain_result(
@@ -1304,6 +1555,7 @@ class CommandHandlers:
         if not task["monitored_users_in_groups"][full_group_id]:
             del task["monitored_users_in_groups"][full_group_id]
 
+        self.plugin.task_registry.task_changed(task.get("id"))
         self.plugin.save_config_file()
 
         return event.plain_result(
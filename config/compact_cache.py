@@ -0,0 +1,235 @@
+"""
+消息缓存的紧凑存储格式模块喵～ 🗜️
+把消息缓存写成不缩进的 JSON 再用 zlib 压缩，前面加上魔数和版本号；
+消息组件里很大的 base64 数据单独存进媒体目录，缓存文件里只保留引用！
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from collections.abc import Iterable, Mapping
+
+from astrbot.api import logger
+
+from ..messaging.session_cache import SessionCache, json_default
+
+# 文件头：魔数 + 格式版本喵～ 🏷️
+MAGIC = b"TRMC"
+FORMAT_VERSION = 1
+
+# 超过这个长度的 base64 才移到媒体目录，小图标直接留在缓存里喵～ 📏
+MIN_BLOB_CHARS = 1024
+
+
+class MediaBlobStore:
+    """
+    按内容寻址的媒体数据目录喵～ 🖼️
+    同样的 base64 数据只保存一份，文件名就是数据的 sha1！ ฅ(^•ω•^ฅ
+
+    Note:
+        同一个字符串对象的摘要会记住一轮保存，频繁保存时不用重复计算 sha1 喵～ ⚡
+    """
+
+    def __init__(self, blob_dir: str):
+        """
+        初始化媒体目录喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            blob_dir: 保存媒体数据的目录喵
+        """
+        self.blob_dir = blob_dir
+        self._digests: dict[str, str] = {}
+        self._previous: dict[str, str] = {}
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, f"{digest}.b64")
+
+    def begin(self) -> None:
+        """开始一轮保存，只保留上一轮用到的摘要记忆喵～ 🔄"""
+        self._previous, self._digests = self._digests, {}
+
+    def referenced(self) -> set[str]:
+        """
+        这一轮保存用到的摘要喵～ 📋
+
+        Returns:
+            begin 之后 put 过的摘要集合喵
+        """
+        return set(self._digests.values())
+
+    def put(self, data: str) -> str:
+        """
+        保存一段 base64 数据喵～ 💾
+
+        Args:
+            data: base64 字符串喵
+
+        Returns:
+            数据的 sha1 摘要喵
+        """
+        digest = self._digests.get(data) or self._previous.get(data)
+        if digest is None:
+            digest = hashlib.sha1(data.encode("utf-8")).hexdigest()
+        self._digests[data] = digest
+
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(self.blob_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """
+        读取一段 base64 数据喵～ 📥
+
+        Args:
+            digest: sha1 摘要喵
+
+        Returns:
+            base64 字符串，文件不存在时返回空字符串喵
+        """
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.warning(f"缓存引用的媒体数据不存在喵: {digest} 😿")
+            return ""
+
+    def collect_garbage(self, keep: Iterable[str]) -> int:
+        """
+        删除没有被缓存引用的媒体数据喵～ 🧹
+
+        Args:
+            keep: 仍然被引用的摘要喵
+
+        Returns:
+            删除的文件数量喵
+        """
+        if not os.path.isdir(self.blob_dir):
+            return 0
+        keep = {f"{digest}.b64" for digest in keep}
+        removed = 0
+        for filename in os.listdir(self.blob_dir):
+            if filename not in keep:
+                try:
+                    os.remove(os.path.join(self.blob_dir, filename))
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"删除媒体数据 {filename} 失败喵: {e} 😿")
+        return removed
+
+
+def _externalize(
+    message: Mapping, store: MediaBlobStore, position: list, blobs: list
+) -> Mapping:
+    """
+    把消息里很大的 base64 移到媒体目录喵～ 📤
+
+    Args:
+        message: 缓存消息（字典或记录）喵
+        store: 媒体目录喵
+        position: [任务ID, 会话ID, 消息下标]，用来登记引用位置喵
+        blobs: 引用位置列表，会追加 [任务ID, 会话ID, 消息下标, 组件下标, 摘要] 喵
+
+    Returns:
+        没有大数据时原样返回，否则返回替换了 base64 的普通字典喵
+    """
+    components = message.get("messages")
+    if not components:
+        return message
+    found = [
+        index
+        for index, comp in enumerate(components)
+        if isinstance(comp, Mapping)
+        and isinstance(comp.get("base64"), str)
+        and len(comp["base64"]) >= MIN_BLOB_CHARS
+    ]
+    if not found:
+        return message
+
+    plain = json.loads(json.dumps(message, ensure_ascii=False, default=json_default))
+    for index in found:
+        digest = store.put(components[index]["base64"])
+        plain["messages"][index]["base64"] = ""
+        blobs.append([*position, index, digest])
+    return plain
+
+
+def encode_cache(cache: dict, store: MediaBlobStore, level: int = 1) -> bytes:
+    """
+    把消息缓存编码成紧凑格式喵～ 🗜️
+
+    Args:
+        cache: {任务ID: {会话ID: 会话缓存}} 喵
+        store: 保存大块 base64 的媒体目录喵
+        level: zlib 压缩级别（0-9）喵
+
+    Returns:
+        文件内容喵
+
+    Note:
+        写完文件之后用 store.referenced() 回收不再被引用的媒体数据喵～ 🧹
+    """
+    store.begin()
+    blobs: list = []
+    sessions_out: dict = {}
+    for task_id, sessions in cache.items():
+        task_out = sessions_out[task_id] = {}
+        for session_id, messages in sessions.items():
+            if isinstance(messages, SessionCache) and not messages.hydrated:
+                # 没有被访问过的会话直接使用原始数据喵～ 💤
+                messages = messages._pending
+            task_out[session_id] = [
+                _externalize(message, store, [task_id, session_id, index], blobs)
+                for index, message in enumerate(messages)
+            ]
+
+    body = json.dumps(
+        {"cache": sessions_out, "blobs": blobs},
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=json_default,
+    ).encode("utf-8")
+    return MAGIC + bytes([FORMAT_VERSION]) + zlib.compress(body, level)
+
+
+def is_compact(data: bytes) -> bool:
+    """文件内容是不是紧凑格式喵～ 🔍"""
+    return data[: len(MAGIC)] == MAGIC
+
+
+def decode_cache(data: bytes, store: MediaBlobStore) -> dict:
+    """
+    解码紧凑格式的消息缓存喵～ 📦
+
+    Args:
+        data: 文件内容喵
+        store: 媒体目录，引用的 base64 会被读回消息里喵
+
+    Returns:
+        {任务ID: {会话ID: 原始消息列表}} 喵
+
+    Raises:
+        ValueError: 文件头不对或版本不支持时喵
+    """
+    if not is_compact(data):
+        raise ValueError("不是紧凑格式的消息缓存")
+    version = data[len(MAGIC)]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"不支持的消息缓存格式版本: {version}")
+
+    payload = json.loads(zlib.decompress(data[len(MAGIC) + 1 :]).decode("utf-8"))
+    cache = payload.get("cache", {})
+    blobs = payload.get("blobs", [])
+    for task_id, session_id, index, comp_index, digest in blobs:
+        component = cache[task_id][session_id][index]["messages"][comp_index]
+        component["base64"] = store.get(digest)
+
+    removed = store.collect_garbage(blob[4] for blob in blobs)
+    if removed:
+        logger.debug(f"清理了 {removed} 个不再被引用的媒体数据喵～ 🧹")
+    return cache
@@ -1,8 +1,15 @@
 import json
 import os
+import time
 
 from astrbot.api import logger
 
+from ..messaging.session_cache import SessionCache, json_default
+from .compact_cache import MediaBlobStore, decode_cache, encode_cache
+
+# 当前的配置版本，低于这个版本的配置在启动时迁移一次喵～ 🏷️
+CONFIG_VERSION = 2
+
 
 class ConfigManager:
     """
@@ -24,6 +31,9 @@ class ConfigManager:
         self.cache_path = os.path.join(
             self.data_dir, "message_cache.json"
         )  # 缓存文件路径喵 💾
+        # 可选的紧凑缓存格式（cache_format: compact）和它的媒体目录喵～ 🗜️
+        self.compact_cache_path = os.path.join(self.data_dir, "message_cache.bin")
+        self.media_store = MediaBlobStore(os.path.join(self.data_dir, "cache_media"))
 
     def load_config(self):
         """
@@ -44,6 +54,40 @@ class ConfigManager:
             logger.error(f"加载配置失败喵: {e}")
         return None
 
+    def migrate_config(self, config: dict) -> bool:
+        """
+        把旧版本的配置迁移到当前版本喵～ 🔄
+
+        Args:
+            config: 配置字典，会被原地修改喵
+
+        Returns:
+            有改动需要保存时返回True喵
+
+        Note:
+            配置里记录了 config_version，已经是当前版本时直接返回，不会每次启动都检查喵～ ⚡
+        """
+        if config.get("config_version", 1) >= CONFIG_VERSION:
+            return False
+
+        # 版本 2：全局的 processed_message_ids 按任务分组保存喵～ 📤
+        legacy_ids = config.pop("processed_message_ids", None)
+        if isinstance(legacy_ids, list):
+            logger.info("检测到旧格式的processed_message_ids，正在迁移到新格式喵～ 🔄")
+            task_ids = [str(task.get("id", "")) for task in config.get("tasks", [])]
+            if task_ids:
+                # 如果有任务，将所有消息ID分配给第一个任务（简单处理）喵～ 📤
+                now = int(time.time())
+                config[f"processed_message_ids_{task_ids[0]}"] = [
+                    {"id": msg_id, "timestamp": now} for msg_id in legacy_ids
+                ]
+                logger.info(
+                    f"已将 {len(legacy_ids)} 个消息ID迁移到任务 {task_ids[0]} 喵～ ✅"
+                )
+
+        config["config_version"] = CONFIG_VERSION
+        return True
+
     def save_config(self, config):
         """
         保存配置到文件喵～
@@ -81,23 +125,34 @@ class ConfigManager:
 
         Returns:
             消息缓存字典喵～
+
+        Note:
+            两种格式的文件都存在时读取较新的那个，切换 cache_format 后不会丢缓存喵～ 🔄
         """
         try:
+            cache_path = self._newest_cache_path()
             # 检查缓存文件是否存在喵～ 🔍
-            if os.path.exists(self.cache_path):
-                with open(self.cache_path, encoding="utf-8") as f:
-                    cache_data = json.load(f)
-                    logger.debug(f"已从 {self.cache_path} 加载消息缓存喵～ ✅")
-
-                    # 显示每个任务的缓存状态喵～ 📊
-                    for task_id, sessions in cache_data.items():
-                        session_count = len(sessions)
-                        total_msgs = sum(len(msgs) for msgs in sessions.values())
-                        logger.debug(
-                            f"任务 {task_id} 缓存: {session_count} 个会话, 共 {total_msgs} 条消息喵～ 📋"
-                        )
-
-                    return cache_data
+            if cache_path:
+                if cache_path == self.compact_cache_path:
+                    with open(cache_path, "rb") as f:
+                        cache_data = decode_cache(f.read(), self.media_store)
+                else:
+                    with open(cache_path, encoding="utf-8") as f:
+                        cache_data = json.load(f)
+
+                # 会话缓存在第一次使用时才转换成紧凑记录，启动时只解析 JSON 喵～ 💤
+                session_count = message_count = 0
+                for sessions in cache_data.values():
+                    for session_id, msgs in sessions.items():
+                        sessions[session_id] = SessionCache.lazy(msgs)
+                        session_count += 1
+                        message_count += len(msgs)
+
+                logger.debug(
+                    f"已从 {cache_path} 加载消息缓存: {len(cache_data)} 个任务, "
+                    f"{session_count} 个会话, 共 {message_count} 条消息喵～ ✅"
+                )
+                return cache_data
             else:
                 logger.debug(
                     f"消息缓存文件不存在，将在需要时创建喵: {self.cache_path} 📝"
@@ -108,6 +163,22 @@ class ConfigManager:
             logger.error(f"加载消息缓存失败喵: {e}")
             return {}
 
+    def _newest_cache_path(self) -> str | None:
+        """
+        找到要加载的缓存文件喵～ 🔍
+
+        Returns:
+            较新的缓存文件路径，都不存在时返回None喵
+        """
+        paths = [
+            path
+            for path in (self.compact_cache_path, self.cache_path)
+            if os.path.exists(path)
+        ]
+        if not paths:
+            return None
+        return max(paths, key=os.path.getmtime)
+
     def save_message_cache(self, message_cache: dict, current_config: dict = None):
         """
         保存消息缓存喵～
@@ -147,9 +218,41 @@ class ConfigManager:
                     logger.info(f"从缓存中移除已删除的任务 {task_id} 喵～ 🗑️")
 
             # 保存清理后的缓存喵！ ✨
-            cache_path = os.path.join(self.data_dir, "message_cache.json")
-            with open(cache_path, "w", encoding="utf-8") as f:
-                json.dump(cleaned_cache, f, ensure_ascii=False, indent=4)
+            if config and config.get("cache_format", "json") == "compact":
+                cache_path = self.compact_cache_path
+                data = encode_cache(
+                    cleaned_cache,
+                    self.media_store,
+                    level=config.get("cache_compress_level", 1),
+                )
+                # 先写临时文件再替换，写到一半失败也不会损坏缓存喵～ 🛡️
+                with open(f"{cache_path}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{cache_path}.tmp", cache_path)
+                stale_path = self.cache_path
+                # 新文件已经落盘，这一轮没有引用的图片数据可以删掉了喵～ 🧹
+                removed = self.media_store.collect_garbage(
+                    self.media_store.referenced()
+                )
+                if removed:
+                    logger.debug(f"清理了 {removed} 个不再被引用的媒体数据喵～ 🧹")
+            else:
+                cache_path = self.cache_path
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    json.dump(
+                        cleaned_cache,
+                        f,
+                        ensure_ascii=False,
+                        indent=4,
+                        default=json_default,
+                    )
+                stale_path = self.compact_cache_path
+                # JSON 里的图片数据是内联的，媒体目录已经没有用了喵～ 🧹
+                self.media_store.collect_garbage(())
+
+            # 删除另一种格式的旧文件，避免下次启动读到过期的缓存喵～ 🧹
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
             logger.debug(f"已将消息缓存保存到 {cache_path} 喵～ 💫")
             return True
         except Exception as e:
@@ -0,0 +1,281 @@
+"""
+运行时状态存储模块喵～ 🗄️
+已处理的消息ID、下载过的图片路径这类机器状态单独保存在 runtime_state.json，
+不再混在用户配置里，运行时写入不会改动 config.json 和它的备份！
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+
+from astrbot.api import logger
+
+from ..utils.ttl_cache import TTLCache
+from .task_registry import TASK_REMOVED, TaskEvent
+
+# 旧版本写在配置里的运行时状态键前缀喵～ 🏷️
+PROCESSED_IDS_PREFIX = "processed_message_ids_"
+IMAGE_CACHE_PREFIX = "img_cache_"
+
+# 每个任务最多保留的已处理消息ID数量喵～ 📋
+MAX_PROCESSED_PER_TASK = 100
+
+# 图片路径缓存：临时文件2小时后会被清理，过期时间和它保持一致喵～ 🖼️
+IMAGE_PATH_TTL = 7200
+IMAGE_PATH_MAX_ENTRIES = 2048
+
+
+def _image_key(url: str) -> str:
+    """按URL生成稳定的缓存键，重启后依然有效喵～ 🔑"""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+class RuntimeState:
+    """
+    运行时状态存储喵～ 🗄️
+    和用户配置分开保存，有变化时才写文件，由定期保存任务统一落盘！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📋 按任务记录已处理的消息ID，判断是否处理过只需要查一次字典
+    - 🖼️ 记住图片URL下载到的本地路径，避免重复下载
+    - 🔄 把旧版本写在 config.json 里的运行时状态搬过来
+    - 📣 任务被删除时同时删掉它的状态
+
+    Note:
+        文件先写到临时文件再替换，中途失败不会留下半个文件喵～ 💾
+    """
+
+    def __init__(self, data_dir: str):
+        """
+        初始化运行时状态喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            data_dir: 插件数据目录，状态保存在其中的 runtime_state.json 喵
+        """
+        self.state_path = os.path.join(data_dir, "runtime_state.json")
+        self._processed: dict[str, list[dict]] = {}
+        # 消息ID -> 记录它的任务数，用来 O(1) 判断是否处理过喵～ 🔍
+        self._seen: Counter = Counter()
+        self._images = TTLCache(max_entries=IMAGE_PATH_MAX_ENTRIES, ttl=IMAGE_PATH_TTL)
+        self._dirty = False
+
+    @property
+    def dirty(self) -> bool:
+        """是否有还没保存的变化喵～ ✏️"""
+        return self._dirty
+
+    def load(self) -> None:
+        """
+        从文件加载运行时状态喵～ 📥
+        """
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+            for task_id, records in data.get("processed_message_ids", {}).items():
+                self._set_processed(task_id, records)
+            for key, (path, expires_at) in data.get("image_paths", {}).items():
+                self._images.set_until(key, path, expires_at)
+            self._images.purge_expired()
+            logger.debug(
+                f"已加载运行时状态: {len(self._processed)} 个任务的消息ID, "
+                f"{len(self._images)} 个图片路径喵～ ✅"
+            )
+        except Exception as e:
+            logger.error(f"加载运行时状态失败喵: {e} 😿")
+
+    def save(self) -> bool:
+        """
+        把运行时状态保存到文件喵～ 💾
+
+        Returns:
+            写了文件返回True，没有变化或失败时返回False喵
+        """
+        if not self._dirty:
+            return False
+        try:
+            data = {
+                "processed_message_ids": self._processed,
+                "image_paths": {
+                    key: [path, expires_at]
+                    for key, path, expires_at in self._images.items()
+                },
+            }
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.state_path)
+            self._dirty = False
+            logger.debug(f"运行时状态已保存到 {self.state_path} 喵～ 💫")
+            return True
+        except Exception as e:
+            logger.error(f"保存运行时状态失败喵: {e} 😿")
+            return False
+
+    def absorb_config(self, config: dict) -> bool:
+        """
+        把旧版本保存在配置里的运行时状态移出来喵～ 🔄
+
+        Args:
+            config: 插件配置，会被原地修改喵
+
+        Returns:
+            配置有改动需要保存时返回True喵
+
+        Note:
+            旧的 img_cache_ 键用的是每次启动都会变的 hash()，重启后已经无法命中，直接丢弃喵～ 🗑️
+        """
+        changed = False
+        dropped_images = 0
+        for key in list(config):
+            if key.startswith(PROCESSED_IDS_PREFIX):
+                records = config.pop(key)
+                task_id = key[len(PROCESSED_IDS_PREFIX) :]
+                merged = self._processed.get(task_id, []) + (
+                    records if isinstance(records, list) else []
+                )
+                self._set_processed(task_id, merged)
+                changed = True
+            elif key.startswith(IMAGE_CACHE_PREFIX):
+                config.pop(key)
+                dropped_images += 1
+                changed = True
+
+        if changed:
+            self._dirty = True
+            logger.info(
+                f"已把配置里的运行时状态移到 {os.path.basename(self.state_path)}"
+                f"（丢弃 {dropped_images} 个失效的图片缓存键）喵～ 📦"
+            )
+        return changed
+
+    def _set_processed(self, task_id: str, records: list) -> None:
+        """替换一个任务的已处理消息ID记录并更新索引喵～ 📋"""
+        task_id = str(task_id)
+        for record in self._processed.pop(task_id, []):
+            self._unsee(record["id"])
+        kept = [
+            {"id": str(record["id"]), "timestamp": record.get("timestamp", 0)}
+            for record in records
+            if isinstance(record, dict) and record.get("id") is not None
+        ][-MAX_PROCESSED_PER_TASK:]
+        if kept:
+            self._processed[task_id] = kept
+            self._seen.update(record["id"] for record in kept)
+
+    def _unsee(self, message_id: str) -> None:
+        self._seen[message_id] -= 1
+        if self._seen[message_id] <= 0:
+            del self._seen[message_id]
+
+    def is_processed(self, message_id) -> bool:
+        """
+        检查消息是否被任何任务处理过喵～ 🔍
+
+        Args:
+            message_id: 消息ID喵
+
+        Returns:
+            处理过返回True喵
+        """
+        return str(message_id) in self._seen
+
+    def mark_processed(self, task_id, message_id, timestamp: float | None = None):
+        """
+        记录任务处理过的消息ID喵～ 📝
+
+        Args:
+            task_id: 任务ID喵
+            message_id: 消息ID喵
+            timestamp: 处理时间，默认为当前时间喵
+
+        Note:
+            每个任务只保留最近的 MAX_PROCESSED_PER_TASK 条记录喵～ 📋
+        """
+        records = self._processed.setdefault(str(task_id), [])
+        message_id = str(message_id)
+        records.append({"id": message_id, "timestamp": int(timestamp or time.time())})
+        self._seen[message_id] += 1
+        while len(records) > MAX_PROCESSED_PER_TASK:
+            self._unsee(records.pop(0)["id"])
+        self._dirty = True
+
+    def processed_count(self) -> int:
+        """已处理消息ID的记录总数喵～ 🔢"""
+        return sum(len(records) for records in self._processed.values())
+
+    def cleanup_processed(self, cutoff: float) -> dict[str, int]:
+        """
+        清理指定时间之前的已处理消息ID喵～ 🧹
+
+        Args:
+            cutoff: 早于这个时间戳的记录会被删除喵
+
+        Returns:
+            任务ID -> 删除的记录数，只包含有删除的任务喵
+        """
+        removed = {}
+        for task_id, records in list(self._processed.items()):
+            kept = [r for r in records if r.get("timestamp", 0) > cutoff]
+            if len(kept) != len(records):
+                removed[task_id] = len(records) - len(kept)
+                self._set_processed(task_id, kept)
+        if removed:
+            self._dirty = True
+        return removed
+
+    def remove_task(self, task_id) -> None:
+        """
+        删除一个任务的运行时状态喵～ 🗑️
+
+        Args:
+            task_id: 任务ID喵
+        """
+        task_id = str(task_id)
+        if task_id in self._processed:
+            logger.info(f"删除任务 {task_id} 的processed_message_ids")
+            self._set_processed(task_id, [])
+            self._dirty = True
+
+    def on_task_event(self, event: TaskEvent) -> None:
+        """
+        任务变更事件的回调，任务被删除时一起删除它的状态喵～ 📣
+
+        Args:
+            event: 任务变更事件喵
+        """
+        if event.kind == TASK_REMOVED:
+            self.remove_task(event.task_id)
+
+    def get_image_path(self, url: str) -> str:
+        """
+        获取图片URL之前下载到的本地路径喵～ 🖼️
+
+        Args:
+            url: 图片URL喵
+
+        Returns:
+            本地路径，没有记录或文件已经不存在时返回空字符串喵
+        """
+        key = _image_key(url)
+        path = self._images.get(key, "")
+        if path and not os.path.exists(path):
+            # 临时文件已经被清理了喵～ 🧹
+            self._images.pop(key)
+            self._dirty = True
+            return ""
+        return path
+
+    def set_image_path(self, url: str, path: str) -> None:
+        """
+        记住图片URL下载到的本地路径喵～ 💾
+
+        Args:
+            url: 图片URL喵
+            path: 本地文件路径喵
+        """
+        self._images.set(_image_key(url), path)
+        self._dirty = True
@@ -0,0 +1,446 @@
+"""
+转发任务注册表模块喵～ 📇
+把 config["tasks"] 里的任务字典校验成带类型的视图，按ID建字典、按监听对象建倒排索引，
+命令修改任务后发布变更事件，索引只更新变了的那个任务！
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from astrbot.api import logger
+
+# 变更事件类型喵～ 📣
+TASK_ADDED = "added"
+TASK_UPDATED = "updated"
+TASK_REMOVED = "removed"
+
+# 群聊和私聊会话ID的前缀喵～ 🏷️
+_GROUP_PREFIXES = ("aiocqhttp:GroupMessage:", "aiocqhttp:group_message:")
+_FRIEND_PREFIXES = ("aiocqhttp:FriendMessage:", "aiocqhttp:friend_message:")
+
+
+def _id_list(task_id: str, name: str, value: Any) -> tuple[str, ...]:
+    """把ID列表规范成字符串元组，格式不对时记警告并当作空列表喵～ 🧹"""
+    if value is None:
+        return ()
+    if not isinstance(value, list | tuple | set | frozenset):
+        logger.warning(f"任务 {task_id} 的 {name} 不是列表，已忽略喵: {value!r} ⚠️")
+        return ()
+    return tuple(str(item) for item in value if item not in (None, ""))
+
+
+def _id_set(task_id: str, name: str, value: Any) -> frozenset[str]:
+    """把监听列表规范成字符串集合喵～ 🧹"""
+    return frozenset(_id_list(task_id, name, value))
+
+
+@dataclass(frozen=True)
+class TaskConfig:
+    """
+    校验过的转发任务视图喵～ 📋
+    监听对象都是字符串集合，判断是否监听只需要查集合！ ฅ(^•ω•^ฅ
+
+    Note:
+        raw 是 config["tasks"] 里的原始字典，持久化和其他模块仍然使用它；
+        修改 raw 之后要调用 TaskRegistry.task_changed 重新生成视图喵～ ⚠️
+    """
+
+    id: str
+    name: str
+    enabled: bool
+    monitor_groups: frozenset[str]
+    monitor_private_users: frozenset[str]
+    monitor_sessions: frozenset[str]
+    monitored_users_in_groups: dict[str, frozenset[str]]
+    target_sessions: tuple[str, ...]
+    max_messages: int
+    raw: dict = field(repr=False, compare=False)
+
+    @classmethod
+    def from_dict(cls, task: dict, default_max_messages: int = 20) -> "TaskConfig":
+        """
+        从任务字典创建视图喵～ 🔍
+
+        Args:
+            task: config["tasks"] 里的任务字典喵
+            default_max_messages: 任务没有设置阈值时使用的默认值喵
+
+        Returns:
+            任务视图喵
+
+        Raises:
+            ValueError: 任务不是字典或者没有ID时喵
+        """
+        if not isinstance(task, dict):
+            raise ValueError(f"任务必须是字典: {task!r}")
+        task_id = str(task.get("id", "")).strip()
+        if not task_id:
+            raise ValueError(f"任务缺少ID: {task!r}")
+
+        max_messages = task.get("max_messages", default_max_messages)
+        if isinstance(max_messages, bool) or not isinstance(max_messages, int):
+            try:
+                max_messages = int(max_messages)
+            except (TypeError, ValueError):
+                max_messages = 0
+        if max_messages <= 0:
+            logger.warning(
+                f"任务 {task_id} 的 max_messages 无效，使用默认值 {default_max_messages} 喵 ⚠️"
+            )
+            max_messages = default_max_messages
+
+        users_in_groups = task.get("monitored_users_in_groups") or {}
+        if not isinstance(users_in_groups, dict):
+            logger.warning(
+                f"任务 {task_id} 的 monitored_users_in_groups 不是字典，已忽略喵 ⚠️"
+            )
+            users_in_groups = {}
+
+        return cls(
+            id=task_id,
+            name=str(task.get("name", "")),
+            enabled=bool(task.get("enabled", True)),
+            monitor_groups=_id_set(
+                task_id, "monitor_groups", task.get("monitor_groups")
+            ),
+            monitor_private_users=_id_set(
+                task_id, "monitor_private_users", task.get("monitor_private_users")
+            ),
+            monitor_sessions=_id_set(
+                task_id, "monitor_sessions", task.get("monitor_sessions")
+            ),
+            monitored_users_in_groups={
+                str(group): users
+                for group, value in users_in_groups.items()
+                if (
+                    users := _id_set(
+                        task_id, f"monitored_users_in_groups[{group}]", value
+                    )
+                )
+            },
+            target_sessions=_id_list(
+                task_id, "target_sessions", task.get("target_sessions")
+            ),
+            max_messages=max_messages,
+            raw=task,
+        )
+
+    def route_keys(self) -> set[tuple[str, str]]:
+        """
+        任务在倒排索引里登记的键喵～ 🗝️
+
+        Returns:
+            ("g", 群) / ("p", 用户) / ("s", 会话) / ("gu", 群或会话) 组成的集合喵
+        """
+        keys = {("g", group) for group in self.monitor_groups}
+        keys.update(("p", user) for user in self.monitor_private_users)
+        keys.update(("s", session) for session in self.monitor_sessions)
+        keys.update(("gu", group) for group in self.monitored_users_in_groups)
+        return keys
+
+    def monitors_group_user(
+        self, group_id: str, session_id: str, sender_id: str
+    ) -> bool:
+        """
+        检查是否监听群内的这个用户喵～ 🎯
+
+        Args:
+            group_id: 群号喵
+            session_id: 完整会话ID喵
+            sender_id: 发送者ID喵
+
+        Returns:
+            发送者在监听列表中返回True喵
+
+        Note:
+            先按纯群号查找，纯群号没有配置时再按完整会话ID查找喵～ 🔍
+        """
+        users = self.monitored_users_in_groups.get(
+            group_id
+        ) or self.monitored_users_in_groups.get(session_id)
+        return bool(users) and sender_id in users
+
+
+@dataclass(frozen=True)
+class TaskEvent:
+    """
+    任务变更事件喵～ 📣
+    """
+
+    kind: str
+    task_id: str
+    task: TaskConfig | None = None
+
+
+class TaskRegistry:
+    """
+    转发任务注册表喵～ 📇
+    按ID查任务是 O(1)，已启用任务列表和监听倒排索引都是缓存的！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 🔍 get：按ID（字符串或整数）查找任务字典
+    - ✅ enabled：按配置顺序返回已启用的任务，只在任务变化后重建
+    - 🗺️ route：用倒排索引找出应该监听某条消息的已启用任务，不用逐个任务判断
+    - 📣 subscribe：其他模块订阅任务的增删改事件
+
+    Note:
+        命令修改任务字典之后调用 task_changed，添加和删除用 add、remove；
+        注册表先更新自己的索引，再通知订阅者喵～ 📋
+    """
+
+    def __init__(self, config: dict):
+        """
+        初始化注册表喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            config: 插件配置，任务保存在 config["tasks"] 中喵
+        """
+        self.config = config
+        self._views: dict[str, TaskConfig] = {}
+        self._order: dict[str, int] = {}
+        self._index: dict[tuple[str, str], set[str]] = {}
+        self._enabled: tuple[dict, ...] | None = None
+        self._subscribers: list[Callable[[TaskEvent], None]] = []
+        self._next_order = 0
+        self.reload()
+
+    def reload(self) -> None:
+        """
+        按 config["tasks"] 重建全部视图和索引喵～ 🔄
+
+        Note:
+            无效的任务会被跳过并记录警告，但仍然保留在配置里喵～ ⚠️
+        """
+        self._views.clear()
+        self._order.clear()
+        self._index.clear()
+        self._enabled = None
+        self._next_order = 0
+        for task in self.config.get("tasks", []):
+            self._put(task, replace=False)
+
+    def _view(self, task: dict) -> TaskConfig | None:
+        """校验任务字典，无效时返回None喵～ 🔍"""
+        try:
+            return TaskConfig.from_dict(
+                task, self.config.get("default_max_messages", 20)
+            )
+        except ValueError as e:
+            logger.warning(f"跳过无效的转发任务喵: {e} ⚠️")
+            return None
+
+    def _put(self, task: dict, replace: bool = True) -> TaskConfig | None:
+        """登记或替换一个任务的视图和索引喵～ 📥"""
+        view = self._view(task)
+        if view is None:
+            return None
+        old = self._views.get(view.id)
+        if old is not None and not replace and old.raw is not task:
+            # ID重复时和原来的线性查找一样，只认第一个任务喵～ ⚠️
+            logger.warning(f"任务ID {view.id} 重复，只使用第一个任务喵 ⚠️")
+            return None
+        if old is not None:
+            self._unindex(old)
+        else:
+            self._order[view.id] = self._next_order
+            self._next_order += 1
+        self._views[view.id] = view
+        if view.enabled:
+            for key in view.route_keys():
+                self._index.setdefault(key, set()).add(view.id)
+        self._enabled = None
+        return view
+
+    def _unindex(self, view: TaskConfig) -> None:
+        """从倒排索引里移除一个任务喵～ 🧹"""
+        for key in view.route_keys():
+            ids = self._index.get(key)
+            if ids is not None:
+                ids.discard(view.id)
+                if not ids:
+                    del self._index[key]
+
+    def subscribe(self, callback: Callable[[TaskEvent], None]) -> None:
+        """
+        订阅任务变更事件喵～ 📣
+
+        Args:
+            callback: 接收 TaskEvent 的函数喵
+        """
+        self._subscribers.append(callback)
+
+    def _publish(self, event: TaskEvent) -> None:
+        for callback in self._subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"处理任务变更事件失败喵: {e} 😿")
+
+    def add(self, task: dict) -> TaskConfig | None:
+        """
+        添加任务到 config["tasks"] 并发布 added 事件喵～ 🆕
+
+        Args:
+            task: 任务字典喵
+
+        Returns:
+            任务视图，任务无效时返回None喵
+        """
+        self.config.setdefault("tasks", []).append(task)
+        view = self._put(task)
+        if view is not None:
+            self._publish(TaskEvent(TASK_ADDED, view.id, view))
+        return view
+
+    def remove(self, task_id) -> dict | None:
+        """
+        从 config["tasks"] 删除任务并发布 removed 事件喵～ 🗑️
+
+        Args:
+            task_id: 任务ID喵
+
+        Returns:
+            被删除的任务字典，不存在时返回None喵
+        """
+        task_id = str(task_id)
+        view = self._views.pop(task_id, None)
+        if view is None:
+            return None
+        self._unindex(view)
+        self._order.pop(task_id, None)
+        self._enabled = None
+        self.config["tasks"] = [
+            task
+            for task in self.config.get("tasks", [])
+            if not isinstance(task, dict) or str(task.get("id", "")) != task_id
+        ]
+        self._publish(TaskEvent(TASK_REMOVED, task_id, view))
+        return view.raw
+
+    def task_changed(self, task_id) -> TaskConfig | None:
+        """
+        任务字典被原地修改后重新生成视图并发布 updated 事件喵～ ✏️
+
+        Args:
+            task_id: 任务ID喵
+
+        Returns:
+            新的任务视图，任务不存在时返回None喵
+        """
+        view = self._views.get(str(task_id))
+        if view is None:
+            return None
+        view = self._put(view.raw)
+        if view is not None:
+            self._publish(TaskEvent(TASK_UPDATED, view.id, view))
+        return view
+
+    def get(self, task_id) -> dict | None:
+        """
+        按ID获取任务字典喵～ 🔍
+
+        Args:
+            task_id: 任务ID（字符串或整数）喵
+
+        Returns:
+            任务字典，不存在时返回None喵
+        """
+        view = self._views.get(str(task_id))
+        return view.raw if view is not None else None
+
+    def view(self, task_id) -> TaskConfig | None:
+        """
+        按ID获取任务视图喵～ 📋
+
+        Args:
+            task_id: 任务ID喵
+
+        Returns:
+            任务视图，不存在时返回None喵
+        """
+        return self._views.get(str(task_id))
+
+    def enabled(self) -> tuple[dict, ...]:
+        """
+        按配置顺序获取已启用的任务字典喵～ ✅
+
+        Returns:
+            已启用任务的元组，任务变化之前每次返回同一个对象喵
+        """
+        if self._enabled is None:
+            views = sorted(self._views.values(), key=lambda v: self._order[v.id])
+            self._enabled = tuple(view.raw for view in views if view.enabled)
+        return self._enabled
+
+    def max_numeric_id(self) -> int:
+        """
+        获取最大的数字任务ID喵～ 🔢
+
+        Returns:
+            最大的数字ID，没有数字ID时返回0喵
+        """
+        return max(
+            (int(task_id) for task_id in self._views if task_id.isdigit()), default=0
+        )
+
+    def route(
+        self,
+        session_id: str,
+        group_id: Any = None,
+        sender_id: Any = None,
+        is_group_message: bool = False,
+    ) -> list[dict]:
+        """
+        找出应该监听这条消息的已启用任务喵～ 🗺️
+
+        Args:
+            session_id: 完整会话ID（unified_msg_origin）喵
+            group_id: 群号，私聊时为空喵
+            sender_id: 发送者ID喵
+            is_group_message: 是否为群消息，只有群消息才检查群内用户监听喵
+
+        Returns:
+            按配置顺序排列的任务字典列表喵
+
+        Note:
+            匹配规则：群号（纯群号或会话ID格式）、完整会话ID或其中的群号在 monitor_groups 中；
+            发送者ID（纯ID或会话ID格式）、完整会话ID或其中的用户ID在 monitor_private_users 中；
+            完整会话ID在 monitor_sessions 中；或者群消息的发送者在群内用户监听列表中喵～ 📋
+        """
+        session_id = str(session_id or "")
+        group_id = str(group_id) if group_id else ""
+        sender_id = str(sender_id) if sender_id else ""
+
+        groups = {session_id}
+        users = {session_id}
+        parts = session_id.split(":")
+        if len(parts) == 3:
+            (groups if "group" in parts[1].lower() else users).add(parts[2])
+        if group_id:
+            groups.add(group_id)
+            groups.update(prefix + group_id for prefix in _GROUP_PREFIXES)
+        if sender_id:
+            users.add(sender_id)
+            users.update(prefix + sender_id for prefix in _FRIEND_PREFIXES)
+
+        index = self._index
+        matched: set[str] = set()
+        for group in groups:
+            matched.update(index.get(("g", group), ()))
+        for user in users:
+            matched.update(index.get(("p", user), ()))
+        matched.update(index.get(("s", session_id), ()))
+
+        if is_group_message:
+            for key in (group_id, session_id):
+                for task_id in index.get(("gu", key), ()):
+                    if task_id not in matched and self._views[
+                        task_id
+                    ].monitors_group_user(group_id, session_id, sender_id):
+                        matched.add(task_id)
+
+        if not matched:
+            return []
+        order = self._order
+        return [self._views[task_id].raw for task_id in sorted(matched, key=order.get)]
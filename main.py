@@ -10,8 +10,16 @@ from .commands.command_handlers import CommandHandlers
 
 # 导入解耦后的模块喵～ 📦
 from .config.config_manager import ConfigManager
+from .config.runtime_state import RuntimeState
+from .config.task_registry import TaskRegistry
+from .messaging.activity_tracker import ActivityTracker
 from .messaging.forward_manager import ForwardManager
 from .messaging.message_listener import MessageListener
+from .messaging.traffic_recorder import TrafficRecorder
+from .utils.loop_watchdog import LoopWatchdog
+from .utils.metrics import metrics
+from .utils.platform_resolver import PlatformResolver
+from .utils.profiler import PipelineProfiler
 
 
 @register(
@@ -66,11 +74,14 @@ class TurnRigPlugin(Star):
         self.config_manager = ConfigManager(self.data_dir)
 
         # 从配置文件加载或使用默认配置喵～ 📋
-        self.config = self.config_manager.load_config() or {
+        loaded_config = self.config_manager.load_config()
+        self.config = loaded_config or {
             "tasks": [],
             "default_max_messages": 20,
             "bot_self_ids": [],  # 机器人ID列表，用于防止循环发送喵～ 🤖
         }
+        # 启动时只在配置有改动（或文件还不存在）时保存一次喵～ 💾
+        config_changed = loaded_config is None
 
         # 如果收到了 AstrBot 的配置，且当前配置为空，才使用 AstrBot 配置喵～ 🔄
         if config and not self.config:
@@ -92,31 +103,40 @@ class TurnRigPlugin(Star):
             else:
                 self.config = config
 
-        # 确保配置有tasks字段喵～ 📝
-        if "tasks" not in self.config:
-            self.config["tasks"] = []
-
-        # 确保配置有default_max_messages字段喵～ 🔢
-        if "default_max_messages" not in self.config:
-            self.config["default_max_messages"] = 20
-
-        # 确保配置有bot_self_ids字段喵～ 🤖
-        if "bot_self_ids" not in self.config:
-            self.config["bot_self_ids"] = []
-
-        # 确保可配置的单条发送开关存在，默认关闭
-        if "send_single_messages" not in self.config:
-            self.config["send_single_messages"] = False
+        # 确保配置有必需的字段喵～ 📝
+        for key, default in (
+            ("tasks", []),
+            ("default_max_messages", 20),
+            ("bot_self_ids", []),
+            # 可配置的单条发送开关，默认关闭
+            ("send_single_messages", False),
+        ):
+            if key not in self.config:
+                self.config[key] = default
+                config_changed = True
 
         # 如果 AstrBot 通过 __init__ 传入了配置，则覆盖本地对应开关
         try:
             if config and isinstance(config, dict) and "send_single_messages" in config:
-                self.config["send_single_messages"] = bool(
-                    config.get("send_single_messages", False)
-                )
+                send_single = bool(config.get("send_single_messages", False))
+                if self.config["send_single_messages"] != send_single:
+                    self.config["send_single_messages"] = send_single
+                    config_changed = True
         except Exception:
             pass
 
+        # 旧版本配置只迁移一次喵～ 🔄
+        if self.config_manager.migrate_config(self.config):
+            config_changed = True
+
+        # 运行时状态（已处理消息ID、图片路径）单独保存，不再写进配置喵～ 🗄️
+        self.runtime_state = RuntimeState(self.data_dir)
+        self.runtime_state.load()
+        if self.runtime_state.absorb_config(self.config):
+            # 先保存搬出来的状态，再保存去掉它们的配置，中途失败也不会丢数据喵～ 💾
+            self.runtime_state.save()
+            config_changed = True
+
         # 如果没有任何任务，创建一个自动捕获所有消息的测试任务喵～ 🧪
         if not self.config["tasks"]:
             logger.info("没有找到任何转发任务，创建一个测试任务喵～ 🆕")
@@ -132,43 +152,81 @@ class TurnRigPlugin(Star):
                 "monitor_sessions": [],  # 新增字段，用于直接匹配session_id喵 🔍
             }
             self.config["tasks"].append(test_task)
+            config_changed = True
+
+        if config_changed:
             self.save_config_file()
 
-        # 消息缓存喵～ 💾
+        # 任务注册表：按ID查找、已启用任务和监听索引都缓存在这里喵～ 📇
+        self.task_registry = TaskRegistry(self.config)
+        self.task_registry.subscribe(self.runtime_state.on_task_event)
+
+        # 消息缓存喵～ 💾 会话在第一次使用时才转换成紧凑记录
         self.message_cache = self.config_manager.load_message_cache() or {}
 
         # 清理缓存中的无效任务喵～ 🧹
         self._cleanup_invalid_tasks_in_cache()
 
-        # 保存一次配置确保文件存在喵～ 💾
-        self.save_config_file()
+        # 会话活跃度追踪器，由消息监听器在写入缓存时更新喵～ 📈
+        self.activity_tracker = ActivityTracker()
+        for task_id, sessions in self.message_cache.items():
+            for session_id, messages in sessions.items():
+                if messages:
+                    self.activity_tracker.touch(
+                        (task_id, session_id), messages.last_timestamp() or 0
+                    )
+
         logger.info(
-            f"转发侦听器插件初始化完成，数据存储在 {self.data_dir} 目录下喵～ ✅"
+            f"转发侦听器插件初始化完成，已加载 {len(self.config.get('tasks', []))} 个转发任务，"
+            f"数据存储在 {self.data_dir} 目录下喵～ ✅"
         )
-        logger.info(f"已加载 {len(self.config.get('tasks', []))} 个转发任务喵～ 📊")
 
         # 打印所有任务的详细信息，便于调试喵～ 🔍
         for task in self.config.get("tasks", []):
-            logger.info(
-                f"任务ID: {task.get('id')}, 名称: {task.get('name')}, 启用状态: {task.get('enabled')} 喵～ 📋"
-            )
-            logger.info(f"  监听群组: {task.get('monitor_groups', [])} 喵～ 👥")
-            logger.info(f"  监听私聊: {task.get('monitor_private_users', [])} 喵～ 💬")
-            logger.info(
-                f"  群内特定用户: {task.get('monitored_users_in_groups', {})} 喵～ 👤"
+            logger.debug(
+                f"任务ID: {task.get('id')}, 名称: {task.get('name')}, 启用状态: {task.get('enabled')}, "
+                f"监听群组: {task.get('monitor_groups', [])}, "
+                f"监听私聊: {task.get('monitor_private_users', [])}, "
+                f"群内特定用户: {task.get('monitored_users_in_groups', {})}, "
+                f"转发目标: {task.get('target_sessions', [])} 喵～ 📋"
             )
-            logger.info(f"  转发目标: {task.get('target_sessions', [])} 喵～ 🎯")
+
+        # 进程内指标，插件重载时从零开始统计喵～ 📊
+        self.metrics = metrics
+        self.metrics.reset()
+
+        # 流量录制器，通过 /turnrig capture 开关喵～ 🎙️
+        self.traffic_recorder = TrafficRecorder(self.data_dir)
 
         # 创建模块实例喵～ 🏗️
+        self.platform_resolver = PlatformResolver(self.context)
         self.forward_manager = ForwardManager(self)
         self.message_listener = MessageListener(self)
         self.command_handlers = CommandHandlers(self)
 
+        # 按需性能分析，采样模式只保留经过这些入口的调用栈喵～ 🔬
+        self.profiler = PipelineProfiler(self.data_dir)
+        self.profiler.watch("listener", self.message_listener.on_all_message)
+        self.profiler.watch("forward", self.forward_manager.forward_messages)
+        self.profiler.watch(
+            "send", self.forward_manager.message_sender.send_forward_message_via_api
+        )
+
         # 启动定期保存任务喵～ ⏰
         asyncio.create_task(self.periodic_save())
 
-        # 添加一个新的循环监听任务喵～ 🔄
-        asyncio.create_task(self.message_monitor_loop())
+        # 检测长时间未活跃的会话喵～ 😴
+        asyncio.create_task(self.session_idle_loop())
+
+        # 按配置定期导出 Prometheus 指标文件喵～ 📤
+        asyncio.create_task(self.metrics_export_loop())
+
+        # 可选的事件循环看门狗，测量延迟并定位阻塞调用喵～ 🐕
+        self.loop_watchdog = LoopWatchdog.from_config(
+            self.config, os.path.dirname(os.path.abspath(__file__))
+        )
+        if self.config.get("loop_watchdog_enabled", False):
+            self.loop_watchdog.start()
 
         # 添加消息ID清理任务喵～ 🧹
         self.cleanup_task = None
@@ -197,10 +255,10 @@ class TurnRigPlugin(Star):
                 del self.message_cache[task_id]
 
         if invalid_tasks:
+            # 不用马上保存，下一次保存缓存时会一并写入喵～ 💤
             logger.info(
                 f"已清理 {len(invalid_tasks)} 个无效任务的缓存喵: {', '.join(invalid_tasks)} 🗑️"
             )
-            self.save_message_cache()
 
     def save_config_file(self):
         """
@@ -231,49 +289,53 @@ class TurnRigPlugin(Star):
         while True:
             await asyncio.sleep(300)  # 每5分钟保存一次喵～ 😴
             self.save_message_cache()
-            self.save_config_file()  # 也保存配置喵～ ⚙️
+            # 配置只在命令修改时保存，这里只保存运行时状态喵～ 🗄️
+            self.runtime_state.save()
+            self.forward_manager.message_builder.nickname_cache.save()
             logger.debug("已完成定期保存喵～ ✅")
 
-    async def message_monitor_loop(self):
+    async def session_idle_loop(self):
         """
-        定期检查消息监听状态喵～ 🔍
-        监控长时间未活跃的会话，但不主动获取历史消息！
+        定期检测长时间未活跃的会话喵～ 😴
+        只处理活跃度追踪器堆顶已经超时的会话，不扫描整个消息缓存！
 
         Note:
-            这个任务会帮助清理过期的会话状态喵～ 🧹
+            空闲阈值由 session_idle_seconds 配置（默认1小时），
+            每个会话空闲后只报告一次，再次收到消息后重新追踪喵～ 📈
         """
         while True:
+            await asyncio.sleep(60)
             try:
-                # 检查长时间未活跃会话喵～ 📊
-                for task_id, sessions in self.message_cache.items():
-                    for session_id, messages in sessions.items():
-                        if not messages:
-                            logger.debug(
-                                f"跳过空缓存会话 {session_id} 在任务 {task_id} 中"
-                            )
-                            continue
-
-                        # 简单使用最后一条消息的时间戳喵～
-                        last_message_timestamp = messages[-1].get("timestamp", 0)
-
-                        # 检查是否真的超过1小时未活动喵～ ⏰
-                        if (
-                            last_message_timestamp > 0
-                            and time.time() - last_message_timestamp > 3600
-                        ):
-                            logger.debug(
-                                f"会话 {session_id} 在任务 {task_id} 中超过1小时未活动"
-                            )
-
-                # 移除主动获取历史消息的功能
-                # 只依赖消息监听器来记录新消息
-
+                idle_seconds = self.config.get("session_idle_seconds", 3600)
+                for (task_id, session_id), last_seen in self.activity_tracker.pop_idle(
+                    idle_seconds
+                ):
+                    logger.debug(
+                        f"会话 {session_id} 在任务 {task_id} 中已有 "
+                        f"{int(time.time() - last_seen)} 秒未活动喵～ 😴"
+                    )
             except Exception as e:
-                logger.error(f"消息监听循环错误: {e}")
+                logger.error(f"检测未活跃会话时出错喵: {e} 😿")
 
-            await asyncio.sleep(
-                60
-            )  # 每60秒检查一次，因为不再主动获取消息，可以降低频率
+    async def metrics_export_loop(self):
+        """
+        定期把指标写成 Prometheus 文本文件喵～ 📤
+
+        Note:
+            只有配置了 metrics_prometheus_file 才会写文件，相对路径以插件数据目录为准喵！ 📁
+        """
+        while True:
+            interval = max(5, self.config.get("metrics_export_interval", 60))
+            await asyncio.sleep(interval)
+            path = self.config.get("metrics_prometheus_file", "")
+            if not path:
+                continue
+            try:
+                if not os.path.isabs(path):
+                    path = os.path.join(self.data_dir, path)
+                self.metrics.write_prometheus(path)
+            except Exception as e:
+                logger.error(f"导出 Prometheus 指标失败喵: {e} 😿")
 
     async def _fetch_latest_messages(self, platform, msg_type, chat_id):
         """
@@ -313,10 +375,7 @@ class TurnRigPlugin(Star):
         Returns:
             找到的任务字典，如果不存在则返回None喵
         """
-        for task in self.config.get("tasks", []):
-            if str(task.get("id")) == str(task_id):
-                return task
-        return None
+        return self.task_registry.get(task_id)
 
     def get_all_enabled_tasks(self):
         """
@@ -324,11 +383,9 @@ class TurnRigPlugin(Star):
         返回当前启用状态的所有任务！
 
         Returns:
-            已启用的任务列表喵～
+            已启用的任务元组喵～ 任务没有变化时每次返回同一个对象，不要修改它
         """
-        return [
-            task for task in self.config.get("tasks", []) if task.get("enabled", True)
-        ]
+        return self.task_registry.enabled()
 
     def get_max_task_id(self):
         """
@@ -341,16 +398,7 @@ class TurnRigPlugin(Star):
         Note:
             如果没有任务，返回0喵～ 🆕
         """
-        max_id = 0
-        for task in self.config.get("tasks", []):
-            try:
-                task_id = int(task.get("id", 0))
-                if task_id > max_id:
-                    max_id = task_id
-            except (ValueError, TypeError):
-                # 如果任务ID不是数字，跳过喵～ ⏭️
-                continue
-        return max_id
+        return self.task_registry.max_numeric_id()
 
     def start_cleanup_task(self):
         """
@@ -394,35 +442,17 @@ class TurnRigPlugin(Star):
         Note:
             只清理真正过期的记录，保证功能正常喵～ ✨
         """
-        current_time = time.time()
-        cutoff_time = current_time - (days * 24 * 3600)  # days天前的时间戳喵
-        cleaned_count = 0
+        cutoff_time = time.time() - (days * 24 * 3600)  # days天前的时间戳喵
 
         # 清理所有任务的过期消息ID记录喵～ 🔍
-        for key in list(self.config.keys()):
-            if key.startswith("processed_message_ids_"):
-                processed_ids = self.config[key]
-                if isinstance(processed_ids, list):
-                    original_count = len(processed_ids)
-                    # 过滤出未过期的记录喵～ 📋
-                    self.config[key] = [
-                        item
-                        for item in processed_ids
-                        if isinstance(item, dict)
-                        and item.get("timestamp", 0) > cutoff_time
-                    ]
-                    removed_count = original_count - len(self.config[key])
-                    cleaned_count += removed_count
-
-                    if removed_count > 0:
-                        task_id = key.replace("processed_message_ids_", "")
-                        logger.info(
-                            f"任务 {task_id} 清理了 {removed_count} 个过期消息ID记录喵～ 🗑️"
-                        )
-
-        # 如果清理了记录，保存配置喵～ 💾
+        removed = self.runtime_state.cleanup_processed(cutoff_time)
+        for task_id, removed_count in removed.items():
+            logger.info(f"任务 {task_id} 清理了 {removed_count} 个过期消息ID记录喵～ 🗑️")
+        cleaned_count = sum(removed.values())
+
+        # 如果清理了记录，保存运行时状态喵～ 💾
         if cleaned_count > 0:
-            self.save_config_file()
+            self.runtime_state.save()
             logger.info(f"总共清理了 {cleaned_count} 个过期消息ID记录喵～ ✅")
 
         return cleaned_count
@@ -474,11 +504,25 @@ class TurnRigPlugin(Star):
         try:
             # 保存所有数据喵～ 💾
             self.save_message_cache()
-            self.save_config_file()
+            self.runtime_state.save()
 
             # 保存失败消息缓存喵～ 🔄
             if hasattr(self, "forward_manager") and self.forward_manager:
                 self.forward_manager.save_failed_messages_cache()
+                self.forward_manager.message_builder.nickname_cache.save()
+                self.forward_manager.retry_manager.stop()
+                self.forward_manager.stop()
+                # 停止发送队列，未投递的任务留在队列里下次继续喵～ 📮
+                await self.forward_manager.send_queue.close()
+
+            # 停止流量录制，确保 gzip 文件完整喵～ 🎙️
+            self.traffic_recorder.stop()
+
+            # 停止事件循环看门狗喵～ 🐕
+            self.loop_watchdog.stop()
+
+            # 停止性能分析并写出文件喵～ 🔬
+            self.profiler.stop()
 
             # 取消清理任务喵～ ❌
             if self.cleanup_task and not self.cleanup_task.done():
@@ -521,13 +565,19 @@ class TurnRigPlugin(Star):
                     return
 
                 # 检查是否为机器人的回复消息（避免循环）喵～ 🤖
+                # 事件里的 self_id 变化说明适配器重连了，顺便刷新平台缓存喵～ 🔄
+                self.platform_resolver.observe_self_id(
+                    "aiocqhttp", getattr(event.message_obj, "self_id", None)
+                )
                 sender_id = event.get_sender_id()
-                if sender_id == str(
-                    self.context.get_platform("aiocqhttp").get_client().self_id
-                ):
+                if sender_id == self.platform_resolver.get_self_id("aiocqhttp"):
                     logger.debug("跳过机器人自己的消息喵～ 🤖")
                     return
 
+            # 录制模式下先记下监听器看到的事件喵～ 🎙️
+            if self.traffic_recorder.active:
+                self.traffic_recorder.record(event)
+
             # 委托给消息监听器处理喵～ 📨
             await self.message_listener.on_all_message(event)
 
@@ -671,6 +721,49 @@ class TurnRigPlugin(Star):
             event, task_id, threshold
         )
 
+    @turnrig.command("flush")
+    async def set_flush(
+        self,
+        event: AstrMessageEvent,
+        task_id: str = None,
+        max_wait_seconds: int = None,
+        max_batch_bytes: int = None,
+    ):
+        """设置最长等待时间和批次大小上限喵～ ⏰"""
+        return await self.command_handlers.handle_set_flush(
+            event, task_id, max_wait_seconds, max_batch_bytes
+        )
+
+    @turnrig.command("metrics")
+    async def show_metrics(self, event: AstrMessageEvent, action: str = None):
+        """查看或重置运行指标喵～ 📊"""
+        return await self.command_handlers.handle_metrics(event, action)
+
+    @turnrig.command("sendstats")
+    async def show_send_stats(
+        self, event: AstrMessageEvent, chat_type: str = None, chat_id: str = None
+    ):
+        """查看各发送策略的成功率和耗时喵～ 📡"""
+        return await self.command_handlers.handle_send_stats(event, chat_type, chat_id)
+
+    @turnrig.command("capture")
+    async def capture_traffic(
+        self, event: AstrMessageEvent, action: str = None, option: str = None
+    ):
+        """录制消息流量用于离线回放喵～ 🎙️"""
+        return await self.command_handlers.handle_capture(event, action, option)
+
+    @turnrig.command("profile")
+    async def profile_pipeline(
+        self,
+        event: AstrMessageEvent,
+        action: str = None,
+        option: str = None,
+        mode: str = None,
+    ):
+        """按需采集监听和转发流水线的性能数据喵～ 🔬"""
+        return await self.command_handlers.handle_profile(event, action, option, mode)
+
     @turnrig.command("rename")
     async def rename_task(
         self, event: AstrMessageEvent, task_id: str = None, new_name: str = None
@@ -0,0 +1,112 @@
+"""
+会话活跃度追踪模块喵～ 📈
+消息写入缓存时记录会话的最后活跃时间，用最小堆找出长时间未活跃的会话！
+"""
+
+import heapq
+import time
+from collections.abc import Hashable
+
+
+class ActivityTracker:
+    """
+    会话活跃度追踪器喵～ 📈
+    每个会话在堆里最多只有一个条目，检测空闲会话时只处理堆顶过期的部分！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - ✍️ 收到消息时 O(1) 更新会话的最后活跃时间
+    - 😴 按空闲时长找出未活跃的会话，每个会话只报告一次
+    - 🧹 不再需要定期扫描所有任务和会话的缓存
+
+    Note:
+        堆条目的时间可能比实际的最后活跃时间旧，弹出时发现会话又活跃过，
+        就按新的时间重新放回堆里喵～ ✨
+    """
+
+    def __init__(self):
+        """
+        初始化活跃度追踪器喵！(ฅ^•ω•^ฅ)
+        """
+        # 会话键 -> 最后活跃时间喵～ ⏰
+        self._last_seen: dict[Hashable, float] = {}
+        # (堆条目时间, 会话键)，每个会话最多一个条目喵～ 📋
+        self._heap: list[tuple[float, Hashable]] = []
+        # 已经在堆里的会话喵～ 🏷️
+        self._queued: set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._last_seen)
+
+    def touch(self, key: Hashable, timestamp: float | None = None):
+        """
+        记录会话的一次活跃喵～ ✍️
+
+        Args:
+            key: 会话键，例如 (任务ID, 会话ID) 喵
+            timestamp: 活跃时间戳，为None时使用当前时间喵
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if timestamp < self._last_seen.get(key, 0):
+            return
+        self._last_seen[key] = timestamp
+        if key not in self._queued:
+            self._queued.add(key)
+            heapq.heappush(self._heap, (timestamp, key))
+
+    def forget(self, key: Hashable):
+        """
+        停止追踪一个会话喵～ 🗑️
+
+        Args:
+            key: 会话键喵
+
+        Note:
+            堆里的旧条目会在下次检测时被惰性丢弃喵～ 🧹
+        """
+        self._last_seen.pop(key, None)
+
+    def last_seen(self, key: Hashable) -> float | None:
+        """
+        获取会话的最后活跃时间喵～ 🔍
+
+        Args:
+            key: 会话键喵
+
+        Returns:
+            最后活跃时间戳，没有记录时返回None喵
+        """
+        return self._last_seen.get(key)
+
+    def pop_idle(
+        self, idle_seconds: float, now: float | None = None
+    ) -> list[tuple[Hashable, float]]:
+        """
+        弹出空闲超过指定时长的会话喵～ 😴
+
+        Args:
+            idle_seconds: 空闲时长阈值（秒）喵
+            now: 当前时间戳，为None时使用当前时间喵
+
+        Returns:
+            [(会话键, 最后活跃时间), ...]，按空闲时长从长到短排列喵
+
+        Note:
+            弹出的会话不再被追踪，直到它再次收到消息喵！ 📭
+        """
+        now = time.time() if now is None else now
+        cutoff = now - idle_seconds
+        idle = []
+        while self._heap and self._heap[0][0] <= cutoff:
+            _, key = heapq.heappop(self._heap)
+            last_seen = self._last_seen.get(key)
+            if last_seen is None:
+                # 已经被 forget 的会话喵～
+                self._queued.discard(key)
+            elif last_seen > cutoff:
+                # 之后又活跃过，按新的时间放回去喵～ 🔄
+                heapq.heappush(self._heap, (last_seen, key))
+            else:
+                self._queued.discard(key)
+                del self._last_seen[key]
+                idle.append((key, last_seen))
+        return idle
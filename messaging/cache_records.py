@@ -0,0 +1,295 @@
+"""
+消息缓存的紧凑记录类型喵～ 🗜️
+缓存里的每条消息和每个消息组件都用带 __slots__ 的记录保存，比普通字典省内存！
+
+这个小工具会帮你：
+- 📦 用 CachedMessage 保存缓存消息的固定字段
+- 🧩 用 CompactRecord 保存消息组件和 OneBot 字段，相同键集合共享同一个键元组
+- 🔤 驻留重复出现的字符串（平台、消息类型、发送者名称等）
+- 🔄 和原来的 JSON 格式互相转换，文件格式保持不变
+
+Note:
+    两种记录都实现了 Mapping 接口，原来按字典读取的代码（get、[]、in）不需要修改喵！ ✨
+"""
+
+import sys
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any
+
+# 这些字段的字符串值重复率很高，驻留后所有记录共享同一个对象喵～ 🔤
+_INTERNED_FIELDS = frozenset(
+    {
+        "type",
+        "platform",
+        "message_type",
+        "sub_type",
+        "notice_type",
+        "sender_name",
+        "sender_id",
+        "name",
+        "qq",
+        "summary",
+    }
+)
+
+# 键集合 -> 共享的键元组喵～ 📋
+_SHAPES: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+_MISSING = object()
+
+
+def _intern_value(key: str, value: Any) -> Any:
+    if key in _INTERNED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def _shape(keys: tuple[str, ...]) -> tuple[str, ...]:
+    shape = _SHAPES.get(keys)
+    if shape is None:
+        shape = _SHAPES[keys] = tuple(sys.intern(key) for key in keys)
+    return shape
+
+
+class CompactRecord(MutableMapping):
+    """
+    紧凑的字典式记录喵～ 🧩
+    键元组按键集合共享，每条记录只保存一个值元组！ ฅ(^•ω•^ฅ
+
+    Note:
+        用于消息组件和 onebot_fields；嵌套的 data、nodes 等保持原样喵～ 📦
+    """
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, data: Mapping | None = None):
+        """
+        根据字典创建记录喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            data: 原始字典喵
+        """
+        data = data or {}
+        self._keys = _shape(tuple(data))
+        self._values = tuple(_intern_value(key, data[key]) for key in self._keys)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        value = _intern_value(key, value)
+        try:
+            index = self._keys.index(key)
+        except ValueError:
+            self._keys = _shape((*self._keys, key))
+            self._values = (*self._values, value)
+        else:
+            self._values = (
+                *self._values[:index],
+                value,
+                *self._values[index + 1 :],
+            )
+
+    def __delitem__(self, key: str) -> None:
+        try:
+            index = self._keys.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+        self._keys = _shape(self._keys[:index] + self._keys[index + 1 :])
+        self._values = self._values[:index] + self._values[index + 1 :]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            return default
+
+    def to_dict(self) -> dict:
+        """
+        转换回普通字典喵～ 🔄
+
+        Returns:
+            和原来 JSON 格式一致的字典喵
+        """
+        return {
+            key: to_plain(value)
+            for key, value in zip(self._keys, self._values, strict=True)
+        }
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+class CachedMessage(MutableMapping):
+    """
+    缓存中的一条消息喵～ 📦
+    常用字段放在 __slots__ 里，不常见的字段放进 extra 字典！ ฅ(^•ω•^ฅ
+
+    Note:
+        没有赋值的字段保持未设置状态，JSON 格式和原来的字典完全一致喵～ 💾
+    """
+
+    FIELDS = (
+        "id",
+        "timestamp",
+        "sender_name",
+        "sender_id",
+        "messages",
+        "message_outline",
+        "onebot_fields",
+    )
+
+    __slots__ = (*FIELDS, "extra")
+
+    def __init__(self, **fields):
+        """
+        创建缓存消息喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            **fields: 消息字段，不在 FIELDS 里的字段会放进 extra 喵
+        """
+        self.extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "CachedMessage":
+        """
+        把原来格式的消息字典转换成记录喵～ 🔄
+
+        Args:
+            data: 消息字典喵
+
+        Returns:
+            缓存消息记录喵
+        """
+        if isinstance(data, cls):
+            return data
+        return cls(**data)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "messages" and isinstance(value, list):
+            value = [to_record(comp) for comp in value]
+        elif key == "onebot_fields" and isinstance(value, Mapping):
+            value = to_record(value)
+        else:
+            value = _intern_value(key, value)
+
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.FIELDS and hasattr(self, key):
+            delattr(self, key)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self.FIELDS:
+            return hasattr(self, key)
+        return bool(self.extra) and key in self.extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> dict:
+        """
+        转换回普通字典喵～ 🔄
+
+        Returns:
+            和原来 JSON 格式一致的字典喵
+        """
+        return {key: to_plain(self[key]) for key in self}
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+def to_record(value: Any) -> Any:
+    """
+    把消息组件字典转换成紧凑记录喵～ 🧩
+
+    Args:
+        value: 组件字典或其他值喵
+
+    Returns:
+        字典会变成 CompactRecord，其他值原样返回喵
+    """
+    if isinstance(value, dict):
+        return CompactRecord(value)
+    return value
+
+
+def to_plain(value: Any) -> Any:
+    """
+    把记录（以及其中嵌套的记录）转换回普通字典和列表喵～ 🔄
+
+    Args:
+        value: 任意值喵
+
+    Returns:
+        可以直接 JSON 序列化的值喵
+    """
+    if isinstance(value, CompactRecord | CachedMessage):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """
+    给 json.dump 使用的 default 函数，遇到记录时转换成字典喵～ 💾
+
+    Args:
+        value: json 无法直接序列化的值喵
+
+    Returns:
+        转换后的字典喵
+
+    Raises:
+        TypeError: 不是缓存记录时抛出，和 json 的默认行为一致喵
+    """
+    if isinstance(value, CompactRecord | CachedMessage):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
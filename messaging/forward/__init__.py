@@ -3,15 +3,25 @@
 """
 
 from .cache_manager import CacheManager
+from .circuit_breaker import CircuitBreaker
 from .download_helper import DownloadHelper
 from .message_builder import MessageBuilder
 from .message_sender import MessageSender
 from .retry_manager import RetryManager
+from .retry_scheduler import RetryScheduler
+from .send_queue import SendQueue
+from .send_telemetry import SendTelemetry
+from .snapshot_media import SnapshotMediaStore
 
 __all__ = [
     "CacheManager",
+    "CircuitBreaker",
     "DownloadHelper",
     "MessageBuilder",
     "MessageSender",
     "RetryManager",
+    "RetryScheduler",
+    "SendQueue",
+    "SendTelemetry",
+    "SnapshotMediaStore",
 ]
@@ -1,6 +1,7 @@
 import asyncio
 import json
 import os
+import time
 
 from astrbot.api import logger
 
@@ -17,9 +18,14 @@ class CacheManager:
     - 🧹 定期清理过期数据
 
     Note:
-        所有失败的消息都会被可爱地保存起来，等待重试喵！ ✨
+        失败记录按 (目标会话, 任务ID, 源会话, 批次哈希) 建立索引，增删查都是 O(1)；
+        记录里会保存失败批次的节点快照，重试时原样重发；
+        修改后不会立刻写文件，而是合并成一次延迟写入喵！ ✨
     """
 
+    # 修改后延迟多久写入文件（秒），期间的多次修改会合并成一次喵～ ⏱️
+    SAVE_DELAY = 5
+
     def __init__(self, plugin):
         """
         初始化缓存管理器喵！(ฅ^•ω•^ฅ)
@@ -28,7 +34,10 @@ class CacheManager:
             plugin: 插件实例，提供配置和数据路径喵～
         """
         self.plugin = plugin
-        self.failed_messages_cache = {}  # 失败消息的小仓库喵～ 📦
+        # (目标会话, 任务ID, 源会话, 批次哈希) -> 失败记录，保持插入顺序喵～ 📦
+        self._entries: dict[tuple[str, str, str, str], dict] = {}
+        self._dirty = False
+        self._save_handle: asyncio.TimerHandle | None = None
         self.cache_path = os.path.join(
             self.plugin.data_dir, "failed_messages_cache.json"
         )
@@ -39,6 +48,22 @@ class CacheManager:
         # 启动定期保存任务喵～ ⏰
         asyncio.create_task(self.periodic_cache_operations())
 
+    @property
+    def failed_messages_cache(self) -> dict[str, list[dict]]:
+        """
+        按目标会话分组的失败消息视图喵～ 📋
+
+        Returns:
+            {目标会话: [失败记录, ...]} 字典喵
+
+        Note:
+            这是根据索引临时生成的视图，增删列表元素不会影响缓存喵！ ⚠️
+        """
+        grouped: dict[str, list[dict]] = {}
+        for (target_session, *_), entry in self._entries.items():
+            grouped.setdefault(target_session, []).append(entry)
+        return grouped
+
     def load_failed_messages_cache(self):
         """
         从文件加载失败消息缓存喵～ 📥
@@ -53,27 +78,33 @@ class CacheManager:
                 with open(self.cache_path, encoding="utf-8") as f:
                     cache_data = json.load(f)
 
-                    self.failed_messages_cache = {}
-                    # 一个一个重建缓存条目喵～ 🔧
-                    for target_session, messages in cache_data.items():
-                        self.failed_messages_cache[target_session] = []
-                        for msg in messages:
-                            self.failed_messages_cache[target_session].append(
-                                {
-                                    "task_id": msg["task_id"],
-                                    "source_session": msg["source_session"],
-                                    "timestamp": msg["timestamp"],
-                                    "retry_count": msg["retry_count"],
-                                }
-                            )
-
-                    logger.info(
-                        f"已从文件加载 {len(self.failed_messages_cache)} 个失败会话的缓存喵～ ✅"
-                    )
+                self._entries = {}
+                # 一个一个重建缓存条目喵～ 🔧
+                for target_session, messages in cache_data.items():
+                    for msg in messages:
+                        entry = {
+                            "task_id": msg["task_id"],
+                            "source_session": msg["source_session"],
+                            "timestamp": msg["timestamp"],
+                            "retry_count": msg["retry_count"],
+                            "last_retry_time": msg.get("last_retry_time", 0),
+                            "next_retry_time": msg.get("next_retry_time", 0),
+                            "batch_hash": msg.get("batch_hash", ""),
+                            "payload": msg.get("payload"),
+                        }
+                        key = (
+                            target_session,
+                            entry["task_id"],
+                            entry["source_session"],
+                            entry["batch_hash"],
+                        )
+                        self._entries[key] = entry
+
+                logger.info(f"已从文件加载 {len(self._entries)} 条失败消息缓存喵～ ✅")
         except Exception as e:
             # 加载缓存失败了喵，创建空缓存 😿
             logger.error(f"加载失败消息缓存时出错喵: {e}")
-            self.failed_messages_cache = {}
+            self._entries = {}
 
     def save_failed_messages_cache(self):
         """
@@ -81,36 +112,70 @@ class CacheManager:
         把所有的失败消息安全地存储起来！
 
         Note:
-            会自动处理序列化和文件写入喵～ ✨
+            会立即写入并取消等待中的延迟写入喵～ ✨
         """
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
         try:
             # 序列化缓存数据喵～ 📋
             serialized_cache = {}
-            for target_session, messages in self.failed_messages_cache.items():
-                serialized_cache[target_session] = []
-                for msg in messages:
-                    serialized_cache[target_session].append(
-                        {
-                            "task_id": msg["task_id"],
-                            "source_session": msg["source_session"],
-                            "timestamp": msg["timestamp"],
-                            "retry_count": msg["retry_count"],
-                        }
-                    )
-
-            # 写入文件喵～ 📝
-            with open(self.cache_path, "w", encoding="utf-8") as f:
-                json.dump(serialized_cache, f, ensure_ascii=False, indent=2)
+            for (target_session, *_), msg in self._entries.items():
+                record = {
+                    "task_id": msg["task_id"],
+                    "source_session": msg["source_session"],
+                    "timestamp": msg["timestamp"],
+                    "retry_count": msg["retry_count"],
+                    "last_retry_time": msg.get("last_retry_time", 0),
+                    "next_retry_time": msg.get("next_retry_time", 0),
+                }
+                # 只有带快照的记录才写入批次信息，旧格式保持不变喵～ 📸
+                if msg.get("payload") is not None:
+                    record["batch_hash"] = msg.get("batch_hash", "")
+                    record["payload"] = msg["payload"]
+                serialized_cache.setdefault(target_session, []).append(record)
+
+            # 先写临时文件再替换，避免写到一半损坏喵～ 📝
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(serialized_cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
 
             logger.debug(f"已将失败消息缓存保存到 {self.cache_path} 喵～ 💫")
         except Exception as e:
             # 保存失败了喵！好可惜 😿
             logger.error(f"保存失败消息缓存时出错喵: {e}")
 
+    def mark_dirty(self):
+        """
+        标记缓存已修改，稍后合并写入文件喵～ ⏱️
+
+        Note:
+            SAVE_DELAY 秒内的多次修改只会触发一次写入喵！ 💫
+        """
+        self._dirty = True
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有运行中的事件循环时直接保存喵～ 💾
+            self.save_failed_messages_cache()
+            return
+        self._save_handle = loop.call_later(self.SAVE_DELAY, self._flush)
+
+    def _flush(self):
+        """延迟写入的回调喵～ 💾"""
+        self._save_handle = None
+        if self._dirty:
+            self.save_failed_messages_cache()
+
     async def periodic_cache_operations(self):
         """
         定期保存缓存喵～ ⏰
-        每30分钟自动保存一次，确保数据不丢失！
+        每30分钟检查一次，有未保存的修改时写入文件！
 
         Note:
             这是一个后台任务，会一直运行喵～ 🔄
@@ -119,13 +184,20 @@ class CacheManager:
             try:
                 # 睡眠30分钟喵～ 😴
                 await asyncio.sleep(1800)  # 每30分钟保存一次（原来是15分钟）
-                self.save_failed_messages_cache()
+                if self._dirty:
+                    self.save_failed_messages_cache()
             except Exception as e:
                 # 定期操作失败了喵 😿
                 logger.error(f"定期缓存操作失败喵: {e}")
 
     def add_failed_message(
-        self, target_session: str, task_id: str, source_session: str
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        next_retry_time: float = 0,
+        batch_hash: str = "",
+        payload: dict | None = None,
     ):
         """
         添加失败消息到缓存喵～ 📝
@@ -135,6 +207,9 @@ class CacheManager:
             target_session: 目标会话ID喵
             task_id: 任务ID喵
             source_session: 源会话ID喵
+            next_retry_time: 计划的下一次重试时间戳喵
+            batch_hash: 失败批次的哈希喵
+            payload: 失败批次的发送快照（节点等），重试时原样重发喵
 
         Returns:
             如果是新记录返回True，重复记录返回False喵
@@ -142,38 +217,32 @@ class CacheManager:
         Note:
             会自动避免重复添加相同的失败记录喵！ 🔍
         """
-        # 确保目标会话有缓存列表喵～ 📋
-        if target_session not in self.failed_messages_cache:
-            self.failed_messages_cache[target_session] = []
-
-        # 检查是否已经有相同的失败记录喵～ 🔍
-        is_duplicate = False
-        for existing_item in self.failed_messages_cache[target_session]:
-            if (
-                existing_item["task_id"] == task_id
-                and existing_item["source_session"] == source_session
-            ):
-                is_duplicate = True
-                break
-
-        # 如果不是重复记录，就添加到缓存喵～ ✨
-        if not is_duplicate:
-            cache_item = {
-                "task_id": task_id,
-                "source_session": source_session,
-                "timestamp": int(asyncio.get_event_loop().time()),
-                "retry_count": 0,
-            }
-            self.failed_messages_cache[target_session].append(cache_item)
-            logger.info(
-                f"已将消息添加到失败缓存，将在稍后重试发送到 {target_session} 喵～ 🔄"
-            )
-            self.save_failed_messages_cache()
-
-        return not is_duplicate
+        key = (target_session, task_id, source_session, batch_hash)
+        if key in self._entries:
+            return False
+
+        self._entries[key] = {
+            "task_id": task_id,
+            "source_session": source_session,
+            "timestamp": int(time.time()),
+            "retry_count": 0,
+            "last_retry_time": 0,
+            "next_retry_time": next_retry_time,
+            "batch_hash": batch_hash,
+            "payload": payload,
+        }
+        logger.info(
+            f"已将消息添加到失败缓存，将在稍后重试发送到 {target_session} 喵～ 🔄"
+        )
+        self.mark_dirty()
+        return True
 
     def remove_failed_message(
-        self, target_session: str, task_id: str, source_session: str
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        batch_hash: str = "",
     ):
         """
         从缓存中移除失败消息喵～ 🗑️
@@ -183,34 +252,46 @@ class CacheManager:
             target_session: 目标会话ID喵
             task_id: 任务ID喵
             source_session: 源会话ID喵
+            batch_hash: 批次哈希，旧格式记录为空字符串喵
 
         Returns:
             成功移除返回True，未找到返回False喵
-
-        Note:
-            如果会话的所有失败消息都被移除，会删除整个会话缓存喵～ 🧹
         """
-        if target_session in self.failed_messages_cache:
-            # 查找并移除匹配的消息喵～ 🔍
-            for cached_msg in list(self.failed_messages_cache[target_session]):
-                if (
-                    cached_msg["task_id"] == task_id
-                    and cached_msg["source_session"] == source_session
-                ):
-                    self.failed_messages_cache[target_session].remove(cached_msg)
+        if (
+            self._entries.pop(
+                (target_session, task_id, source_session, batch_hash), None
+            )
+            is None
+        ):
+            return False
+        self.mark_dirty()
+        return True
+
+    def find_failed_message(
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        batch_hash: str = "",
+    ) -> dict | None:
+        """
+        查找指定的失败消息记录喵～ 🔍
 
-            # 如果会话没有失败消息了，就删除整个会话缓存喵～ 🧹
-            if not self.failed_messages_cache[target_session]:
-                del self.failed_messages_cache[target_session]
+        Args:
+            target_session: 目标会话ID喵
+            task_id: 任务ID喵
+            source_session: 源会话ID喵
+            batch_hash: 批次哈希，旧格式记录为空字符串喵
 
-            self.save_failed_messages_cache()
-            return True
-        return False
+        Returns:
+            找到的记录字典，不存在时返回None喵
+        """
+        return self._entries.get((target_session, task_id, source_session, batch_hash))
 
     def get_all_failed_messages(self):
         """
         获取所有失败消息喵～ 📋
-        返回完整的失败消息缓存！
+        返回按目标会话分组的失败消息缓存！
 
         Returns:
             失败消息缓存字典喵～
@@ -220,29 +301,56 @@ class CacheManager:
         """
         return self.failed_messages_cache
 
-    def increment_retry_count(self, target_session: str, message_index: int):
+    def increment_retry_count(
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        batch_hash: str = "",
+    ):
         """
         增加重试计数喵～ 🔢
-        每次重试失败后，都会增加重试计数！
+        每次重试时都会增加重试计数，并记录重试时间！
 
         Args:
             target_session: 目标会话ID喵
-            message_index: 消息在缓存中的索引喵
+            task_id: 任务ID喵
+            source_session: 源会话ID喵
+            batch_hash: 批次哈希，旧格式记录为空字符串喵
 
         Returns:
-            更新后的重试计数喵
+            更新后的重试计数，记录不存在时返回0喵
 
         Note:
-            重试次数太多的消息可能会被放弃喵～ ⚠️
+            按键查找记录，重试过程中增删其他记录也不会错位喵～ ✨
         """
-        if target_session in self.failed_messages_cache and message_index < len(
-            self.failed_messages_cache[target_session]
-        ):
-            # 增加重试计数喵～ ➕
-            self.failed_messages_cache[target_session][message_index][
-                "retry_count"
-            ] += 1
-            return self.failed_messages_cache[target_session][message_index][
-                "retry_count"
-            ]
-        return 0
+        entry = self._entries.get((target_session, task_id, source_session, batch_hash))
+        if entry is None:
+            return 0
+        entry["retry_count"] = entry.get("retry_count", 0) + 1
+        entry["last_retry_time"] = time.time()
+        self.mark_dirty()
+        return entry["retry_count"]
+
+    def update_next_retry_time(
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        next_retry_time: float,
+        batch_hash: str = "",
+    ):
+        """
+        更新下一次重试时间喵～ 📅
+
+        Args:
+            target_session: 目标会话ID喵
+            task_id: 任务ID喵
+            source_session: 源会话ID喵
+            next_retry_time: 下一次重试的时间戳喵
+            batch_hash: 批次哈希喵
+        """
+        entry = self._entries.get((target_session, task_id, source_session, batch_hash))
+        if entry is not None:
+            entry["next_retry_time"] = next_retry_time
+            self.mark_dirty()
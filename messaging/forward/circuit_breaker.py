@@ -0,0 +1,281 @@
+"""
+目标会话熔断器模块喵～ 🔌
+连续失败或收到致命错误码的目标会被暂时熔断，避免每批消息都跑完整套发送策略！
+"""
+
+import time
+from dataclasses import dataclass
+
+from astrbot.api import logger
+
+# 表示目标本身不可用的错误信息片段（被踢出群、被禁言、目标不存在等）喵～ 🚫
+FATAL_ERROR_MARKERS = (
+    "GROUP_NOT_FOUND",
+    "USER_NOT_FOUND",
+    "not in group",
+    "群不存在",
+    "群聊不存在",
+    "不在群",
+    "被移出",
+    "被踢",
+    "禁言",
+    "不是好友",
+)
+
+
+def extract_retcode(error) -> int | None:
+    """
+    从 OneBot 调用异常中提取错误码喵～ 🔍
+
+    Args:
+        error: call_action 抛出的异常或失败响应喵
+
+    Returns:
+        错误码，无法识别时返回None喵
+    """
+    retcode = getattr(error, "retcode", None)
+    if retcode is None:
+        result = getattr(error, "result", None)
+        if isinstance(error, dict):
+            result = error
+        if isinstance(result, dict):
+            retcode = result.get("retcode")
+    try:
+        return int(retcode) if retcode is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def describe_error(error) -> str:
+    """
+    把 OneBot 调用异常整理成一行描述喵～ 📝
+
+    Args:
+        error: call_action 抛出的异常或失败响应喵
+
+    Returns:
+        包含错误信息和 wording 的字符串喵
+    """
+    parts = [str(error)]
+    result = error if isinstance(error, dict) else getattr(error, "result", None)
+    if isinstance(result, dict):
+        for key in ("msg", "message", "wording"):
+            value = result.get(key)
+            if value and str(value) not in parts[0]:
+                parts.append(str(value))
+    return " | ".join(parts)
+
+
+@dataclass
+class CircuitState:
+    """
+    单个目标会话的熔断状态喵～ 📋
+    """
+
+    state: str = "closed"
+    failures: int = 0
+    open_until: float = 0.0
+    reset_timeout: float = 0.0
+    probe_started: float = 0.0
+    last_error: str = ""
+    last_retcode: int | None = None
+    last_failure_time: float = 0.0
+
+
+class CircuitBreaker:
+    """
+    按目标会话划分的熔断器喵～ 🔌
+    closed → open → half_open → closed，打开期间的发送会被直接推迟！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📉 连续失败达到阈值后熔断目标
+    - 🚫 收到致命错误码或错误信息时立即熔断
+    - 🔍 冷却时间结束后只放行一次探测发送
+    - ⏰ 探测失败时冷却时间翻倍，直到上限
+
+    Note:
+        相关配置: circuit_breaker_threshold、circuit_breaker_reset_timeout、
+        circuit_breaker_max_reset_timeout、circuit_breaker_fatal_retcodes 喵～ ⚙️
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    # 探测发送一直没有结果时，多久后允许再探测一次（秒）喵～ ⏱️
+    PROBE_TIMEOUT = 120
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 300,
+        max_reset_timeout: float = 3600,
+        fatal_retcodes: tuple[int, ...] = (1400, 1403),
+    ):
+        """
+        初始化熔断器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            failure_threshold: 连续失败多少次后熔断喵
+            reset_timeout: 首次熔断的冷却秒数喵
+            max_reset_timeout: 冷却秒数的上限喵
+            fatal_retcodes: 立即熔断的 OneBot 错误码喵
+        """
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = max(1.0, float(reset_timeout))
+        self.max_reset_timeout = max(self.reset_timeout, float(max_reset_timeout))
+        self.fatal_retcodes = {int(code) for code in fatal_retcodes}
+        self._circuits: dict[str, CircuitState] = {}
+
+    @classmethod
+    def from_config(cls, config) -> "CircuitBreaker":
+        """
+        根据插件配置创建熔断器喵～ ⚙️
+
+        Args:
+            config: 插件配置字典喵
+
+        Returns:
+            熔断器实例喵
+        """
+        return cls(
+            failure_threshold=config.get("circuit_breaker_threshold", 3),
+            reset_timeout=config.get("circuit_breaker_reset_timeout", 300),
+            max_reset_timeout=config.get("circuit_breaker_max_reset_timeout", 3600),
+            fatal_retcodes=tuple(
+                config.get("circuit_breaker_fatal_retcodes", [1400, 1403])
+            ),
+        )
+
+    def is_fatal(self, error) -> bool:
+        """
+        判断错误是否说明目标本身不可用喵～ 🚫
+
+        Args:
+            error: call_action 抛出的异常或失败响应喵
+
+        Returns:
+            是致命错误返回True喵
+        """
+        if error is None:
+            return False
+        if extract_retcode(error) in self.fatal_retcodes:
+            return True
+        text = describe_error(error)
+        return any(marker in text for marker in FATAL_ERROR_MARKERS)
+
+    def allow(self, target_session: str) -> bool:
+        """
+        判断现在能否向目标发送喵～ 🚦
+
+        Args:
+            target_session: 目标会话ID喵
+
+        Returns:
+            可以发送返回True；熔断中或已有探测在进行时返回False喵
+
+        Note:
+            冷却结束后第一次调用会转入半开状态并放行一次探测，
+            探测结果由 record_success / record_failure 记录喵！ 🔍
+        """
+        circuit = self._circuits.get(target_session)
+        if circuit is None or circuit.state == self.CLOSED:
+            return True
+        if circuit.state == self.OPEN:
+            if time.time() < circuit.open_until:
+                return False
+            circuit.state = self.HALF_OPEN
+            circuit.probe_started = 0.0
+            logger.info(f"目标 {target_session} 熔断冷却结束，尝试探测发送喵～ 🔍")
+        now = time.time()
+        if circuit.probe_started and now - circuit.probe_started < self.PROBE_TIMEOUT:
+            return False
+        circuit.probe_started = now
+        return True
+
+    def retry_after(self, target_session: str) -> float:
+        """
+        获取距离下一次允许发送的秒数喵～ ⏰
+
+        Args:
+            target_session: 目标会话ID喵
+
+        Returns:
+            需要等待的秒数，可以立即发送时为0喵
+        """
+        circuit = self._circuits.get(target_session)
+        if circuit is None or circuit.state == self.CLOSED:
+            return 0.0
+        if circuit.state == self.HALF_OPEN:
+            # 探测进行中，稍后再看结果喵～
+            return 5.0 if circuit.probe_started else 0.0
+        return max(0.0, circuit.open_until - time.time())
+
+    def record_success(self, target_session: str):
+        """
+        记录一次发送成功，闭合熔断器喵～ ✅
+
+        Args:
+            target_session: 目标会话ID喵
+        """
+        circuit = self._circuits.pop(target_session, None)
+        if circuit is not None and circuit.state != self.CLOSED:
+            logger.info(f"目标 {target_session} 发送恢复，熔断器已闭合喵～ ✅")
+
+    def record_failure(self, target_session: str, error=None):
+        """
+        记录一次发送失败喵～ 😿
+
+        Args:
+            target_session: 目标会话ID喵
+            error: 最近一次的错误（异常或失败响应），可以为None喵
+
+        Note:
+            半开状态下的探测失败或致命错误会立即重新熔断喵！ ⚠️
+        """
+        circuit = self._circuits.setdefault(target_session, CircuitState())
+        circuit.failures += 1
+        circuit.last_failure_time = time.time()
+        circuit.probe_started = 0.0
+        if error is not None:
+            circuit.last_error = describe_error(error)[:200]
+            circuit.last_retcode = extract_retcode(error)
+
+        fatal = self.is_fatal(error)
+        if circuit.state == self.HALF_OPEN:
+            # 探测失败，冷却时间翻倍喵～ ⏰
+            timeout = min(self.max_reset_timeout, circuit.reset_timeout * 2)
+        elif fatal or circuit.failures >= self.failure_threshold:
+            timeout = self.reset_timeout
+        else:
+            return
+
+        circuit.state = self.OPEN
+        circuit.reset_timeout = timeout
+        circuit.open_until = time.time() + timeout
+        logger.warning(
+            f"目标 {target_session} 已熔断 {timeout:.0f} 秒喵"
+            f"（连续失败 {circuit.failures} 次{'，致命错误' if fatal else ''}）: "
+            f"{circuit.last_error or '未知错误'} 🔌"
+        )
+
+    def get_state(self, target_session: str) -> str:
+        """
+        获取目标的熔断状态喵～ 🔍
+
+        Args:
+            target_session: 目标会话ID喵
+
+        Returns:
+            closed / open / half_open 喵
+        """
+        circuit = self._circuits.get(target_session)
+        return circuit.state if circuit else self.CLOSED
+
+    def snapshot(self) -> dict[str, CircuitState]:
+        """
+        获取所有非闭合（或有失败记录）目标的状态喵～ 📊
+
+        Returns:
+            {目标会话: 熔断状态} 字典喵
+        """
+        return dict(self._circuits)
@@ -1,11 +1,25 @@
 import asyncio
 import os
+import time
 import traceback
 import uuid
 
-import requests  # 添加requests库喵～ 📚
 from astrbot.api import logger
 
+from ...utils.metrics import metrics
+
+
+def _http_get(url: str, **kwargs):
+    """
+    用 requests 发起 GET 请求喵～ 📡
+
+    Note:
+        在线程里调用，requests 到第一次下载时才导入，不拖慢插件启动喵～ ⚡
+    """
+    import requests
+
+    return requests.get(url, **kwargs)
+
 
 class DownloadHelper:
     """
@@ -57,6 +71,7 @@ class DownloadHelper:
         Note:
             会尝试多种下载方式，确保文件能正确下载喵！ 🔄
         """
+        started = time.perf_counter()
         try:
             # 生成唯一文件名喵～ 🆔
             filename = f"{uuid.uuid4()}.{file_type}"
@@ -75,7 +90,7 @@ class DownloadHelper:
             # 方法1: 使用requests直接下载喵～ 📡
             try:
                 response = await asyncio.to_thread(
-                    requests.get,
+                    _http_get,
                     url,
                     timeout=30,
                     headers={
@@ -101,6 +116,7 @@ class DownloadHelper:
                                 f"下载的GIF文件头无效，可能不是真正的GIF喵: {filepath} ⚠️"
                             )
 
+                    self._record_download(started, len(response.content))
                     return filepath
                 else:
                     logger.warning(
@@ -138,6 +154,7 @@ class DownloadHelper:
                 ):
                     if is_gif:
                         logger.info(f"使用curl成功下载GIF喵: {filepath} ✅")
+                    self._record_download(started, os.path.getsize(filepath))
                     return filepath
                 else:
                     stderr_text = stderr.decode() if stderr else "未知错误"
@@ -145,6 +162,8 @@ class DownloadHelper:
             except Exception as e:
                 logger.warning(f"curl下载异常喵: {e} 😿")
 
+            metrics.inc("downloads_total", result="failed")
+
             # 如果是GIF，更倾向于返回原始URL喵～ 🔗
             if is_gif and is_qq_multimedia:
                 logger.info(f"GIF下载失败，直接使用原始URL喵: {url} 📎")
@@ -157,6 +176,13 @@ class DownloadHelper:
             logger.error(traceback.format_exc())
             return ""
 
+    @staticmethod
+    def _record_download(started: float, size: int):
+        """记录一次成功下载的字节数和耗时喵～ 📊"""
+        metrics.inc("downloads_total", result="ok")
+        metrics.inc("download_bytes_total", size)
+        metrics.observe("download_seconds", time.perf_counter() - started)
+
     async def download_image(self, image_url: str) -> str:
         """
         下载图片到本地临时目录喵～ 🖼️
@@ -188,10 +214,10 @@ class DownloadHelper:
                 return ""
 
         # 检查缓存以避免重复下载喵～ 🔍
-        cache_key = f"img_cache_{hash(image_url)}"
-        if hasattr(self, "plugin") and self.plugin and hasattr(self.plugin, "config"):
-            cached_path = self.plugin.config.get(cache_key, "")
-            if cached_path and os.path.exists(cached_path):
+        runtime_state = getattr(getattr(self, "plugin", None), "runtime_state", None)
+        if runtime_state is not None:
+            cached_path = runtime_state.get_image_path(image_url)
+            if cached_path:
                 logger.debug(f"使用缓存的图片喵: {cached_path} 💾")
                 return cached_path
 
@@ -208,12 +234,8 @@ class DownloadHelper:
                 result = await self.download_file(image_url, file_type)
                 if result:
                     # 缓存结果喵～ 💾
-                    if (
-                        hasattr(self, "plugin")
-                        and self.plugin
-                        and hasattr(self.plugin, "config")
-                    ):
-                        self.plugin.config[cache_key] = result
+                    if runtime_state is not None:
+                        runtime_state.set_image_path(image_url, result)
                     return result
 
                 logger.warning(f"下载图片失败，尝试 {attempt + 1}/3 喵～ 🔄")
@@ -17,8 +17,10 @@ import base64
 import json
 import os
 import time
+from collections.abc import Mapping
 
 from .download_helper import DownloadHelper
+from .nickname_cache import NicknameCache
 
 try:
     from astrbot.api import logger
@@ -58,6 +60,8 @@ class MessageBuilder:
         else:
             self.download_helper = download_helper
         self.plugin = plugin
+        # @ 提及的昵称缓存喵～ 🏷️
+        self.nickname_cache = NicknameCache(plugin)
 
     async def build_forward_node(self, msg_data: dict) -> dict:
         """
@@ -94,7 +98,7 @@ class MessageBuilder:
 
         # 处理消息内容，提取所有类型的消息组件喵～ 🔍
         for i, comp in enumerate(serialized_message):
-            if isinstance(comp, dict):
+            if isinstance(comp, Mapping):
                 comp_type = comp.get("type", "")
 
                 # 处理不同类型的组件喵～ 🎯
@@ -332,7 +336,7 @@ class MessageBuilder:
             logger.info(
                 f"处理转发消息节点喵: {comp.get('data', {}).get('name', '未知用户')} 📋"
             )
-            return comp
+            return dict(comp)
 
         # 其他未知类型
         else:
@@ -665,45 +669,14 @@ class MessageBuilder:
             logger.info(f"直接使用现有昵称: '{at_name.strip()}'")
             return at_name.strip()
 
-        logger.info(f"昵称为空，尝试通过API获取用户 {at_qq} 的昵称")
-
-        # 如果没有昵称但有QQ号，尝试通过API获取
+        # 如果没有昵称但有QQ号，先查昵称缓存，未命中时才调用API喵～ 🏷️
         if at_qq and self.plugin:
             try:
-                # 获取aiocqhttp客户端
-                client = self.plugin.context.get_platform("aiocqhttp")
-                if client:
-                    logger.debug("找到aiocqhttp平台客户端")
-                    bot_client = client.get_client()
-                    if bot_client:
-                        logger.debug(f"开始调用get_stranger_info API，用户ID: {at_qq}")
-                        # 尝试获取用户信息
-                        user_info = await bot_client.call_action(
-                            action="get_stranger_info", user_id=int(at_qq)
-                        )
-
-                        logger.debug(f"API返回结果: {user_info}")
-                        # 尝试多个可能的昵称字段，优先检查nickname字段
-                        nickname = None
-                        if user_info:
-                            # 尝试不同的昵称字段名，nickname优先
-                            for nick_field in ["nickname", "nick", "name"]:
-                                if nick_field in user_info:
-                                    nickname = user_info[nick_field]
-                                    if nickname and nickname.strip():
-                                        logger.info(
-                                            f"成功获取用户 {at_qq} 的昵称 (字段: {nick_field}): {nickname}"
-                                        )
-                                        return nickname.strip()
-
-                        if not nickname:
-                            logger.warning(
-                                f"API返回的用户信息中没有可用的昵称字段，可用字段: {list(user_info.keys()) if user_info else 'None'}"
-                            )
-                    else:
-                        logger.warning("无法获取bot_client")
-                else:
-                    logger.warning("无法找到aiocqhttp平台客户端")
+                nickname = await self.nickname_cache.get_nickname(
+                    str(at_qq), self._fetch_stranger_nickname
+                )
+                if nickname:
+                    return nickname
             except Exception as e:
                 logger.error(f"获取用户 {at_qq} 昵称失败: {e}")
                 import traceback
@@ -717,3 +690,45 @@ class MessageBuilder:
         # 如果都获取不到，返回一个通用的用户显示名称而不是QQ号
         logger.info(f"无法获取昵称，使用通用显示名称代替QQ号: {at_qq}")
         return str(at_qq) if at_qq else "未知用户"
+
+    async def _fetch_stranger_nickname(self, at_qq: str) -> str | None:
+        """通过 get_stranger_info 获取用户昵称
+
+        Args:
+            at_qq: 用户QQ号
+
+        Returns:
+            str | None: 用户昵称，没有可用昵称时返回空字符串，
+                暂时拿不到客户端时返回None（不会被缓存）
+
+        Raises:
+            Exception: API调用失败时抛出，失败结果不会被缓存
+        """
+        logger.info(f"昵称缓存未命中，尝试通过API获取用户 {at_qq} 的昵称")
+
+        # 获取aiocqhttp客户端
+        bot_client = self.plugin.platform_resolver.get_client("aiocqhttp")
+        if not bot_client:
+            logger.warning("无法获取bot_client")
+            return None
+
+        logger.debug(f"开始调用get_stranger_info API，用户ID: {at_qq}")
+        user_info = await bot_client.call_action(
+            action="get_stranger_info", user_id=int(at_qq)
+        )
+
+        logger.debug(f"API返回结果: {user_info}")
+        # 尝试多个可能的昵称字段，优先检查nickname字段
+        if user_info:
+            for nick_field in ["nickname", "nick", "name"]:
+                nickname = user_info.get(nick_field)
+                if nickname and str(nickname).strip():
+                    logger.info(
+                        f"成功获取用户 {at_qq} 的昵称 (字段: {nick_field}): {nickname}"
+                    )
+                    return str(nickname).strip()
+
+        logger.warning(
+            f"API返回的用户信息中没有可用的昵称字段，可用字段: {list(user_info.keys()) if user_info else 'None'}"
+        )
+        return ""
@@ -1,14 +1,19 @@
 import asyncio
 import base64
 import os
-import threading
+import time
 import traceback
 import uuid
-from collections import defaultdict
 
 from astrbot.api import logger
 from astrbot.api.message_components import Plain
 
+from ...utils.metrics import metrics
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import RateLimiter
+from .send_telemetry import SendTelemetry
+from .sent_tracker import SentMessageTracker, node_key
+
 
 class MessageSender:
     """
@@ -40,19 +45,21 @@ class MessageSender:
         """
         self.plugin = plugin
         self.download_helper = download_helper
-        # 使用线程安全的消息跟踪字典，按会话ID分组喵～ 🔒
-        self._message_tracking_lock = threading.RLock()
-        self._sent_message_ids = defaultdict(set)
-        # 初始化消息时间戳记录字典喵～ ⏰
-        self._message_timestamps = {}
-        # 设置消息ID过期时间（秒）喵～ 📅
-        self._message_expiry_seconds = 3600  # 一小时后过期喵
+        # 按目标会话记录已发送的批次和节点，条数和有效期都有上限喵～ 📝
+        self._sent_messages = SentMessageTracker.from_config(self.plugin.config)
+        # 单条发送的令牌桶限速器，按目标会话限速喵～ 🚦
+        self._send_rate_limiter = RateLimiter.from_config(self.plugin.config)
+        # 按目标会话的熔断器，以及每个目标最近一次的发送错误喵～ 🔌
+        self.circuit_breaker = CircuitBreaker.from_config(self.plugin.config)
+        self.last_send_errors = {}
+        # 每次发送尝试的策略遥测，保存在有界环形缓冲里喵～ 📡
+        self.telemetry = SendTelemetry.from_config(self.plugin.config)
         # 启动清理任务喵～ 🧹
         self._start_cleanup_task()
 
     def _start_cleanup_task(self):
         """
-        启动定期清理过期消息ID的任务喵～ 🧹
+        启动定期清理过期发送记录的任务喵～ 🧹
         每30分钟自动清理一次过期记录！
 
         Note:
@@ -73,83 +80,80 @@ class MessageSender:
 
     def _cleanup_expired_message_ids(self):
         """
-        清理过期的消息ID记录喵～ 🗑️
-        删除超过一小时的旧记录，释放内存！
-
-        Note:
-            使用线程锁确保并发安全喵！ 🔒
+        清理过期的发送记录喵～ 🗑️
+        删除超过有效期的旧记录，释放内存！
         """
-        import time
-
-        current_time = time.time()
-        with self._message_tracking_lock:
-            expired_sessions = []
-
-            # 遍历所有会话的时间戳记录喵～ 🔍
-            for session_id, timestamp in list(self._message_timestamps.items()):
-                if current_time - timestamp > self._message_expiry_seconds:
-                    expired_sessions.append(session_id)
-
-            # 删除过期会话的记录喵～ 🗂️
-            for session_id in expired_sessions:
-                if session_id in self._sent_message_ids:
-                    del self._sent_message_ids[session_id]
-                if session_id in self._message_timestamps:
-                    del self._message_timestamps[session_id]
-
-            if expired_sessions:
-                logger.info(
-                    f"已清理 {len(expired_sessions)} 个过期会话的消息记录喵～ ✅"
-                )
+        removed = self._sent_messages.cleanup()
+        if removed:
+            logger.info(f"已清理 {removed} 条过期的发送记录喵～ ✅")
+        # 顺便删除已经补满的空闲限速桶喵～ 🪣
+        pruned = self._send_rate_limiter.prune()
+        if pruned:
+            logger.debug(f"已清理 {pruned} 个空闲的限速桶喵～ 🧹")
 
     def _add_sent_message(self, session_id: str, message_id: str):
         """
-        线程安全地添加已发送消息记录喵～ 📝
+        添加已发送消息记录喵～ 📝
         防止消息重复发送！
 
         Args:
             session_id: 会话ID喵
-            message_id: 消息ID喵
-
-        Note:
-            会同时更新会话的最后活动时间喵！ ⏰
+            message_id: 批次哈希或节点内容生成的去重键喵
         """
-        import time
-
-        with self._message_tracking_lock:
-            self._sent_message_ids[session_id].add(message_id)
-            # 更新会话最后活动时间喵～ 🔄
-            self._message_timestamps[session_id] = time.time()
+        self._sent_messages.add(session_id, message_id)
 
     def _is_message_sent(self, session_id: str, message_id: str) -> bool:
         """
-        线程安全地检查消息是否已发送喵～ 🔍
+        检查消息是否已发送喵～ 🔍
         避免重复发送相同消息！
 
         Args:
             session_id: 会话ID喵
-            message_id: 消息ID喵
+            message_id: 批次哈希或节点内容生成的去重键喵
 
         Returns:
             True表示已发送，False表示未发送喵～
         """
-        with self._message_tracking_lock:
-            return message_id in self._sent_message_ids.get(session_id, set())
+        return self._sent_messages.contains(session_id, message_id)
 
     def _clear_session_messages(self, session_id: str):
         """
-        线程安全地清除特定会话的消息记录喵～ 🧹
+        清除特定会话的消息记录喵～ 🧹
         清空指定会话的发送历史！
 
         Args:
             session_id: 要清理的会话ID喵
+        """
+        self._sent_messages.clear(session_id)
+
+    def _mark_nodes_sent(self, target_session: str, nodes_list: list[dict]):
+        """
+        合并转发成功后把所有节点记为已发送喵～ ✅
+
+        Args:
+            target_session: 目标会话ID喵
+            nodes_list: 原始节点列表喵
 
         Note:
-            通常在开始新的转发任务时使用喵！ 🔄
+            使用和逐条发送相同的内容键，同一批次改走备选方案时不会重复发送喵！ 🔁
         """
-        with self._message_tracking_lock:
-            if session_id in self._sent_message_ids:
-                self._sent_message_ids[session_id].clear()
+        for node in nodes_list:
+            if node.get("type") == "node":
+                self._add_sent_message(target_session, node_key(node))
+
+    def _note_send_error(self, target_session: str, error) -> bool:
+        """
+        记录目标最近一次的发送错误喵～ 📝
+
+        Args:
+            target_session: 目标会话ID喵
+            error: call_action 抛出的异常喵
+
+        Returns:
+            错误说明目标本身不可用（被踢、被禁言、不存在等）时返回True喵
+        """
+        self.last_send_errors[target_session] = error
+        return self.circuit_breaker.is_fatal(error)
 
     async def send_forward_message_via_api(
         self, target_session: str, nodes_list: list[dict]
@@ -183,6 +187,8 @@ class MessageSender:
 
             target_platform, target_type, target_id = target_parts
 
+            self.last_send_errors.pop(target_session, None)
+
             # 不再清空消息跟踪记录，保持去重功能
             # self._clear_session_messages(target_session)  # 注释此行以防止重复发送
 
@@ -192,7 +198,7 @@ class MessageSender:
             )
 
             # 获取客户端
-            client = self.plugin.context.get_platform("aiocqhttp").get_client()
+            client = self.plugin.platform_resolver.get_client("aiocqhttp")
 
             # 新增：预处理步骤 - 上传图片到缓存
             try:
@@ -256,15 +262,14 @@ class MessageSender:
                 except Exception as e:
                     logger.debug(f"打印调试信息失败: {e}")
 
-                response = await client.call_action(action, **payload)
+                response = await self._send_attempt(
+                    target_session, "direct", client, action, payload
+                )
 
                 if response and not isinstance(response, Exception):
                     logger.info(f"✅ 任务 {task_id}: 策略1: 使用缓存图片合并转发成功")
                     # 标记所有节点为已发送
-                    for i, node in enumerate(processed_nodes):
-                        if node.get("type") == "node":
-                            node_id = f"{task_id}_strategy1_{i}"  # 使用更稳定的ID格式
-                            self._add_sent_message(target_session, node_id)
+                    self._mark_nodes_sent(target_session, nodes_list)
 
                     return True
                 else:
@@ -283,6 +288,12 @@ class MessageSender:
                     logger.info("   将尝试策略2: GIF转静态图")
             except Exception as e:
                 logger.warning(f"❌ 任务 {task_id}: 策略1失败: {e}")
+                if self._note_send_error(target_session, e):
+                    # 目标本身不可用，其他策略也不会成功，直接放弃喵～ 🔌
+                    logger.warning(
+                        f"任务 {task_id}: 目标 {target_session} 不可用，跳过剩余发送策略喵 🚫"
+                    )
+                    return False
                 # 记录具体的错误类型喵～ 🔍
                 if "引用" in str(e) or "reply" in str(e).lower():
                     logger.warning("   错误可能与引用消息处理相关喵～ 📨")
@@ -315,14 +326,13 @@ class MessageSender:
                         "messages": downloaded_gif_nodes,
                     }
 
-                response = await client.call_action(action, **payload)
+                response = await self._send_attempt(
+                    target_session, "gif", client, action, payload
+                )
                 if response and not isinstance(response, Exception):
                     logger.info(f"✅ 任务 {task_id}: 策略2: 使用下载的原始GIF发送成功")
                     # 标记所有节点为已发送
-                    for i, node in enumerate(downloaded_gif_nodes):
-                        if node.get("type") == "node":
-                            node_id = f"{task_id}_strategy2_{i}"  # 使用更稳定的ID格式
-                            self._add_sent_message(target_session, node_id)
+                    self._mark_nodes_sent(target_session, nodes_list)
 
                     return True
                 else:
@@ -341,14 +351,13 @@ class MessageSender:
                         action = "send_private_forward_msg"
                         payload = {"user_id": int(target_id), "messages": static_nodes}
 
-                    response = await client.call_action(action, **payload)
+                    response = await self._send_attempt(
+                        target_session, "gif_static", client, action, payload
+                    )
                     if response and not isinstance(response, Exception):
                         logger.info(f"✅ 任务 {task_id}: 策略2: GIF转静态图后发送成功")
                         # 标记所有节点为已发送
-                        for i, node in enumerate(static_nodes):
-                            if node.get("type") == "node":
-                                node_id = f"{task_id}_strategy2_static_{i}"  # 使用更稳定的ID格式
-                                self._add_sent_message(target_session, node_id)
+                        self._mark_nodes_sent(target_session, nodes_list)
 
                         return True
                     else:
@@ -357,6 +366,8 @@ class MessageSender:
                         )
             except Exception as e:
                 logger.warning(f"❌ 任务 {task_id}: 策略2失败: {e}")
+                if self._note_send_error(target_session, e):
+                    return False
 
             # 策略3: 下载图片并使用本地文件重新发送 (所有图片)
             try:
@@ -375,14 +386,13 @@ class MessageSender:
                     action = "send_private_forward_msg"
                     payload = {"user_id": int(target_id), "messages": updated_nodes}
 
-                response = await client.call_action(action, **payload)
+                response = await self._send_attempt(
+                    target_session, "local_images", client, action, payload
+                )
                 if response and not isinstance(response, Exception):
                     logger.info(f"✅ 任务 {task_id}: 策略3: 下载图片后合并转发发送成功")
                     # 标记所有节点为已发送
-                    for i, node in enumerate(updated_nodes):
-                        if node.get("type") == "node":
-                            node_id = f"{task_id}_strategy3_{i}"  # 使用更稳定的ID格式
-                            self._add_sent_message(target_session, node_id)
+                    self._mark_nodes_sent(target_session, nodes_list)
 
                     return True
                 else:
@@ -391,16 +401,73 @@ class MessageSender:
                     )
             except Exception as e:
                 logger.warning(f"❌ 任务 {task_id}: 策略3失败: {e}")
+                if self._note_send_error(target_session, e):
+                    return False
 
             # 策略4: 放弃合并转发，改用逐条发送
             logger.info(f"📤 任务 {task_id}: 最终策略: 放弃合并转发，改用逐条发送")
-            return await self.send_with_fallback(target_session, nodes_list, task_id)
+            metrics.inc("send_attempts_total", strategy="single")
+            started = time.perf_counter()
+            success = await self.send_with_fallback(target_session, nodes_list, task_id)
+            duration = time.perf_counter() - started
+            metrics.observe("send_seconds", duration, strategy="single")
+            self.telemetry.record(
+                target_session,
+                "single",
+                nodes_list,
+                duration,
+                success,
+                # 逐条发送整体成功时，中途某个节点的错误不算这次尝试的错误喵～ ✅
+                error=None if success else self.last_send_errors.get(target_session),
+            )
+            if success:
+                metrics.inc("send_successes_total", strategy="single")
+            return success
 
         except Exception as e:
             logger.error(f"任务 {task_id}: 所有发送策略均失败: {e}")
             logger.error(traceback.format_exc())
             return False
 
+    async def _send_attempt(
+        self, target_session: str, strategy: str, client, action: str, payload: dict
+    ):
+        """
+        调用一次 OneBot 发送接口，并按策略记录尝试次数、成功次数和耗时喵～ 📊
+        同时把载荷规模、错误码和耗时写进发送遥测！
+
+        Args:
+            target_session: 目标会话ID喵
+            strategy: 发送策略名喵
+            client: OneBot 客户端喵
+            action: OneBot 动作名喵
+            payload: 动作参数喵
+
+        Returns:
+            OneBot 的响应，异常会原样抛出喵
+        """
+        metrics.inc("send_attempts_total", strategy=strategy)
+        nodes = payload.get("messages", [])
+        started = time.perf_counter()
+        try:
+            response = await client.call_action(action, **payload)
+        except Exception as e:
+            duration = time.perf_counter() - started
+            metrics.observe("send_seconds", duration, strategy=strategy)
+            self.telemetry.record(
+                target_session, strategy, nodes, duration, False, error=e
+            )
+            raise
+        duration = time.perf_counter() - started
+        metrics.observe("send_seconds", duration, strategy=strategy)
+        success = bool(response) and not isinstance(response, Exception)
+        if success:
+            metrics.inc("send_successes_total", strategy=strategy)
+        self.telemetry.record(
+            target_session, strategy, nodes, duration, success, response=response
+        )
+        return response
+
     async def _upload_images_to_cache(
         self, nodes_list: list[dict], client, target_session: str, target_id: str
     ) -> list[dict]:
@@ -902,11 +969,14 @@ class MessageSender:
             bool: 发送成功返回True，否则返回False喵～
 
         Note:
-            会逐条发送消息，并控制发送频率避免限制喵！ ✨
+            按原始顺序逐条发送，后续节点的媒体准备与当前节点的发送流水线重叠，
+            发送节奏只由令牌桶限速器控制喵！ ✨
         """
         if task_id is None:
             task_id = str(uuid.uuid4())
 
+        prepare_tasks = []
+        self.last_send_errors.pop(target_session, None)
         try:
             # 获取目标平台和ID喵～ 🔍
             target_parts = target_session.split(":", 2)
@@ -919,11 +989,7 @@ class MessageSender:
             target_platform, target_type, target_id = target_parts
 
             # 获取client喵～ 🤖
-            client = self.plugin.context.get_platform("aiocqhttp").get_client()
-
-            # 使用信号量控制并发发送，避免频率限制喵～ 🚦
-            if not hasattr(self, "_send_semaphore"):
-                self._send_semaphore = asyncio.Semaphore(2)  # 最多同时发送2条消息喵
+            client = self.plugin.platform_resolver.get_client("aiocqhttp")
 
             # 发送消息前提示喵～ 📢
             if header_text is None:
@@ -932,6 +998,7 @@ class MessageSender:
                 )
 
             if header_text and str(header_text).strip():
+                await self._send_rate_limiter.acquire(target_session)
                 try:
                     if "GroupMessage" in target_session:
                         await client.call_action(
@@ -947,16 +1014,16 @@ class MessageSender:
                         )
                 except Exception as e:
                     logger.warning(f"任务 {task_id}: 发送提示消息失败喵: {e} 😿")
+                    if self._note_send_error(target_session, e):
+                        return False
 
-            # 为每个节点生成唯一ID并按顺序逐条发送消息喵～ 📋
-            successful_nodes = 0
-            # 创建发送任务列表喵～ 📝
-            send_tasks = []
-            for i, node in enumerate(nodes_list):
+            # 筛选需要发送的节点，保持原始顺序喵～ 📋
+            pending_nodes = []
+            for node in nodes_list:
                 if node["type"] != "node":
                     continue
-                # 生成节点ID用于跟踪喵～ 🏷️
-                node_id = f"{task_id}_strategy4_{i}"  # 使用更稳定的ID格式喵
+                # 按节点内容生成去重键，重试同一批次时会跳过已送达的节点喵～ 🏷️
+                node_id = node_key(node)
 
                 # 检查是否已经发送过喵～ ✅
                 if self._is_message_sent(target_session, node_id):
@@ -964,30 +1031,47 @@ class MessageSender:
                         f"任务 {task_id}: 节点 {node_id} 已经发送过，跳过喵～ ⏭️"
                     )
                     continue
+                pending_nodes.append((node, node_id))
 
-                # 创建异步发送任务喵～ 🚀
-                send_task = self._create_send_task(
-                    target_session, target_id, node, node_id, task_id
-                )
-                send_tasks.append(send_task)
+            # 预取窗口：提前准备后面几个节点的媒体喵～ 🔭
+            lookahead = max(1, int(self.plugin.config.get("send_prepare_lookahead", 3)))
+            prepare_tasks.extend([None] * len(pending_nodes))
 
-            # 使用信号量控制并发执行发送任务喵～ 🎛️
-            async def execute_with_semaphore(task):
-                async with self._send_semaphore:
-                    return await task
+            def schedule_prepare(index: int):
+                if index < len(pending_nodes) and prepare_tasks[index] is None:
+                    prepare_tasks[index] = asyncio.create_task(
+                        self._prepare_node_content(pending_nodes[index][0], task_id)
+                    )
 
-            # 并发执行所有发送任务，但受信号量控制喵～ ⚡
-            results = await asyncio.gather(
-                *[execute_with_semaphore(task) for task in send_tasks],
-                return_exceptions=True,
-            )
+            for index in range(min(lookahead, len(pending_nodes))):
+                schedule_prepare(index)
 
-            # 统计成功发送的节点数喵～ 📊
-            for result in results:
-                if isinstance(result, Exception):
-                    logger.error(f"任务 {task_id}: 发送节点时出错喵: {result} 😿")
-                elif result:
-                    successful_nodes += 1
+            # 按顺序逐条发送，发送当前节点时后面的节点已在准备中喵～ 🚀
+            successful_nodes = 0
+            for index, (node, node_id) in enumerate(pending_nodes):
+                schedule_prepare(index + lookahead)
+                try:
+                    prepared = await prepare_tasks[index]
+                except Exception as e:
+                    logger.error(f"任务 {task_id}: 准备节点内容时出错喵: {e} 😿")
+                    continue
+
+                await self._send_rate_limiter.acquire(target_session)
+                try:
+                    if await self._send_prepared_node(
+                        target_session, target_id, node, prepared, node_id, task_id
+                    ):
+                        successful_nodes += 1
+                    elif self.circuit_breaker.is_fatal(
+                        self.last_send_errors.get(target_session)
+                    ):
+                        # 目标已不可用，剩下的节点也不用再试了喵～ 🔌
+                        logger.warning(
+                            f"任务 {task_id}: 目标 {target_session} 不可用，停止逐条发送喵 🚫"
+                        )
+                        break
+                except Exception as e:
+                    logger.error(f"任务 {task_id}: 发送节点时出错喵: {e} 😿")
 
             logger.info(
                 f"任务 {task_id}: 成功使用备选方案发送 {successful_nodes}/{len(nodes_list)} 条消息到 {target_session} 喵～ 🎉"
@@ -997,154 +1081,179 @@ class MessageSender:
             logger.error(f"任务 {task_id}: 备选方案发送失败喵: {e} 😿")
             logger.error(traceback.format_exc())
             return False
+        finally:
+            # 清理没来得及用上的预取任务喵～ 🧹
+            for task in prepare_tasks:
+                if task is not None and not task.done():
+                    task.cancel()
 
-    async def _create_send_task(
-        self, target_session, target_id, node, node_id, task_id
-    ):
+    async def _send_node_content(
+        self,
+        target_session: str,
+        target_id: str,
+        node: dict,
+        node_id: str = None,
+        task_id: str = None,
+    ) -> bool:
         """
-        创建单条消息发送任务喵～ 🏗️
-        为每个节点创建独立的异步发送任务！
+        发送节点内容喵～ 📤
+        处理单个消息节点的发送，支持各种消息类型！
 
         Args:
-            target_session: 目标会话喵
+            target_session: 目标会话ID喵
             target_id: 目标ID喵
             node: 节点数据喵
-            node_id: 节点ID喵
-            task_id: 任务ID喵
+            node_id: 节点唯一标识，用于跟踪是否已发送喵
+            task_id: 任务ID，用于日志记录喵
 
         Returns:
-            发送结果喵～
+            bool: 发送成功返回True，否则返回False喵～
 
         Note:
-            会自动添加延迟避免频率限制喵！ ⏰
+            等价于先准备再发送，流水线发送时这两步会被拆开执行喵！ ✨
         """
-        try:
-            # 尝试发送消息喵～ 📤
-            result = await self._send_node_content(
-                target_session, target_id, node, node_id, task_id
-            )
+        if task_id is None:
+            task_id = str(uuid.uuid4())
 
-            # 无论成功失败，都等待一段时间避免频率限制喵～ 😴
-            await asyncio.sleep(1)
-            return result
+        # 检查是否已发送过该节点
+        if node_id and self._is_message_sent(target_session, node_id):
+            logger.info(f"任务 {task_id}: 节点 {node_id} 已经发送过，跳过")
+            return True
+
+        try:
+            prepared = await self._prepare_node_content(node, task_id)
         except Exception as e:
-            logger.error(f"任务 {task_id}: 创建发送任务失败喵: {e} 😿")
+            logger.error(f"任务 {task_id}: 准备节点内容失败: {e}")
+            logger.error(traceback.format_exc())
             return False
 
-    async def _send_node_content(
+        return await self._send_prepared_node(
+            target_session, target_id, node, prepared, node_id, task_id
+        )
+
+    async def _prepare_node_content(self, node: dict, task_id: str = None) -> dict:
+        """
+        准备节点的发送内容喵～ 🧺
+        构建消息链、下载图片、识别文件消息，不涉及任何发送操作！
+
+        Args:
+            node: 节点数据喵
+            task_id: 任务ID，用于日志记录喵
+
+        Returns:
+            dict: 包含 message_parts、has_file_message、file_url、file_name 的准备结果喵～
+
+        Note:
+            可以在发送前一个节点的同时提前执行，和发送阶段互不干扰喵！ 🔭
+        """
+        import astrbot.api.message_components as Comp
+
+        sender_name = node["data"].get("name", "未知")
+        content = node["data"].get("content", [])
+
+        message_parts = [Comp.Plain(f"{sender_name}:\n")]
+
+        # 检查是否包含文件消息 - 需要特殊处理
+        has_file_message = False
+        file_url = ""
+        file_name = ""
+
+        # 处理所有内容项
+        for item in content:
+            item_type = item.get("type", "")
+
+            # 新增: 处理文件类型
+            if item_type == "file":
+                has_file_message = True
+                file_url = item.get("url", "") or item.get("data", {}).get("url", "")
+                file_name = item.get("name", "") or item.get("data", {}).get(
+                    "name", "未命名文件"
+                )
+                logger.info(f"检测到文件类型消息: {file_name}, URL: {file_url}")
+                # 不添加到message_parts，稍后单独处理
+                continue
+
+            # 新增: 检查group_upload事件
+            if item_type == "notice" and item.get("notice_type") == "group_upload":
+                has_file_message = True
+                # 从notice事件中提取文件信息
+                file_info = item.get("file", {})
+                file_url = file_info.get("url", "")
+                file_name = file_info.get("name", "群文件")
+                logger.info(f"检测到群文件上传通知: {file_name}, URL: {file_url}")
+                # 不添加到message_parts，稍后单独处理
+                continue
+
+            if item_type == "text":
+                message_parts.append(Comp.Plain(item["data"].get("text", "")))
+
+            elif item_type == "image":
+                # 尝试获取图片
+                img_path = await self._prepare_image(item)
+                if img_path:
+                    if img_path.startswith("http"):
+                        # 对于URL，尝试下载
+                        local_path = await self.download_helper.download_image(img_path)
+                        if local_path and os.path.exists(local_path):
+                            message_parts.append(Comp.Image.fromFileSystem(local_path))
+                        else:
+                            # 如果下载失败，尝试直接使用URL
+                            message_parts.append(Comp.Image.fromURL(img_path))
+                    elif img_path.startswith("file:///"):
+                        # 对于本地文件
+                        local_path = img_path[8:]
+                        if os.path.exists(local_path):
+                            message_parts.append(Comp.Image.fromFileSystem(local_path))
+                    elif os.path.exists(img_path):
+                        # 直接就是本地路径
+                        message_parts.append(Comp.Image.fromFileSystem(img_path))
+
+            elif item_type == "at":
+                message_parts.append(Comp.At(qq=item["data"].get("qq", "")))
+
+        return {
+            "message_parts": message_parts,
+            "has_file_message": has_file_message,
+            "file_url": file_url,
+            "file_name": file_name,
+        }
+
+    async def _send_prepared_node(
         self,
         target_session: str,
         target_id: str,
         node: dict,
+        prepared: dict,
         node_id: str = None,
         task_id: str = None,
     ) -> bool:
         """
-        发送节点内容喵～ 📤
-        处理单个消息节点的发送，支持各种消息类型！
+        发送已经准备好的节点喵～ 📤
+        优先使用 OneBot 消息段，失败时回退到 MessageChain！
 
         Args:
             target_session: 目标会话ID喵
             target_id: 目标ID喵
             node: 节点数据喵
+            prepared: _prepare_node_content 返回的准备结果喵
             node_id: 节点唯一标识，用于跟踪是否已发送喵
             task_id: 任务ID，用于日志记录喵
 
         Returns:
             bool: 发送成功返回True，否则返回False喵～
-
-        Note:
-            支持文本、图片、AT等各种消息类型的智能处理喵！ ✨
         """
-        if task_id is None:
-            task_id = str(uuid.uuid4())
+        from astrbot.api.event import MessageChain
 
         sender_name = node["data"].get("name", "未知")
         content = node["data"].get("content", [])
+        message_parts = prepared["message_parts"]
 
         # 获取client
-        client = self.plugin.context.get_platform("aiocqhttp").get_client()
-
-        # 检查是否已发送过该节点
-        if node_id and self._is_message_sent(target_session, node_id):
-            logger.info(f"任务 {task_id}: 节点 {node_id} 已经发送过，跳过")
-            return True
+        client = self.plugin.platform_resolver.get_client("aiocqhttp")
 
         try:
-            # 创建包含所有内容的消息链
-            import astrbot.api.message_components as Comp
-            from astrbot.api.event import MessageChain
-
-            message_parts = [Comp.Plain(f"{sender_name}:\n")]
-
-            # 检查是否包含文件消息 - 需要特殊处理
-            has_file_message = False
-            file_url = ""
-            file_name = ""
-
-            # 处理所有内容项
-            for item in content:
-                item_type = item.get("type", "")
-
-                # 新增: 处理文件类型
-                if item_type == "file":
-                    has_file_message = True
-                    file_url = item.get("url", "") or item.get("data", {}).get(
-                        "url", ""
-                    )
-                    file_name = item.get("name", "") or item.get("data", {}).get(
-                        "name", "未命名文件"
-                    )
-                    logger.info(f"检测到文件类型消息: {file_name}, URL: {file_url}")
-                    # 不添加到message_parts，稍后单独处理
-                    continue
-
-                # 新增: 检查group_upload事件
-                if item_type == "notice" and item.get("notice_type") == "group_upload":
-                    has_file_message = True
-                    # 从notice事件中提取文件信息
-                    file_info = item.get("file", {})
-                    file_url = file_info.get("url", "")
-                    file_name = file_info.get("name", "群文件")
-                    logger.info(f"检测到群文件上传通知: {file_name}, URL: {file_url}")
-                    # 不添加到message_parts，稍后单独处理
-                    continue
-
-                if item_type == "text":
-                    message_parts.append(Comp.Plain(item["data"].get("text", "")))
-
-                elif item_type == "image":
-                    # 尝试获取图片
-                    img_path = await self._prepare_image(item)
-                    if img_path:
-                        if img_path.startswith("http"):
-                            # 对于URL，尝试下载
-                            local_path = await self.download_helper.download_image(
-                                img_path
-                            )
-                            if local_path and os.path.exists(local_path):
-                                message_parts.append(
-                                    Comp.Image.fromFileSystem(local_path)
-                                )
-                            else:
-                                # 如果下载失败，尝试直接使用URL
-                                message_parts.append(Comp.Image.fromURL(img_path))
-                        elif img_path.startswith("file:///"):
-                            # 对于本地文件
-                            local_path = img_path[8:]
-                            if os.path.exists(local_path):
-                                message_parts.append(
-                                    Comp.Image.fromFileSystem(local_path)
-                                )
-                        elif os.path.exists(img_path):
-                            # 直接就是本地路径
-                            message_parts.append(Comp.Image.fromFileSystem(img_path))
-
-                elif item_type == "at":
-                    message_parts.append(Comp.At(qq=item["data"].get("qq", "")))
-
             # 如果是文件消息，使用专门的方法处理
-            if has_file_message and file_url:
+            if prepared["has_file_message"] and prepared["file_url"]:
                 # 先用常规方式发送普通消息部分
                 if message_parts and len(message_parts) > 1:  # 不只是发送者名称
                     message = MessageChain(message_parts)
@@ -1162,7 +1271,11 @@ class MessageSender:
 
                 # 使用文件发送方法处理文件
                 success = await self._download_and_send_file(
-                    file_url, file_name, target_session, target_id, sender_name
+                    prepared["file_url"],
+                    prepared["file_name"],
+                    target_session,
+                    target_id,
+                    sender_name,
                 )
 
                 # 标记为已发送
@@ -1193,6 +1306,11 @@ class MessageSender:
                     self._add_sent_message(target_session, node_id)
                 return True
             except Exception as e2:
+                if self._note_send_error(target_session, e2):
+                    logger.warning(
+                        f"任务 {task_id}: OneBot 段发送失败且目标不可用喵: {e2} 🚫"
+                    )
+                    return False
                 logger.warning(
                     f"任务 {task_id}: OneBot 段发送失败，尝试 MessageChain 备选: {e2}"
                 )
@@ -1351,8 +1469,7 @@ class MessageSender:
                     return img_url
 
                 # 检查是否已经下载过相同的图片URL
-                cache_key = f"img_cache_{hash(img_url)}"
-                cached_path = self.plugin.config.get(cache_key, "")
+                cached_path = self.plugin.runtime_state.get_image_path(img_url)
 
                 if cached_path and os.path.exists(cached_path):
                     logger.debug(f"从缓存获取图片: {cached_path}")
@@ -1363,7 +1480,7 @@ class MessageSender:
                 local_path = await self.download_helper.download_image(img_url)
                 if local_path and os.path.exists(local_path):
                     # 缓存路径以便下次使用
-                    self.plugin.config[cache_key] = local_path
+                    self.plugin.runtime_state.set_image_path(img_url, local_path)
                     logger.debug(f"已下载URL图片到: {local_path}")
                     return f"file:///{local_path}"
                 elif local_path:  # 如果download_image返回了原始URL
@@ -1424,7 +1541,7 @@ class MessageSender:
 
             for msg in valid_messages:
                 # 生成消息ID
-                msg_id = msg.get("id", f"{task_id}_{uuid.uuid4()}")
+                msg_id = msg.get("id") or node_key(dict(msg))
 
                 # 检查是否已发送
                 if msg_id in sent_ids or self._is_message_sent(target_session, msg_id):
@@ -1546,7 +1663,7 @@ class MessageSender:
             import uuid
 
             # 获取客户端喵～ 🤖
-            client = self.plugin.context.get_platform("aiocqhttp").get_client()
+            client = self.plugin.platform_resolver.get_client("aiocqhttp")
 
             # 创建临时下载目录喵～ 📁
             temp_dir = os.path.join(
@@ -0,0 +1,178 @@
+"""
+昵称缓存模块喵～ 🏷️
+缓存 @ 提及中用户的昵称，避免每次构建节点都调用 get_stranger_info！
+"""
+
+import json
+import os
+from collections.abc import Awaitable, Callable
+
+from ...utils.ttl_cache import TTLCache
+
+try:
+    from astrbot.api import logger
+except ImportError:
+    # 备用日志记录器喵～ 🐾
+    import logging
+
+    logger = logging.getLogger(__name__)
+
+# 查不到昵称时的短暂缓存时间，避免用户没有昵称时每次都调用API喵～ ⏱️
+EMPTY_NICKNAME_TTL = 300
+
+
+class NicknameCache:
+    """
+    QQ昵称缓存喵～ 🏷️
+    LRU + TTL 的昵称缓存，支持并发合并、群成员预热和可选持久化！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 💾 缓存 QQ号 -> 昵称，过期后重新获取
+    - 🤝 同一个QQ号的并发查询只调用一次API
+    - 🔥 通过 get_group_member_list 一次性预热整个群的昵称
+    - 📁 可选地把缓存保存到文件，重启后继续使用
+
+    Note:
+        相关配置: nickname_cache_size、nickname_cache_ttl、persist_nickname_cache 喵～ ⚙️
+    """
+
+    def __init__(self, plugin=None):
+        """
+        初始化昵称缓存喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            plugin: 插件实例，提供配置、数据目录和平台客户端喵
+        """
+        self.plugin = plugin
+        config = plugin.config if plugin else {}
+        self.ttl = config.get("nickname_cache_ttl", 86400)
+        self.persist = bool(config.get("persist_nickname_cache", False))
+        self._cache = TTLCache(
+            max_entries=config.get("nickname_cache_size", 4096), ttl=self.ttl
+        )
+        # 已预热过的群，过期前不重复拉取成员列表喵～ 🔥
+        self._prewarmed_groups = TTLCache(max_entries=256, ttl=self.ttl)
+        self._dirty = False
+        self.cache_path = (
+            os.path.join(plugin.data_dir, "nickname_cache.json")
+            if plugin and getattr(plugin, "data_dir", None)
+            else None
+        )
+
+        if self.persist:
+            self.load()
+
+    async def get_nickname(
+        self, qq: str, loader: Callable[[str], Awaitable[str]]
+    ) -> str:
+        """
+        获取用户昵称，未命中时调用加载函数喵～ 🔍
+
+        Args:
+            qq: QQ号喵
+            loader: 根据QQ号获取昵称的异步函数，没有昵称时返回空字符串，
+                暂时无法查询（例如还没有连接上平台）时返回None喵
+
+        Returns:
+            昵称，获取不到时为空字符串喵
+
+        Note:
+            None 不会被缓存；空字符串只缓存 EMPTY_NICKNAME_TTL 秒，也不会写进文件喵～ ⏱️
+        """
+        qq = str(qq)
+
+        async def load():
+            nickname = await loader(qq)
+            if nickname:
+                self._dirty = True
+            elif nickname is not None:
+                self._cache.set(qq, "", EMPTY_NICKNAME_TTL)
+            return nickname
+
+        return await self._cache.get_or_load(qq, load, should_cache=bool) or ""
+
+    async def prewarm_group(self, group_id: str) -> int:
+        """
+        通过群成员列表预热昵称缓存喵～ 🔥
+
+        Args:
+            group_id: 群号喵
+
+        Returns:
+            预热写入的昵称数量（有效期内重复调用返回上次的数量），失败时为0喵
+
+        Note:
+            同一个群在有效期内只会拉取一次成员列表，并发调用也只会请求一次喵！ 🤝
+        """
+        if not group_id or not self.plugin:
+            return 0
+
+        async def load_members():
+            client = self.plugin.platform_resolver.get_client("aiocqhttp")
+            if not client:
+                return None
+            members = await client.call_action(
+                "get_group_member_list", group_id=int(group_id)
+            )
+            count = 0
+            for member in members or []:
+                if not isinstance(member, dict):
+                    continue
+                nickname = (member.get("nickname") or member.get("card") or "").strip()
+                if member.get("user_id") and nickname:
+                    self._cache.set(str(member["user_id"]), nickname)
+                    count += 1
+            if count:
+                self._dirty = True
+            logger.debug(f"已预热群 {group_id} 的 {count} 个成员昵称喵～ 🔥")
+            return count
+
+        try:
+            # 一个昵称都没拿到时不记为已预热，下次再试喵～ 🔁
+            return (
+                await self._prewarmed_groups.get_or_load(
+                    str(group_id), load_members, should_cache=bool
+                )
+                or 0
+            )
+        except Exception as e:
+            logger.warning(f"预热群 {group_id} 的成员昵称失败喵: {e} 😿")
+            return 0
+
+    def load(self) -> None:
+        """
+        从文件加载昵称缓存喵～ 📥
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            for qq, (nickname, expires_at) in data.items():
+                if nickname:
+                    self._cache.set_until(qq, nickname, expires_at)
+            self._cache.purge_expired()
+            logger.debug(f"已加载 {len(self._cache)} 个缓存昵称喵～ ✅")
+        except Exception as e:
+            logger.error(f"加载昵称缓存失败喵: {e} 😿")
+
+    def save(self) -> None:
+        """
+        把昵称缓存保存到文件喵～ 💾
+
+        Note:
+            未开启持久化或没有变化时不会写文件喵！ ✨
+        """
+        if not self.persist or not self.cache_path or not self._dirty:
+            return
+        try:
+            data = {
+                qq: [nickname, expires_at]
+                for qq, nickname, expires_at in self._cache.items()
+                if nickname
+            }
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"保存昵称缓存失败喵: {e} 😿")
@@ -0,0 +1,112 @@
+"""
+发送限速器模块喵～ 🚦
+用令牌桶控制每个目标会话的发送速率，替代固定的 sleep 间隔！
+"""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    按目标会话划分的令牌桶限速器喵～ 🪣
+    每个目标会话一个桶，令牌按固定速率补充，允许少量突发！
+
+    Note:
+        所有操作都在同一个事件循环里进行，不需要加锁喵～ ✨
+        已经补满的空闲桶和新建的桶没有区别，prune 会把它们删掉，桶的数量不会一直增长喵！ 🧹
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 2):
+        """
+        初始化限速器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            rate: 每秒补充的令牌数喵，<= 0 表示不限速
+            burst: 桶容量，也就是允许的最大突发数量喵
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        # key -> [可用令牌数, 上次补充时间] 喵～ 📋
+        self._buckets: dict[str, list[float]] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateLimiter":
+        """
+        根据插件配置创建限速器喵～ ⚙️
+
+        Args:
+            config: 插件配置字典喵
+
+        Returns:
+            配置好的限速器实例喵
+        """
+        return cls(
+            rate=config.get("send_rate_per_second", 2.0),
+            burst=config.get("send_rate_burst", 2),
+        )
+
+    def _refill(self, key: str, now: float) -> list[float]:
+        """
+        补充指定桶的令牌喵～ ➕
+
+        Args:
+            key: 桶的键（目标会话）喵
+            now: 当前单调时钟时间喵
+
+        Returns:
+            桶的状态列表喵
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[key] = bucket
+            return bucket
+
+        elapsed = now - bucket[1]
+        if elapsed > 0:
+            bucket[0] = min(float(self.burst), bucket[0] + elapsed * self.rate)
+            bucket[1] = now
+        return bucket
+
+    async def acquire(self, key: str):
+        """
+        获取一个发送令牌，必要时等待喵～ ⏳
+        只会等到下一个令牌补充好为止，不会多睡！
+
+        Args:
+            key: 桶的键（目标会话）喵
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            bucket = self._refill(key, time.monotonic())
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return
+            await asyncio.sleep((1 - bucket[0]) / self.rate)
+
+    def prune(self) -> int:
+        """
+        删除已经补满令牌的空闲桶喵～ 🧹
+
+        Returns:
+            删除的桶数量喵
+
+        Note:
+            补满的桶下次使用时会重新创建，状态完全一样，不影响限速喵～ ✨
+        """
+        if self.rate <= 0:
+            removed = len(self._buckets)
+            self._buckets.clear()
+            return removed
+        now = time.monotonic()
+        idle = [
+            key
+            for key, (tokens, refilled_at) in self._buckets.items()
+            if tokens + (now - refilled_at) * self.rate >= self.burst
+        ]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
@@ -1,8 +1,13 @@
 import hashlib
+import os
 import time
+from collections.abc import Awaitable, Callable
 
 from astrbot.api import logger
 
+from .retry_scheduler import RetryScheduler, compute_backoff
+from .snapshot_media import SnapshotMediaStore
+
 
 class RetryManager:
     """
@@ -16,10 +21,19 @@ class RetryManager:
     - 🚫 放弃无希望的消息
 
     Note:
-        使用指数退避策略，避免频繁重试造成负担喵！ ⚠️
+        使用带抖动的指数退避，并把下一次重试时间持久化，重启后不会重置喵！ ⚠️
+        失败记录保存了批次的节点快照，重试时原样重发，不依赖当前的消息缓存喵～ 📸
+        快照引用的本地临时文件会复制到 retry_media 目录，记录删除时一起删除喵～ 📌
     """
 
-    def __init__(self, plugin, cache_manager, message_builder, message_sender):
+    def __init__(
+        self,
+        plugin,
+        cache_manager,
+        message_builder,
+        message_sender,
+        send_payload: Callable[[str, dict], Awaitable[bool | None]] | None = None,
+    ):
         """
         初始化重试管理器喵！(ฅ^•ω•^ฅ)
 
@@ -28,127 +42,304 @@ class RetryManager:
             cache_manager: 缓存管理器喵
             message_builder: 消息构建器喵
             message_sender: 消息发送器喵
+            send_payload: 按目标平台发送批次快照的异步函数，返回None表示找不到平台喵
         """
         self.plugin = plugin
         self.cache_manager = cache_manager
         self.message_builder = message_builder
         self.message_sender = message_sender
+        self.send_payload = send_payload
 
-    async def retry_failed_messages(self):
+        config = plugin.config
+        self.max_retries = config.get("retry_max_attempts", 5)
+        self.base_delay = config.get("retry_base_delay", 300)
+        self.max_delay = config.get("retry_max_delay", 21600)
+
+        # 失败快照引用的媒体文件，不受临时文件清理影响喵～ 📌
+        self.snapshot_media = SnapshotMediaStore(
+            os.path.join(plugin.data_dir, "retry_media")
+        )
+
+        # 按下一次重试时间排序的调度器，键是 (目标会话, 任务ID, 源会话, 批次哈希) 喵～ ⏰
+        self.scheduler = RetryScheduler(self._retry_due_entry)
+
+    def start(self):
         """
-        尝试重新发送缓存的失败消息喵～ 🔄
-        这是重试的主要逻辑，会智能地处理所有失败消息！
+        把已持久化的失败记录放进调度器并启动喵～ 🚀
 
         Note:
-            使用指数退避算法，避免过于频繁的重试喵～ ⏰
+            没有记录下一次重试时间的旧记录会尽快重试一次喵！ ⏰
+            已经没有失败记录的快照媒体目录会在这里清理掉喵～ 🧹
         """
-        # 获取所有失败消息喵～ 📋
-        failed_messages_cache = self.cache_manager.get_all_failed_messages()
-        if not failed_messages_cache:
-            return
+        now = time.time()
+        keys = []
+        for (
+            target_session,
+            messages,
+        ) in self.cache_manager.get_all_failed_messages().items():
+            for msg in messages:
+                key = (
+                    target_session,
+                    msg["task_id"],
+                    msg["source_session"],
+                    msg.get("batch_hash", ""),
+                )
+                keys.append(key)
+                self.scheduler.schedule(key, msg.get("next_retry_time") or now)
+        removed = self.snapshot_media.collect_garbage(keys)
+        if removed:
+            logger.debug(f"清理了 {removed} 个不再需要的快照媒体目录喵～ 🧹")
+        self.scheduler.start()
+
+    def stop(self):
+        """
+        停止重试调度器喵～ 🔚
+        """
+        self.scheduler.stop()
 
-        logger.info(
-            f"开始重试发送失败消息，共 {len(failed_messages_cache)} 个目标会话喵～ 🚀"
+    def next_retry_time(self, retry_count: int) -> float:
+        """
+        根据已重试次数计算下一次重试时间喵～ 📐
+
+        Args:
+            retry_count: 已重试次数喵
+
+        Returns:
+            下一次重试的时间戳喵
+        """
+        return time.time() + compute_backoff(
+            retry_count, self.base_delay, self.max_delay
         )
 
-        # 一个一个会话地处理喵～ 🔄
-        for target_session in list(failed_messages_cache.keys()):
-            messages = failed_messages_cache[target_session]
+    async def record_failure(
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        batch_hash: str = "",
+        payload: dict | None = None,
+    ) -> bool:
+        """
+        记录一次发送失败并安排重试喵～ 📝
 
-            # 处理这个会话的所有失败消息喵～ 📤
-            for i, msg in enumerate(list(messages)):
-                try:
-                    # 增加重试计数喵～ 📊
-                    retry_count = self.cache_manager.increment_retry_count(
-                        target_session, i
-                    )
+        Args:
+            target_session: 目标会话ID喵
+            task_id: 任务ID喵
+            source_session: 源会话ID喵
+            batch_hash: 失败批次的哈希喵
+            payload: 失败批次的发送快照，重试时原样重发喵
 
-                    # 检查是否超过重试限制喵～ ⚠️
-                    if retry_count > 5:
-                        logger.warning(f"消息重试次数超过5次，放弃重试喵: {msg} 😿")
-                        # 从失败缓存中永久删除喵～ 🗑️
-                        self.cache_manager.remove_failed_message(
-                            target_session, msg["task_id"], msg["source_session"]
-                        )
-                        continue
-
-                    # 根据重试次数指数增加等待时间，避免频繁重试喵～ ⏰
-                    # 第1次：立即，第2次：1小时，第3次：4小时，第4次：9小时...
-                    # 判断上次重试时间是否足够长喵～ 🕐
-                    last_retry_time = msg.get("last_retry_time", 0)
-                    current_time = time.time()
-
-                    # 计算需要等待的时间（小时）喵～ 📐
-                    wait_hours = (retry_count - 1) ** 2
-                    wait_seconds = wait_hours * 3600
-
-                    time_since_last_retry = current_time - last_retry_time
-                    if time_since_last_retry < wait_seconds:
-                        # 还没到重试时间，跳过喵～ ⏭️
-                        logger.debug(
-                            f"消息重试冷却中，还需等待 {(wait_seconds - time_since_last_retry) / 3600:.1f} 小时喵: {msg} 😴"
-                        )
-                        continue
-
-                    # 更新最后重试时间喵～ 🕐
-                    msg["last_retry_time"] = current_time
-
-                    task_id = msg["task_id"]
-                    source_session = msg["source_session"]
-
-                    # 检查任务是否存在、是否启用、消息缓存是否存在喵～ ✅
-                    if not await self._validate_retry_prerequisites(
-                        task_id, source_session
-                    ):
-                        continue
-
-                    # 检查目标会话格式喵～ 🔍
-                    target_parts = (
-                        target_session.split(":", 2) if ":" in target_session else []
-                    )
-                    if len(target_parts) != 3:
-                        logger.warning(f"目标会话格式无效喵: {target_session} ❌")
-                        continue
+        Returns:
+            如果是新记录返回True，重复记录返回False喵
 
-                    target_platform, target_type, target_id = target_parts
+        Note:
+            快照引用的本地文件会先复制到重试目录，晚于临时文件清理的重试也能发出去喵～ 📌
+        """
+        key = (target_session, task_id, source_session, batch_hash)
+        if self.cache_manager.find_failed_message(*key) is not None:
+            return False
+        if payload is not None:
+            payload = await self.snapshot_media.pin(key, payload)
+            if self.cache_manager.find_failed_message(*key) is not None:
+                # 复制文件期间同一个批次已经被记录过了喵～ 🤝
+                return False
+        due_at = self.next_retry_time(0)
+        added = self.cache_manager.add_failed_message(
+            target_session, task_id, source_session, due_at, batch_hash, payload
+        )
+        if added:
+            self.scheduler.schedule(key, due_at)
+        return added
+
+    def discard(
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        batch_hash: str = "",
+    ):
+        """
+        删除失败记录并取消对应的重试喵～ 🗑️
 
+        Args:
+            target_session: 目标会话ID喵
+            task_id: 任务ID喵
+            source_session: 源会话ID喵
+            batch_hash: 批次哈希喵
+        """
+        key = (target_session, task_id, source_session, batch_hash)
+        self.scheduler.cancel(key)
+        self.cache_manager.remove_failed_message(*key)
+        self.snapshot_media.release(key)
+
+    async def retry_failed_messages(self):
+        """
+        立即重试所有已经到期的失败消息喵～ 🔄
+        平时由调度器在到期时自动触发，这里用于手动触发！
+
+        Note:
+            还没到期的消息不会被提前重试喵～ ⏰
+        """
+        due_keys = self.scheduler.pop_due()
+        if due_keys:
+            logger.info(f"开始重试发送失败消息，共 {len(due_keys)} 条到期记录喵～ 🚀")
+        for key in due_keys:
+            await self._retry_due_entry(key)
+
+    async def _retry_due_entry(self, key: tuple[str, str, str, str]):
+        """
+        重试一条到期的失败记录喵～ 🔄
+
+        Args:
+            key: (目标会话, 任务ID, 源会话, 批次哈希) 喵
+
+        Note:
+            失败后按指数退避重新安排，超过最大重试次数就放弃喵！ ⚠️
+        """
+        target_session, task_id, source_session, batch_hash = key
+        msg = self.cache_manager.find_failed_message(*key)
+        if msg is None:
+            return
+
+        # 目标熔断中：不消耗重试次数，等冷却结束再试喵～ 🔌
+        circuit_breaker = self.message_sender.circuit_breaker
+        if not circuit_breaker.allow(target_session):
+            due_at = time.time() + max(1.0, circuit_breaker.retry_after(target_session))
+            self.cache_manager.update_next_retry_time(
+                target_session, task_id, source_session, due_at, batch_hash
+            )
+            self.scheduler.schedule(key, due_at)
+            return
+
+        try:
+            # 增加重试计数并记录重试时间喵～ 📊
+            retry_count = self.cache_manager.increment_retry_count(*key)
+
+            # 检查是否超过重试限制喵～ ⚠️
+            if retry_count > self.max_retries:
+                logger.warning(
+                    f"任务 {task_id} 到 {target_session} 的批次 {batch_hash or '-'} "
+                    f"重试次数超过{self.max_retries}次，放弃重试喵 😿"
+                )
+                self.discard(*key)
+                return
+
+            if msg.get("payload") is not None:
+                # 有快照的记录：原样重发失败的批次喵～ 📸
+                if not self._validate_task(task_id):
+                    self.discard(*key)
+                    return
+
+                logger.info(
+                    f"重试发送任务 {task_id} 从 {source_session} 到 {target_session} "
+                    f"的批次 {batch_hash} 喵～ 🔄"
+                )
+                if await self._retry_send_snapshot(
+                    target_session, batch_hash, msg["payload"]
+                ):
+                    self.discard(*key)
                     logger.info(
-                        f"重试发送任务 {task_id} 从 {source_session} 到 {target_session} 的消息喵～ 🔄"
+                        f"已移除任务 {task_id} 到 {target_session} 的失败缓存记录喵～ 🧹"
+                    )
+                    return
+            else:
+                # 没有快照的旧记录：沿用按当前消息缓存重建的方式喵～ 📜
+                target_parts = (
+                    target_session.split(":", 2) if ":" in target_session else []
+                )
+                if len(target_parts) != 3 or target_parts[0] != "aiocqhttp":
+                    logger.warning(
+                        f"目前重试功能只支持QQ平台，跳过 {target_session} 喵～ ⏭️"
                     )
+                    # 对于非QQ平台，不再重试，直接删除缓存记录喵～ 🗑️
+                    self.discard(*key)
+                    return
+
+                # 检查任务是否存在、是否启用、消息缓存是否存在喵～ ✅
+                if not await self._validate_retry_prerequisites(
+                    task_id, source_session
+                ):
+                    self.discard(*key)
+                    return
+
+                logger.info(
+                    f"重试发送任务 {task_id} 从 {source_session} 到 {target_session} 的消息喵～ 🔄"
+                )
 
-                    # 获取有效消息喵～ 📥
-                    valid_messages = self.plugin.message_cache.get(task_id, {}).get(
-                        source_session, []
+                valid_messages = self.plugin.message_cache[task_id][source_session]
+                if await self._retry_send_to_qq(target_session, valid_messages):
+                    self.discard(*key)
+                    logger.info(
+                        f"已移除任务 {task_id} 到 {target_session} 的失败缓存记录喵～ 🧹"
                     )
+                    return
+        except Exception as e:
+            # 重试过程中出错了喵！ 😿
+            logger.error(f"重试发送消息到 {target_session} 失败喵: {e}")
+
+        # 重试失败，按指数退避安排下一次喵～ ⏰
+        if self.cache_manager.find_failed_message(*key) is None:
+            return
+        due_at = self.next_retry_time(msg.get("retry_count", 0))
+        self.cache_manager.update_next_retry_time(
+            target_session, task_id, source_session, due_at, batch_hash
+        )
+        self.scheduler.schedule(key, due_at)
+        logger.info(
+            f"任务 {task_id} 到 {target_session} 的重试将在 {due_at - time.time():.0f} 秒后进行喵～ ⏰"
+        )
+
+    def _validate_task(self, task_id: str) -> bool:
+        """
+        检查任务是否仍然存在且启用喵～ ✅
 
-                    if not valid_messages:
-                        logger.warning(
-                            f"任务 {task_id} 会话 {source_session} 的消息缓存为空，无法重试喵～ 📭"
-                        )
-                        continue
-
-                    # 根据平台选择发送方式喵～ 🎯
-                    if target_platform == "aiocqhttp":
-                        await self._retry_send_to_qq(target_session, valid_messages)
-                        # 无论重试结果如何，都删除失败缓存记录，避免无限循环喵～ ✅
-                        self.cache_manager.remove_failed_message(
-                            target_session, task_id, source_session
-                        )
-                        logger.info(
-                            f"已移除任务 {task_id} 到 {target_session} 的失败缓存记录喵～ 🧹"
-                        )
-                    else:
-                        logger.warning(
-                            f"目前重试功能只支持QQ平台，跳过 {target_session} 喵～ ⏭️"
-                        )
-                        # 对于非QQ平台，不再重试，直接删除缓存记录喵～ 🗑️
-                        self.cache_manager.remove_failed_message(
-                            target_session, task_id, source_session
-                        )
-
-                except Exception as e:
-                    # 重试过程中出错了喵！ 😿
-                    logger.error(f"重试发送消息到 {target_session} 失败喵: {e}")
+        Args:
+            task_id: 任务ID喵
+
+        Returns:
+            任务可用返回True，否则返回False喵
+        """
+        task = self.plugin.get_task_by_id(task_id)
+        if not task:
+            logger.warning(f"任务 {task_id} 不存在，无法重试转发喵～ 😿")
+            return False
+        if not task.get("enabled", True):
+            logger.warning(f"任务 {task_id} 已禁用，无法重试转发喵～ 🚫")
+            return False
+        return True
+
+    async def _retry_send_snapshot(
+        self, target_session: str, batch_hash: str, payload: dict
+    ) -> bool:
+        """
+        原样重发失败批次的快照喵～ 📸
+        不会重新构建节点或重新下载媒体！
+
+        Args:
+            target_session: 目标会话ID喵
+            batch_hash: 批次哈希喵
+            payload: 失败时保存的发送快照喵
+
+        Returns:
+            发送成功（或检测到已经发送过）返回True，否则返回False喵
+        """
+        # 和首次投递共用批次ID，确认送达过的批次不会再发一遍喵～ 🛡️
+        batch_id = f"forward_{target_session}_{batch_hash}"
+        if self.message_sender._is_message_sent(target_session, batch_id):
+            logger.warning(f"批次 {batch_id} 已发送过，跳过重试喵～ 🚫")
+            return True
+
+        if self.send_payload is None:
+            logger.warning("未配置快照发送函数，无法重试批次喵～ 😿")
+            return False
+
+        if await self.send_payload(target_session, payload):
+            self.message_sender._add_sent_message(target_session, batch_id)
+            logger.info(f"成功重试发送消息到 {target_session} 喵～ ✅")
+            return True
+
+        logger.warning(f"重试发送失败，稍后继续重试喵～ ⚠️ (target: {target_session})")
+        return False
 
     async def _validate_retry_prerequisites(
         self, task_id: str, source_session: str
@@ -167,15 +358,8 @@ class RetryManager:
         Note:
             只有满足所有条件的消息才会被重试喵！ 🔍
         """
-        # 检查任务是否存在喵～ 🔍
-        task = self.plugin.get_task_by_id(task_id)
-        if not task:
-            logger.warning(f"任务 {task_id} 不存在，无法重试转发喵～ 😿")
-            return False
-
-        # 检查任务是否启用喵～ 🔍
-        if not task.get("enabled", True):
-            logger.warning(f"任务 {task_id} 已禁用，无法重试转发喵～ 🚫")
+        # 检查任务是否存在且启用喵～ 🔍
+        if not self._validate_task(task_id):
             return False
 
         # 检查消息缓存是否存在喵～ 🔍
@@ -191,7 +375,9 @@ class RetryManager:
 
         return True
 
-    async def _retry_send_to_qq(self, target_session: str, valid_messages: list[dict]):
+    async def _retry_send_to_qq(
+        self, target_session: str, valid_messages: list[dict]
+    ) -> bool:
         """
         重试发送消息到QQ平台喵～ 📡
         专门处理QQ平台的重试发送逻辑！
@@ -200,6 +386,9 @@ class RetryManager:
             target_session: 目标会话ID喵
             valid_messages: 有效的消息列表喵
 
+        Returns:
+            发送成功（或检测到已经发送过）返回True，否则返回False喵
+
         Note:
             会构建转发节点并使用原生API发送喵～ ✨
         """
@@ -221,7 +410,7 @@ class RetryManager:
             logger.warning(
                 f"检测到重复发送风险！批次 {batch_id} 已发送过，跳过重试喵～ 🚫"
             )
-            return
+            return True
 
         # 同时检查原始转发批次ID喵～ 🔍
         original_batch_id = f"forward_{target_session}_{batch_hash}"
@@ -229,7 +418,7 @@ class RetryManager:
             logger.warning(
                 f"检测到重复发送风险！原始批次 {original_batch_id} 已发送过，跳过重试喵～ 🚫"
             )
-            return
+            return True
 
         nodes_list = []
 
@@ -254,18 +443,23 @@ class RetryManager:
                 target_session, nodes_list
             )
 
+            circuit_breaker = self.message_sender.circuit_breaker
             if send_success:
+                circuit_breaker.record_success(target_session)
                 # 标记这批消息为已发送，防止后续重复喵～ ✅
                 self.message_sender._add_sent_message(target_session, batch_id)
                 logger.info(f"成功重试发送消息到 {target_session} 喵～ ✅")
-            else:
-                logger.warning(
-                    f"重试发送失败，但不再加入失败队列喵～ ⚠️ (target: {target_session})"
-                )
+                return True
 
-        except Exception as e:
-            logger.error(f"重试发送过程中出错喵: {e}")
-            # 重试失败也不再继续重试，避免无限循环喵～ ⚠️
+            circuit_breaker.record_failure(
+                target_session,
+                self.message_sender.last_send_errors.pop(target_session, None),
+            )
             logger.warning(
-                f"重试发送出错，但不再加入失败队列喵～ (target: {target_session})"
+                f"重试发送失败，稍后继续重试喵～ ⚠️ (target: {target_session})"
             )
+            return False
+
+        except Exception as e:
+            logger.error(f"重试发送过程中出错喵: {e}")
+            return False
@@ -0,0 +1,178 @@
+"""
+重试调度器模块喵～ ⏰
+用最小堆按到期时间排列重试任务，单个定时器只睡到最早的到期项！
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections.abc import Awaitable, Callable, Hashable
+
+from astrbot.api import logger
+
+
+def compute_backoff(
+    retry_count: int,
+    base_delay: float = 300,
+    max_delay: float = 21600,
+    jitter: float = 0.2,
+) -> float:
+    """
+    计算带抖动的指数退避时间喵～ 📐
+
+    Args:
+        retry_count: 已经重试的次数（0 表示首次失败）喵
+        base_delay: 基础等待秒数喵
+        max_delay: 最长等待秒数喵
+        jitter: 抖动比例，0.2 表示 ±20% 喵
+
+    Returns:
+        下一次重试前需要等待的秒数喵
+    """
+    delay = min(max_delay, base_delay * (2 ** max(0, retry_count)))
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+class RetryScheduler:
+    """
+    基于最小堆的重试调度器喵～ ⏰
+    只在最早的重试到期时醒来，CPU 开销只和到期的条目数有关！ ฅ(^•ω•^ฅ
+
+    Note:
+        重新调度同一个键时旧的堆条目会被惰性丢弃，不需要在堆里查找喵～ ✨
+    """
+
+    def __init__(self, callback: Callable[[Hashable], Awaitable[None]]):
+        """
+        初始化重试调度器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            callback: 条目到期时调用的异步函数，参数是条目的键喵
+        """
+        self.callback = callback
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._due: dict[Hashable, float] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def start(self):
+        """
+        启动调度循环喵～ 🚀
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """
+        停止调度循环喵～ 🔚
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def schedule(self, key: Hashable, due_at: float):
+        """
+        安排（或重新安排）一个条目的重试时间喵～ 📅
+
+        Args:
+            key: 条目的键喵
+            due_at: 到期的时间戳喵
+        """
+        self._due[key] = due_at
+        heapq.heappush(self._heap, (due_at, next(self._counter), key))
+        # 新条目可能比当前最早的还早，叫醒定时器重新计算喵～ ⏰
+        if self._heap[0][0] >= due_at:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable):
+        """
+        取消一个条目的重试喵～ ❌
+
+        Args:
+            key: 条目的键喵
+        """
+        self._due.pop(key, None)
+
+    def get_due(self, key: Hashable) -> float | None:
+        """
+        获取一个条目的到期时间喵～ 📅
+
+        Args:
+            key: 条目的键喵
+
+        Returns:
+            到期时间戳，没有安排时返回None喵
+        """
+        return self._due.get(key)
+
+    def next_due(self) -> float | None:
+        """
+        获取最早的到期时间喵～ 🔍
+
+        Returns:
+            最早的到期时间戳，没有条目时返回None喵
+        """
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float | None = None) -> list[Hashable]:
+        """
+        弹出所有已经到期的条目喵～ 📤
+
+        Args:
+            now: 当前时间戳，为None时使用当前时间喵
+
+        Returns:
+            到期条目的键列表喵
+        """
+        now = time.time() if now is None else now
+        due_keys = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, key = heapq.heappop(self._heap)
+            del self._due[key]
+            due_keys.append(key)
+        return due_keys
+
+    def _discard_stale(self):
+        """丢弃已被取消或重新安排的旧堆条目喵～ 🧹"""
+        while self._heap:
+            due_at, _, key = self._heap[0]
+            if self._due.get(key) == due_at:
+                return
+            heapq.heappop(self._heap)
+
+    async def _run(self):
+        """
+        调度主循环：睡到最早的到期项，然后依次执行喵～ 😴
+        """
+        while True:
+            try:
+                next_due = self.next_due()
+                timeout = None if next_due is None else max(0, next_due - time.time())
+                self._wakeup.clear()
+                if timeout is None or timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                        continue
+                    except TimeoutError:
+                        pass
+
+                for key in self.pop_due():
+                    try:
+                        await self.callback(key)
+                    except Exception as e:
+                        logger.error(f"执行重试任务 {key} 时出错喵: {e} 😿")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"重试调度循环出错喵: {e} 😿")
+                await asyncio.sleep(60)
@@ -0,0 +1,365 @@
+"""
+持久化发送队列模块喵～ 📮
+把构建好的转发任务写入 SQLite，由工作协程池异步投递！
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import traceback
+from collections.abc import Awaitable, Callable
+
+from astrbot.api import logger
+
+
+class SendQueue:
+    """
+    持久化的出站发送队列喵～ 📮
+    转发任务先落盘再投递，进程重启也不会丢失！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 💾 用 SQLite 持久化构建好的转发任务
+    - 👷 用可配置数量的工作协程并发投递
+    - ✅ 只有投递处理完成（ack）后才删除任务
+    - 🔁 处理异常的任务会延迟后重新投递
+    - 🧾 用完投递次数的任务先交给 on_exhausted 保存，再从队列删除
+
+    Note:
+        投递语义是"至少一次"：重启前正在投递的任务会被重新投递喵！
+        同一个目标会话的任务按入队顺序串行投递，不会乱序喵～ 📋
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        handler: Callable[[dict], Awaitable[bool | float]],
+        workers: int = 2,
+        max_attempts: int = 5,
+        on_exhausted: Callable[[dict], Awaitable[object]] | None = None,
+        on_removed: Callable[[dict], object] | None = None,
+    ):
+        """
+        初始化发送队列喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            db_path: SQLite 数据库文件路径喵
+            handler: 投递回调，返回 True 表示任务已处理完成可以删除，
+                返回数字表示推迟这么多秒且不计入投递次数喵
+            workers: 工作协程数量喵
+            max_attempts: 单个任务最多投递次数，超过后交给 on_exhausted 喵
+            on_exhausted: 任务用完投递次数时的异步回调，用来把批次转交给失败重试，
+                回调出错时任务会留在队列里继续投递喵
+            on_removed: 任务从队列删除（投递完成或已经转交）之后的回调，
+                用来释放任务占用的媒体文件等资源喵
+        """
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.on_exhausted = on_exhausted
+        self.on_removed = on_removed
+
+        self._conn = sqlite3.connect(db_path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS send_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                target_session TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                source_session TEXT NOT NULL,
+                batch_hash TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (target_session, batch_hash)
+            )
+            """
+        )
+
+        # 正在投递中的目标会话，保证同一目标串行喵～ 🔒
+        self._inflight_targets: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._worker_tasks: list[asyncio.Task] = []
+        self._closed = False
+
+    def start(self):
+        """
+        启动工作协程池喵～ 🚀
+
+        Note:
+            重复调用不会重复启动喵！ ⚠️
+        """
+        if self._worker_tasks:
+            return
+        for index in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker_loop(index)))
+
+        pending = self.pending_count()
+        if pending:
+            logger.info(f"发送队列中还有 {pending} 个待投递任务，将继续投递喵～ 📮")
+        self._wakeup.set()
+
+    async def close(self):
+        """
+        停止工作协程并关闭数据库喵～ 🔚
+
+        Note:
+            未 ack 的任务会保留在数据库中，下次启动继续投递喵！ 💾
+        """
+        self._closed = True
+        for task in self._worker_tasks:
+            task.cancel()
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        try:
+            self._conn.close()
+        except Exception as e:
+            logger.error(f"关闭发送队列数据库失败喵: {e} 😿")
+
+    def enqueue(
+        self,
+        target_session: str,
+        task_id: str,
+        source_session: str,
+        batch_hash: str,
+        payload: dict,
+    ) -> bool:
+        """
+        把一个转发任务写入队列喵～ 📥
+
+        Args:
+            target_session: 目标会话ID喵
+            task_id: 任务ID喵
+            source_session: 源会话ID喵
+            batch_hash: 消息批次哈希，同一目标同一批次只会入队一次喵
+            payload: 投递需要的数据（节点列表等），必须可以 JSON 序列化喵
+
+        Returns:
+            新入队返回True，重复批次返回False喵
+        """
+        now = time.time()
+        cursor = self._conn.execute(
+            """
+            INSERT OR IGNORE INTO send_jobs
+                (target_session, task_id, source_session, batch_hash, payload,
+                 attempts, available_at, created_at)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+            """,
+            (
+                target_session,
+                str(task_id),
+                source_session,
+                batch_hash,
+                json.dumps(payload, ensure_ascii=False),
+                now,
+                now,
+            ),
+        )
+        self._wakeup.set()
+        return cursor.rowcount > 0
+
+    def ack(self, job_id: int):
+        """
+        确认任务已处理完成并删除喵～ ✅
+
+        Args:
+            job_id: 任务ID喵
+        """
+        self._conn.execute("DELETE FROM send_jobs WHERE id = ?", (job_id,))
+
+    def release(self, job_id: int, delay: float = 0):
+        """
+        放回任务，延迟一段时间后重新投递喵～ 🔁
+
+        Args:
+            job_id: 任务ID喵
+            delay: 延迟秒数喵
+        """
+        self._conn.execute(
+            "UPDATE send_jobs SET attempts = attempts + 1, available_at = ? WHERE id = ?",
+            (time.time() + delay, job_id),
+        )
+        self._wakeup.set()
+
+    def defer(self, job_id: int, delay: float):
+        """
+        推迟任务，不计入投递次数喵～ ⏸️
+
+        Args:
+            job_id: 任务ID喵
+            delay: 延迟秒数喵
+
+        Note:
+            用于目标熔断等暂时不能发送的情况，任务不会因此被放弃喵！ 🔌
+        """
+        self._conn.execute(
+            "UPDATE send_jobs SET available_at = ? WHERE id = ?",
+            (time.time() + delay, job_id),
+        )
+        self._wakeup.set()
+
+    def pending_keys(self) -> list[tuple[str, str]]:
+        """
+        获取队列中所有任务的 (目标会话, 批次哈希) 喵～ 📋
+
+        Returns:
+            键列表，包括投递中的任务喵
+        """
+        return [
+            (row[0], row[1])
+            for row in self._conn.execute(
+                "SELECT target_session, batch_hash FROM send_jobs"
+            )
+        ]
+
+    def pending_count(self) -> int:
+        """
+        获取队列中的任务数量喵～ 📊
+
+        Returns:
+            待投递（含投递中）的任务数量喵
+        """
+        return self._conn.execute("SELECT COUNT(*) FROM send_jobs").fetchone()[0]
+
+    def _claim_next(self) -> tuple[dict | None, float | None]:
+        """
+        领取下一个可以投递的任务喵～ 🎫
+
+        Returns:
+            (任务字典或None, 距离下一个任务可用的秒数或None) 喵
+        """
+        now = time.time()
+        rows = self._conn.execute(
+            """
+            SELECT id, target_session, task_id, source_session, batch_hash,
+                   payload, attempts, available_at
+            FROM send_jobs ORDER BY id
+            """
+        )
+        next_wait = None
+        blocked = set(self._inflight_targets)
+        for row in rows:
+            target_session = row[1]
+            if target_session in blocked:
+                continue
+            if row[7] > now:
+                wait = row[7] - now
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                # 同一目标的后续任务也要等待，保持顺序喵～ 📋
+                blocked.add(target_session)
+                continue
+            self._inflight_targets.add(target_session)
+            return {
+                "id": row[0],
+                "target_session": target_session,
+                "task_id": row[2],
+                "source_session": row[3],
+                "batch_hash": row[4],
+                "payload": json.loads(row[5]),
+                "attempts": row[6],
+            }, next_wait
+        return None, next_wait
+
+    async def _worker_loop(self, index: int):
+        """
+        工作协程主循环喵～ 👷
+
+        Args:
+            index: 工作协程编号喵
+        """
+        while not self._closed:
+            try:
+                job, next_wait = self._claim_next()
+
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(),
+                            timeout=next_wait if next_wait is not None else 60,
+                        )
+                    except TimeoutError:
+                        pass
+                    continue
+
+                await self._process_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"发送队列工作协程 {index} 出错喵: {e} 😿")
+                await asyncio.sleep(1)
+
+    async def _exhaust(self, job: dict):
+        """
+        把用完投递次数的任务转交出去再删除喵～ 🧾
+
+        Args:
+            job: 任务字典喵
+
+        Note:
+            源消息缓存在入队时已经清掉了，转交失败时不能删除任务，
+            按最长间隔放回队列，保证至少一次投递喵！ ⚠️
+        """
+        if self.on_exhausted is not None:
+            try:
+                await self.on_exhausted(job)
+            except Exception as e:
+                logger.error(f"转交队列任务 {job['id']} 失败，稍后继续投递喵: {e} 😿")
+                self.release(job["id"], 600)
+                return
+        self._remove(job)
+
+    def _remove(self, job: dict):
+        """
+        删除已经处理完的任务并通知 on_removed 喵～ 🗑️
+
+        Args:
+            job: 任务字典喵
+        """
+        self.ack(job["id"])
+        if self.on_removed is not None:
+            try:
+                self.on_removed(job)
+            except Exception as e:
+                logger.error(f"清理队列任务 {job['id']} 的资源失败喵: {e} 😿")
+
+    async def _process_job(self, job: dict):
+        """
+        投递单个任务并根据结果 ack 或放回喵～ 📤
+
+        Args:
+            job: 任务字典喵
+        """
+        try:
+            try:
+                done = await self.handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"投递队列任务 {job['id']} 到 {job['target_session']} 出错喵: {e} 😿"
+                )
+                logger.error(traceback.format_exc())
+                done = False
+
+            if not isinstance(done, bool) and isinstance(done, int | float):
+                # 处理函数要求推迟投递（例如目标熔断中）喵～ ⏸️
+                self.defer(job["id"], float(done))
+            elif done:
+                self._remove(job)
+            elif job["attempts"] + 1 >= self.max_attempts:
+                logger.error(
+                    f"队列任务 {job['id']} 投递 {job['attempts'] + 1} 次仍未完成，转交失败重试 {job['target_session']} 喵～ 😿"
+                )
+                await self._exhaust(job)
+            else:
+                # 按投递次数逐步拉长等待时间喵～ ⏰
+                self.release(job["id"], min(600, 30 * 2 ** job["attempts"]))
+        finally:
+            self._inflight_targets.discard(job["target_session"])
+            self._wakeup.set()
@@ -0,0 +1,267 @@
+"""
+发送策略遥测模块喵～ 📡
+记录每一次发送尝试的目标、策略、载荷规模、错误码和耗时，并按目标和策略汇总成功率和延迟！
+"""
+
+import time
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+
+from .circuit_breaker import extract_retcode
+
+_GIF_BASE64_PREFIX = "R0lGOD"
+
+
+@dataclass
+class SendAttempt:
+    """
+    一次发送尝试的记录喵～ 📋
+    """
+
+    timestamp: float
+    target: str
+    strategy: str
+    success: bool
+    duration: float
+    nodes: int = 0
+    payload_bytes: int = 0
+    images: int = 0
+    gifs: int = 0
+    replies: int = 0
+    files: int = 0
+    retcode: int | None = None
+    error: str = ""
+
+
+def payload_stats(nodes: Iterable) -> dict:
+    """
+    统计转发载荷的规模喵～ 📏
+
+    Args:
+        nodes: 合并转发的节点列表喵
+
+    Returns:
+        包含 nodes、payload_bytes、images、gifs、replies、files 的字典喵
+
+    Note:
+        payload_bytes 是所有字符串内容的 UTF-8 字节数之和，不含 JSON 语法字符，
+        足够用来比较 base64 等载荷变化前后的差异喵～ 📐
+    """
+    stats = {
+        "nodes": 0,
+        "payload_bytes": 0,
+        "images": 0,
+        "gifs": 0,
+        "replies": 0,
+        "files": 0,
+    }
+    stack = [list(nodes)]
+    stats["nodes"] = len(stack[0])
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            stats["payload_bytes"] += (
+                len(value) if value.isascii() else len(value.encode("utf-8"))
+            )
+        elif isinstance(value, dict):
+            kind = value.get("type")
+            if kind == "image":
+                stats["images"] += 1
+                data = value.get("data") or {}
+                source = str(data.get("file") or data.get("url") or "")
+                if (
+                    data.get("is_gif")
+                    or source.lower().endswith(".gif")
+                    or source.startswith(f"base64://{_GIF_BASE64_PREFIX}")
+                ):
+                    stats["gifs"] += 1
+            elif kind == "reply":
+                stats["replies"] += 1
+            elif kind == "file":
+                stats["files"] += 1
+            stack.extend(value.values())
+        elif isinstance(value, list | tuple):
+            stack.extend(value)
+    return stats
+
+
+class SendTelemetry:
+    """
+    发送策略遥测喵～ 📡
+    最近的发送尝试保存在有界环形缓冲里，汇总时按 (目标, 策略) 计算成功率和耗时分位数！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📋 记录每次尝试的节点数、载荷字节数、图片/GIF/引用/文件数量、错误码和耗时
+    - 📊 按目标和策略汇总成功率、平均载荷和 p50/p95 耗时
+    - 🎯 找出总是失败或特别慢、值得关掉的策略
+
+    Note:
+        缓冲满了会丢弃最老的记录，内存占用固定喵～ 🗑️
+    """
+
+    def __init__(self, max_records: int = 1000):
+        """
+        初始化遥测喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            max_records: 环形缓冲最多保存的记录数喵
+        """
+        self.records: deque[SendAttempt] = deque(maxlen=max(1, int(max_records)))
+
+    @classmethod
+    def from_config(cls, config: dict) -> "SendTelemetry":
+        """
+        按插件配置创建遥测喵～ ⚙️
+
+        Args:
+            config: 插件配置，读取 send_telemetry_size 喵
+
+        Returns:
+            遥测实例喵
+        """
+        return cls(max_records=config.get("send_telemetry_size", 1000))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def record(
+        self,
+        target: str,
+        strategy: str,
+        nodes: Iterable,
+        duration: float,
+        success: bool,
+        response=None,
+        error=None,
+    ) -> SendAttempt:
+        """
+        记录一次发送尝试喵～ ✍️
+
+        Args:
+            target: 目标会话ID喵
+            strategy: 发送策略名喵
+            nodes: 实际发送的节点列表喵
+            duration: 耗时（秒）喵
+            success: 是否成功喵
+            response: OneBot 的响应喵
+            error: call_action 抛出的异常喵
+
+        Returns:
+            新的记录喵
+        """
+        if error is not None:
+            retcode = extract_retcode(error)
+        elif success:
+            retcode = 0
+        else:
+            retcode = extract_retcode(response) if response else None
+
+        attempt = SendAttempt(
+            timestamp=time.time(),
+            target=target,
+            strategy=strategy,
+            success=success,
+            duration=duration,
+            retcode=retcode,
+            error=str(error)[:200] if error is not None else "",
+            **payload_stats(nodes),
+        )
+        self.records.append(attempt)
+        return attempt
+
+    def recent(self, target: str | None = None, limit: int = 10) -> list[dict]:
+        """
+        获取最近的发送尝试喵～ 📋
+
+        Args:
+            target: 只看某个目标会话，为None时不过滤喵
+            limit: 最多返回的条数喵
+
+        Returns:
+            记录字典列表，最新的在前喵
+        """
+        result = []
+        for attempt in reversed(self.records):
+            if target is None or attempt.target == target:
+                result.append(asdict(attempt))
+                if len(result) >= limit:
+                    break
+        return result
+
+    def aggregate(self, target: str | None = None) -> list[dict]:
+        """
+        按 (目标, 策略) 汇总成功率和耗时喵～ 📊
+
+        Args:
+            target: 只汇总某个目标会话，为None时汇总全部喵
+
+        Returns:
+            汇总行列表，按目标和尝试次数排序喵
+        """
+        groups: dict[tuple[str, str], list[SendAttempt]] = {}
+        for attempt in self.records:
+            if target is None or attempt.target == target:
+                groups.setdefault((attempt.target, attempt.strategy), []).append(
+                    attempt
+                )
+
+        rows = []
+        for (row_target, strategy), attempts in groups.items():
+            durations = sorted(a.duration for a in attempts)
+            successes = sum(1 for a in attempts if a.success)
+            count = len(attempts)
+            retcodes = {}
+            for a in attempts:
+                if not a.success and a.retcode is not None:
+                    retcodes[a.retcode] = retcodes.get(a.retcode, 0) + 1
+            rows.append(
+                {
+                    "target": row_target,
+                    "strategy": strategy,
+                    "attempts": count,
+                    "successes": successes,
+                    "success_rate": successes / count,
+                    "p50": durations[(count - 1) // 2],
+                    "p95": durations[min(count - 1, int(count * 0.95))],
+                    "avg_bytes": sum(a.payload_bytes for a in attempts) / count,
+                    "avg_nodes": sum(a.nodes for a in attempts) / count,
+                    "failed_retcodes": retcodes,
+                }
+            )
+        rows.sort(key=lambda row: (row["target"], -row["attempts"]))
+        return rows
+
+    def render_text(self, target: str | None = None) -> str:
+        """
+        把汇总结果整理成聊天窗口里的文本喵～ 📝
+
+        Args:
+            target: 只看某个目标会话，为None时显示全部喵
+
+        Returns:
+            汇总文本喵
+        """
+        rows = self.aggregate(target)
+        if not rows:
+            return "还没有发送记录喵～ 📭"
+
+        lines = [f"📡 发送策略统计（最近 {len(self.records)} 次尝试）"]
+        current = None
+        for row in rows:
+            if row["target"] != current:
+                current = row["target"]
+                lines.append(f"\n🎯 {current}")
+            line = (
+                f"· {row['strategy']}: {row['successes']}/{row['attempts']} 成功"
+                f" ({row['success_rate']:.0%})，p50 {row['p50'] * 1000:.0f}ms"
+                f"，p95 {row['p95'] * 1000:.0f}ms"
+                f"，平均 {row['avg_nodes']:.0f} 节点 / {row['avg_bytes'] / 1024:.1f}KB"
+            )
+            if row["failed_retcodes"]:
+                codes = ", ".join(
+                    f"{code}×{count}" for code, count in row["failed_retcodes"].items()
+                )
+                line += f"，错误码 {codes}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,143 @@
+"""
+已发送消息跟踪模块喵～ 📝
+按目标会话记录已发送的批次和节点，用于去重，容量和有效期都有上限！
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+
+def node_key(node: dict) -> str:
+    """
+    根据节点内容生成稳定的去重键喵～ 🏷️
+
+    Args:
+        node: 转发节点字典喵
+
+    Returns:
+        同样内容的节点总是得到同样的键喵
+
+    Note:
+        节点里带有发送者、内容和时间，不同消息几乎不会冲突喵～ ✨
+    """
+    text = json.dumps(node, sort_keys=True, ensure_ascii=False, default=str)
+    return "node_" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class SentMessageTracker:
+    """
+    已发送消息跟踪器喵～ 📝
+    每个目标会话一个有序字典，按发送时间排列，同时限制条数和有效期！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - ✅ O(1) 记录和查询某个批次或节点是否已发送
+    - 📏 每个目标最多保留 max_per_target 条，超出时淘汰最旧的
+    - ⏰ 超过 ttl 秒的记录视为过期，清理时只处理过期的部分
+
+    Note:
+        所有操作都在同一个事件循环里进行，不需要加锁喵～ 🔓
+    """
+
+    def __init__(self, max_per_target: int = 2000, ttl: float = 86400):
+        """
+        初始化跟踪器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            max_per_target: 每个目标会话最多保留的记录数喵
+            ttl: 记录的有效期（秒）喵
+        """
+        self.max_per_target = max(1, int(max_per_target))
+        self.ttl = max(1.0, float(ttl))
+        self._targets: dict[str, OrderedDict[str, float]] = {}
+
+    @classmethod
+    def from_config(cls, config) -> "SentMessageTracker":
+        """
+        根据插件配置创建跟踪器喵～ ⚙️
+
+        Args:
+            config: 插件配置字典喵
+
+        Returns:
+            跟踪器实例喵
+        """
+        return cls(
+            max_per_target=config.get("sent_cache_size", 2000),
+            ttl=config.get("sent_cache_ttl", 86400),
+        )
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._targets.values())
+
+    def add(self, target_session: str, message_id: str):
+        """
+        记录一条已发送的消息喵～ 📝
+
+        Args:
+            target_session: 目标会话ID喵
+            message_id: 批次或节点的去重键喵
+        """
+        entries = self._targets.get(target_session)
+        if entries is None:
+            entries = self._targets[target_session] = OrderedDict()
+        entries[message_id] = time.time()
+        entries.move_to_end(message_id)
+        while len(entries) > self.max_per_target:
+            entries.popitem(last=False)
+
+    def contains(self, target_session: str, message_id: str) -> bool:
+        """
+        检查消息是否已经发送过喵～ 🔍
+
+        Args:
+            target_session: 目标会话ID喵
+            message_id: 批次或节点的去重键喵
+
+        Returns:
+            在有效期内发送过返回True喵
+        """
+        entries = self._targets.get(target_session)
+        if not entries:
+            return False
+        sent_at = entries.get(message_id)
+        if sent_at is None:
+            return False
+        if time.time() - sent_at > self.ttl:
+            del entries[message_id]
+            return False
+        return True
+
+    def clear(self, target_session: str):
+        """
+        清空一个目标会话的记录喵～ 🧹
+
+        Args:
+            target_session: 目标会话ID喵
+        """
+        self._targets.pop(target_session, None)
+
+    def cleanup(self) -> int:
+        """
+        清理所有过期记录喵～ 🗑️
+
+        Returns:
+            清理掉的记录数量喵
+
+        Note:
+            记录按时间排列，每个目标只需要从最旧的一端删到第一条未过期的喵～ ✨
+        """
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for target_session in list(self._targets):
+            entries = self._targets[target_session]
+            while entries:
+                oldest_id, sent_at = next(iter(entries.items()))
+                if sent_at > cutoff:
+                    break
+                del entries[oldest_id]
+                removed += 1
+            if not entries:
+                del self._targets[target_session]
+        return removed
@@ -0,0 +1,170 @@
+"""
+失败批次快照的媒体文件模块喵～ 📌
+快照里引用的本地临时文件会被复制到重试专用目录，临时文件被定期清理后重试依然能发出去！
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from collections.abc import Iterable
+
+from astrbot.api import logger
+
+# 本地文件引用的前缀，message_builder 给语音等组件加的就是这个喵～ 🏷️
+FILE_PREFIX = "file:///"
+
+
+def _batch_dir_name(key: Iterable[str]) -> str:
+    """按失败记录的键生成目录名喵～ 🔑"""
+    return hashlib.sha1("\x1f".join(key).encode("utf-8")).hexdigest()
+
+
+class SnapshotMediaStore:
+    """
+    失败批次快照的媒体目录喵～ 📌
+    每条失败记录一个子目录，记录被删除时整个子目录一起删除！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📌 pin：把快照里引用的本地文件复制进记录自己的目录，并改写快照里的路径
+    - 🗑️ release：失败记录被删除时删掉它的目录
+    - 🧹 collect_garbage：启动时删除已经没有失败记录的目录
+
+    Note:
+        优先用硬链接，不在同一个文件系统时才真正复制喵～ ⚡
+        复制和删除目录都在线程里进行，大的 GIF、视频不会卡住事件循环；
+        删除前先把目录改名，之后同一个键重新保存也不会被正在进行的删除影响喵！ 🧵
+    """
+
+    def __init__(self, media_dir: str):
+        """
+        初始化媒体目录喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            media_dir: 保存快照媒体的目录喵
+        """
+        self.media_dir = media_dir
+        # 正在后台删除的目录任务，保留引用避免被回收喵～ 🗑️
+        self._removals: set[asyncio.Task] = set()
+
+    def _batch_dir(self, key: Iterable[str]) -> str:
+        return os.path.join(self.media_dir, _batch_dir_name(key))
+
+    async def pin(self, key: tuple[str, ...], payload: dict) -> dict:
+        """
+        把快照引用的本地文件复制进记录的目录喵～ 📌
+
+        Args:
+            key: 失败记录的键喵
+            payload: 批次快照喵
+
+        Returns:
+            本地路径改成重试目录里的副本之后的新快照，原快照不会被修改喵
+        """
+        return await asyncio.to_thread(self._pin, key, payload)
+
+    def _pin(self, key: tuple[str, ...], payload: dict) -> dict:
+        """在线程里复制文件并生成新快照喵～ 🧵"""
+        batch_dir = self._batch_dir(key)
+        pinned: dict[str, str] = {}
+
+        def pin_path(path: str) -> str:
+            if path in pinned:
+                return pinned[path]
+            name = f"{len(pinned)}_{os.path.basename(path)}"
+            copy_path = os.path.join(batch_dir, name)
+            try:
+                os.makedirs(batch_dir, exist_ok=True)
+                try:
+                    os.link(path, copy_path)
+                except OSError:
+                    shutil.copy2(path, copy_path)
+            except Exception as e:
+                logger.warning(f"复制快照媒体文件 {path} 失败喵: {e} 😿")
+                copy_path = path
+            pinned[path] = copy_path
+            return copy_path
+
+        def convert(value):
+            if isinstance(value, dict):
+                return {
+                    k: pin_value(v) if k == "file" else convert(v)
+                    for k, v in value.items()
+                }
+            if isinstance(value, list):
+                return [convert(item) for item in value]
+            return value
+
+        def pin_value(value):
+            if not isinstance(value, str):
+                return convert(value)
+            if value.startswith(FILE_PREFIX):
+                path = value[len(FILE_PREFIX) :]
+                if os.path.isfile(path):
+                    return f"{FILE_PREFIX}{pin_path(path)}"
+            elif os.path.isabs(value) and os.path.isfile(value):
+                return pin_path(value)
+            return value
+
+        result = convert(payload)
+        if pinned:
+            logger.debug(f"已为失败批次保存 {len(pinned)} 个媒体文件喵～ 📌")
+        return result
+
+    def _remove_later(self, path: str) -> None:
+        """
+        把目录改名后在线程里删除喵～ 🗑️
+
+        Args:
+            path: 要删除的目录喵
+        """
+        trash = f"{path}.trash-{uuid.uuid4().hex}"
+        try:
+            os.rename(path, trash)
+        except OSError as e:
+            logger.warning(f"删除快照媒体目录 {path} 失败喵: {e} 😿")
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有运行中的事件循环时直接删除喵～ 🧹
+            shutil.rmtree(trash, ignore_errors=True)
+            return
+        task = loop.create_task(asyncio.to_thread(shutil.rmtree, trash, True))
+        self._removals.add(task)
+        task.add_done_callback(self._removals.discard)
+
+    def release(self, key: tuple[str, ...]) -> None:
+        """
+        删除失败记录的媒体目录喵～ 🗑️
+
+        Args:
+            key: 失败记录的键喵
+        """
+        batch_dir = self._batch_dir(key)
+        if os.path.isdir(batch_dir):
+            self._remove_later(batch_dir)
+
+    def collect_garbage(self, keys: Iterable[tuple[str, ...]]) -> int:
+        """
+        删除已经没有失败记录的媒体目录喵～ 🧹
+
+        Args:
+            keys: 仍然存在的失败记录的键喵
+
+        Returns:
+            删除的目录数量喵
+
+        Note:
+            上次没删完的改名目录也会在这里删除喵～ 🗑️
+        """
+        if not os.path.isdir(self.media_dir):
+            return 0
+        keep = {_batch_dir_name(key) for key in keys}
+        removed = 0
+        for name in os.listdir(self.media_dir):
+            if name not in keep:
+                self._remove_later(os.path.join(self.media_dir, name))
+                removed += 1
+        return removed
@@ -3,9 +3,14 @@ import hashlib
 import os
 import time
 import traceback
+from collections.abc import Mapping
 
 from astrbot.api import logger
 
+from ..config.task_registry import TASK_REMOVED, TaskEvent
+from ..utils.metrics import metrics
+from .cache_records import to_plain
+
 # 修改导入路径，使用forward子目录喵～ 📦
 from .forward import (
     CacheManager,
@@ -13,7 +18,11 @@ from .forward import (
     MessageBuilder,
     MessageSender,
     RetryManager,
+    RetryScheduler,
+    SendQueue,
+    SnapshotMediaStore,
 )
+from .session_cache import SessionCache
 
 
 class ForwardManager:
@@ -50,32 +59,56 @@ class ForwardManager:
         self.cache_manager = CacheManager(plugin)
         self.message_sender = MessageSender(plugin, self.download_helper)
         self.retry_manager = RetryManager(
-            plugin, self.cache_manager, self.message_builder, self.message_sender
+            plugin,
+            self.cache_manager,
+            self.message_builder,
+            self.message_sender,
+            send_payload=self._send_payload,
         )
 
         # 初始化转发状态追踪喵～ 🏁
         self._currently_forwarding = set()
         self._processing_forwards = set()
 
-        # 启动定期重试任务喵～ 🔄
-        asyncio.create_task(self.periodic_retry_operations())
+        # 排队中的批次引用的本地媒体文件，不受临时文件清理影响喵～ 📌
+        self.queue_media = SnapshotMediaStore(
+            os.path.join(self.plugin.data_dir, "queue_media")
+        )
 
-    async def periodic_retry_operations(self):
-        """
-        定期重试发送失败的消息喵～ 🔄
-        每小时检查一次失败的消息，然后重新尝试发送喵！
+        # 持久化发送队列，转发任务由工作协程异步投递喵～ 📮
+        self.send_queue = SendQueue(
+            os.path.join(self.plugin.data_dir, "send_queue.db"),
+            self._deliver_job,
+            workers=self.plugin.config.get("send_queue_workers", 2),
+            on_exhausted=self._on_job_exhausted,
+            on_removed=self._on_job_removed,
+        )
+        self.queue_media.collect_garbage(self.send_queue.pending_keys())
+        self.send_queue.start()
+
+        # 启动重试调度器，只在最早的重试到期时醒来喵～ ⏰
+        self.retry_manager.start()
+
+        # 转发请求：只有会话达到阈值时才会收到请求，同一会话的请求会合并喵～ 📬
+        # 每个 (任务ID, 会话ID) 一个工作协程，不同会话并发构建，总数受信号量限制喵～ 👷
+        self._pending_forward_requests: dict[tuple[str, str], bool] = {}
+        self._forward_workers: dict[tuple[str, str], asyncio.Task] = {}
+        self._forward_slots = asyncio.Semaphore(
+            max(1, int(self.plugin.config.get("forward_concurrency", 4)))
+        )
 
-        Note:
-            这是一个后台任务，会一直运行直到程序停止喵～ ⏰
-        """
-        while True:
-            try:
-                # 睡眠一小时喵～ 😴
-                await asyncio.sleep(3600)  # 每小时重试一次（原来是15分钟）
-                await self.retry_manager.retry_failed_messages()
-            except Exception as e:
-                # 重试操作失败了喵！记录错误 😿
-                logger.error(f"定期重试操作失败喵: {e}")
+        # 按等待时间触发的刷新调度器，键是 (任务ID, 会话ID) 喵～ ⏰
+        self.flush_scheduler = RetryScheduler(self._flush_due_session)
+        self.flush_scheduler.start()
+        # 启动后再检查已有缓存的会话，不拖慢插件初始化喵～ 💤
+        self._pending_flush_setup = asyncio.create_task(self.schedule_pending_flushes())
+        # 任务被修改或删除时只重新安排这个任务的定时器喵～ 📣
+        self.plugin.task_registry.subscribe(self._on_task_event)
+
+        # 队列深度在取值时才读取喵～ 🌡️
+        metrics.gauge("retry_queue_depth", lambda: len(self.retry_manager.scheduler))
+        metrics.gauge("send_queue_depth", self.send_queue.pending_count)
+        metrics.gauge("flush_timers", lambda: len(self.flush_scheduler))
 
     def save_failed_messages_cache(self):
         """
@@ -141,7 +174,186 @@ class ForwardManager:
         """
         await self.retry_manager.retry_failed_messages()
 
-    async def forward_messages(self, task_id: str, session_id: str):
+    def request_forward(
+        self, task_id: str, session_id: str, force: bool = False
+    ) -> bool:
+        """
+        请求转发一个已达到阈值的会话喵～ 📬
+        由消息监听器在有效消息数量达到阈值时调用，不会阻塞消息处理！
+
+        Args:
+            task_id: 任务ID喵
+            session_id: 会话ID喵
+            force: 是否忽略消息数量阈值（等待超时或批次过大时）喵
+
+        Returns:
+            新加入队列返回True，已有等待中的请求时返回False喵
+
+        Note:
+            同一会话在被处理前的多次请求只会转发一次，
+            其中任意一次要求强制转发时就会强制转发喵～ 🤝
+        """
+        metrics.inc("forward_triggers_total", reason="flush" if force else "threshold")
+        key = (task_id, session_id)
+        if key in self._pending_forward_requests:
+            self._pending_forward_requests[key] |= force
+            return False
+        self._pending_forward_requests[key] = force
+        if key not in self._forward_workers:
+            self._forward_workers[key] = asyncio.create_task(
+                self._run_forward_worker(key)
+            )
+        return True
+
+    def get_flush_limits(self, task: dict) -> tuple[float, int]:
+        """
+        获取任务的等待时间和批次大小上限喵～ ⚙️
+
+        Args:
+            task: 任务配置字典喵
+
+        Returns:
+            (最长等待秒数, 最大批次字节数)，0 表示不启用喵
+        """
+        max_wait = task.get(
+            "max_wait_seconds", self.plugin.config.get("default_max_wait_seconds", 0)
+        )
+        max_bytes = task.get(
+            "max_batch_bytes", self.plugin.config.get("default_max_batch_bytes", 0)
+        )
+        try:
+            return max(0.0, float(max_wait or 0)), max(0, int(max_bytes or 0))
+        except (TypeError, ValueError):
+            logger.warning(
+                f"任务 {task.get('id')} 的刷新配置无效喵: "
+                f"max_wait_seconds={max_wait}, max_batch_bytes={max_bytes} 😿"
+            )
+            return 0.0, 0
+
+    def schedule_flush(self, task: dict, task_id: str, session_id: str):
+        """
+        检查会话的时间和大小触发条件喵～ ⏰
+        批次超过大小上限时立即请求转发，否则在最早一条消息等待超时时转发！
+
+        Args:
+            task: 任务配置字典喵
+            task_id: 任务ID喵
+            session_id: 会话ID喵
+
+        Note:
+            每个会话只保留一个定时器，已经安排过的会话不会被推迟喵～ 🤝
+        """
+        cache = self.plugin.message_cache.get(task_id, {}).get(session_id)
+        if not isinstance(cache, SessionCache) or not cache.forwardable_count():
+            return
+
+        max_wait, max_bytes = self.get_flush_limits(task)
+        if max_bytes and cache.total_bytes >= max_bytes:
+            logger.info(
+                f"任务 {task_id}: 会话 {session_id} 缓存大小 ({cache.total_bytes} 字节) "
+                f"达到上限 ({max_bytes} 字节)，立即转发喵～ 📦"
+            )
+            self.flush_scheduler.cancel((task_id, session_id))
+            self.request_forward(task_id, session_id, force=True)
+            return
+
+        key = (task_id, session_id)
+        if max_wait and self.flush_scheduler.get_due(key) is None:
+            first_cached = cache.oldest_timestamp() or time.time()
+            self.flush_scheduler.schedule(key, first_cached + max_wait)
+
+    async def schedule_pending_flushes(self):
+        """
+        为启动时已有缓存的会话安排刷新定时器喵～ 🚀
+
+        Note:
+            重启前等待的消息按原来的时间戳计算，已经超时的会马上转发喵！ ⏰
+            没有设置等待时间和大小上限的任务不需要检查，其他会话逐个检查并让出事件循环，
+            只有这些会话的缓存会在这里被转换喵～ 💤
+        """
+        for task_id, sessions in list(self.plugin.message_cache.items()):
+            task = self.plugin.get_task_by_id(task_id)
+            if not task or not task.get("enabled", True):
+                continue
+            if self.get_flush_limits(task) == (0.0, 0):
+                continue
+            for session_id in list(sessions):
+                self.schedule_flush(task, task_id, session_id)
+                await asyncio.sleep(0)
+
+    def _on_task_event(self, event: TaskEvent):
+        """
+        任务变更事件的回调，按新的配置重新安排这个任务的刷新定时器喵～ 📣
+
+        Args:
+            event: 任务变更事件喵
+
+        Note:
+            删除或禁用的任务只取消定时器，其他任务的定时器不受影响喵～ 🤝
+        """
+        task_id = event.task_id
+        sessions = list(self.plugin.message_cache.get(task_id, {}))
+        for session_id in sessions:
+            self.flush_scheduler.cancel((task_id, session_id))
+        if event.kind == TASK_REMOVED or not event.task or not event.task.enabled:
+            return
+        for session_id in sessions:
+            self.schedule_flush(event.task.raw, task_id, session_id)
+
+    async def _flush_due_session(self, key: tuple[str, str]):
+        """
+        会话等待超时的回调，强制转发已缓存的消息喵～ ⏰
+
+        Args:
+            key: (任务ID, 会话ID) 喵
+        """
+        task_id, session_id = key
+        logger.info(
+            f"任务 {task_id}: 会话 {session_id} 的消息等待超时，强制转发喵～ ⏰"
+        )
+        self.request_forward(task_id, session_id, force=True)
+
+    async def _run_forward_worker(self, key: tuple[str, str]):
+        """
+        处理一个会话转发请求的工作协程喵～ 👷
+
+        Args:
+            key: (任务ID, 会话ID) 喵
+
+        Note:
+            同一会话的请求在这里依次处理，不会被并发构建；
+            不同会话各有自己的工作协程，一个会话卡在慢的 API 调用或下载上不会拖住其他会话，
+            同时构建的会话数量不超过 forward_concurrency 喵！ ⚠️
+        """
+        task_id, session_id = key
+        try:
+            while key in self._pending_forward_requests:
+                async with self._forward_slots:
+                    # 先移除等待标记，处理期间到达的新消息可以再次请求喵～ 🏷️
+                    force = self._pending_forward_requests.pop(key, False)
+                    try:
+                        await self.forward_messages(task_id, session_id, force=force)
+                    except Exception as e:
+                        logger.error(
+                            f"处理任务 {task_id} 会话 {session_id} 的转发请求时出错喵: {e} 😿"
+                        )
+        finally:
+            self._forward_workers.pop(key, None)
+
+    def stop(self):
+        """
+        停止转发请求和刷新定时器的后台任务喵～ 🔚
+        """
+        self.flush_scheduler.stop()
+        if not self._pending_flush_setup.done():
+            self._pending_flush_setup.cancel()
+        for worker in list(self._forward_workers.values()):
+            if not worker.done():
+                worker.cancel()
+
+    async def forward_messages(
+        self, task_id: str, session_id: str, force: bool = False
+    ):
         """
         转发消息到目标会话喵～ 📬
         这是主要的转发逻辑，会处理所有的转发流程！
@@ -149,9 +361,11 @@ class ForwardManager:
         Args:
             task_id: 任务ID喵
             session_id: 会话ID喵
+            force: 是否忽略消息数量阈值，转发所有已缓存的有效消息喵
 
         Note:
-            会自动处理消息构建、发送和错误处理喵～ ⚡
+            这里只负责构建节点并写入发送队列，真正的投递由队列工作协程完成，
+            不会阻塞消息处理链喵～ ⚡
         """
         # 生成函数级别的锁定键，包含任务和会话信息喵～ 🔐
         function_key = f"forward_{task_id}_{session_id}"
@@ -193,6 +407,28 @@ class ForwardManager:
                 )
                 return
 
+            max_messages = task.get(
+                "max_messages", self.plugin.config.get("default_max_messages", 20)
+            )
+
+            # 会话缓存自带计数，未达到阈值时不用扫描消息喵～ ⚡
+            if (
+                not force
+                and isinstance(messages, SessionCache)
+                and messages.forwardable_count() < max_messages
+            ):
+                logger.debug(
+                    f"任务 {task_id}: 会话 {session_id} 有效消息数量 ({messages.forwardable_count()}) 未达到阈值 ({max_messages})，暂不转发喵～ ⏳"
+                )
+                return
+
+            # 记下这一批的边界，构建节点期间新到的消息不会被清掉喵～ 🔖
+            forward_upto = (
+                messages.next_seq
+                if isinstance(messages, SessionCache)
+                else len(messages)
+            )
+
             # 先筛选有效消息喵～ 🔍
             valid_messages = []
             for msg in messages:
@@ -204,10 +440,7 @@ class ForwardManager:
                     logger.warning(f"跳过空消息喵: {msg} 🚫")
 
             # 检查有效消息阈值喵～ 📊
-            max_messages = task.get(
-                "max_messages", self.plugin.config.get("default_max_messages", 20)
-            )
-            if len(valid_messages) < max_messages:
+            if not force and len(valid_messages) < max_messages:
                 logger.debug(
                     f"任务 {task_id}: 会话 {session_id} 有效消息数量 ({len(valid_messages)}) 未达到阈值 ({max_messages})，暂不转发喵～ ⏳"
                 )
@@ -235,6 +468,19 @@ class ForwardManager:
             is_group = "Group" in source_type
             source_name = f"群 {source_id}" if is_group else f"用户 {source_id}"
 
+            # 节点构建耗时包含昵称预热喵～ ⏱️
+            build_started = time.perf_counter()
+
+            # 群消息里有未带昵称的 @ 时，先用群成员列表批量预热昵称缓存喵～ 🔥
+            if is_group and any(
+                isinstance(comp, Mapping)
+                and comp.get("type") == "at"
+                and not comp.get("name")
+                for msg in valid_messages
+                for comp in msg.get("messages", [])
+            ):
+                await self.message_builder.nickname_cache.prewarm_group(source_id)
+
             # 构建节点列表喵～ 🏗️
             nodes_list = []
 
@@ -245,7 +491,7 @@ class ForwardManager:
 
                 # 先检查是否有转发组件喵～ 🔍
                 for comp in message_components:
-                    if isinstance(comp, dict) and comp.get("type") == "forward":
+                    if isinstance(comp, Mapping) and comp.get("type") == "forward":
                         if "nodes" in comp and isinstance(comp["nodes"], list):
                             # 创建嵌套转发消息的节点，使用原始转发ID喵～ 📤
                             forward_id = comp.get("id", "未知ID")
@@ -287,6 +533,7 @@ class ForwardManager:
                 source_name, len(valid_messages)
             )
             nodes_list.append(footer_node)
+            metrics.observe("node_build_seconds", time.perf_counter() - build_started)
 
             # 生成这批消息的防重复标识符喵～ 🛡️
             message_batch_content = str(
@@ -311,209 +558,54 @@ class ForwardManager:
             logger.debug(f"开始转发任务: {forwarding_key} 喵～ 🚀")
 
             try:
-                # 向每个目标会话发送消息喵～ 📤
+                # 把每个目标的投递任务写入持久化发送队列喵～ 📮
+                queued_count = 0
                 for target_session in target_sessions:
-                    try:
-                        # 解析目标会话信息喵～ 🔍
-                        target_parts = (
-                            target_session.split(":", 2)
-                            if ":" in target_session
-                            else []
-                        )
-                        if len(target_parts) != 3:
-                            logger.warning(f"目标会话格式无效喵: {target_session} ❌")
-                            continue
-
-                        target_platform, target_type, target_id = target_parts
-
-                        platform = None
-                        adapter_type = None
-
-                        ctx = getattr(self.plugin, "context", None)
-                        if ctx:
-                            try:
-                                platform = ctx.get_platform(target_platform)
-                            except Exception:
-                                platform = None
-
-                            if not platform and hasattr(ctx, "get_platform_inst"):
-                                try:
-                                    platform = ctx.get_platform_inst(target_platform)
-                                except Exception:
-                                    platform = None
-
-                            if platform and hasattr(platform, "meta"):
-                                try:
-                                    meta_obj = platform.meta()
-
-                                    for attr in (
-                                        "name",
-                                        "type",
-                                        "adapter",
-                                        "platform_type",
-                                    ):
-                                        val = getattr(meta_obj, attr, None)
-                                        if val:
-                                            adapter_type = val
-                                            break
-                                    if not adapter_type:
-                                        adapter_type = getattr(meta_obj, "id", None)
-                                except Exception:
-                                    adapter_type = None
-
-                        if not platform:
-                            diagnostics = []
-                            try:
-                                pm = getattr(ctx, "platform_manager", None)
-                                collected = set()
-                                for attr in ("platforms", "_platforms", "instances"):
-                                    container = getattr(pm, attr, None)
-                                    if isinstance(container, dict):
-                                        for k, v in container.items():
-                                            if k in collected:
-                                                continue
-                                            collected.add(k)
-                                            typ = None
-                                            try:
-                                                if hasattr(v, "meta"):
-                                                    m = v.meta()
-                                                    typ = (
-                                                        getattr(m, "name", None)
-                                                        or getattr(m, "type", None)
-                                                        or getattr(m, "adapter", None)
-                                                    )
-                                            except Exception:
-                                                typ = None
-                                            diagnostics.append(f"{k}=>{typ or '?'}")
-                                if diagnostics:
-                                    logger.warning(
-                                        f"未找到平台适配器喵: {target_platform} 😿 | 已加载: {', '.join(diagnostics)}"
-                                    )
-                                else:
-                                    logger.warning(
-                                        f"未找到平台适配器喵: {target_platform} 😿 (无法获取平台管理器诊断)"
-                                    )
-                            except Exception:
-                                logger.warning(
-                                    f"未找到平台适配器喵: {target_platform} 😿 (诊断阶段异常)"
-                                )
-                            continue
-
-                        # 统一一个发送判定：原逻辑只看字符串 == aiocqhttp；现在也看真实 adapter_type
-                        is_aiocqhttp = (
-                            target_platform == "aiocqhttp"
-                            or adapter_type == "aiocqhttp"
-                        )
+                    target_parts = (
+                        target_session.split(":", 2) if ":" in target_session else []
+                    )
+                    if len(target_parts) != 3:
+                        logger.warning(f"目标会话格式无效喵: {target_session} ❌")
+                        continue
 
-                        # 生成这次转发的批次ID喵～ 🆔
-                        batch_id = f"forward_{target_session}_{batch_hash}"
-
-                        # 根据平台选择发送方式喵～ 🎯
-                        if is_aiocqhttp:
-                            # 若启用单条消息模式，则跳过合并转发，直接逐条发送
-                            if self.plugin.config.get("send_single_messages", False):
-                                logger.info(
-                                    f"send_single_messages 已启用，跳过合并转发，改用单条发送 -> {target_session}"
-                                )
-                                # 根据用户偏好：默认不发送提示头
-                                header_text = ""
-                                single_ok = (
-                                    await self.message_sender.send_with_fallback(
-                                        target_session, nodes_list, None, header_text
-                                    )
-                                )
-                                if single_ok:
-                                    self.cache_manager.remove_failed_message(
-                                        target_session, task_id, session_id
-                                    )
-                                    logger.info(
-                                        f"单条消息模式下，成功将消息发送到 {target_session} 喵～ ✅"
-                                    )
-                                else:
-                                    self.cache_manager.add_failed_message(
-                                        target_session, task_id, session_id
-                                    )
-                                    logger.error(
-                                        f"单条消息模式发送失败: {target_session} 😿"
-                                    )
-                                continue
-
-                            logger.debug(
-                                f"开始尝试发送QQ合并转发消息到 {target_session} 喵～ 📡"
-                            )
-                            api_result = await self.send_forward_message_via_api(
-                                target_session, nodes_list
-                            )
+                    payload = {"source_name": source_name, "nodes": nodes_list}
+                    if target_parts[0] != "aiocqhttp":
+                        # 非QQ平台按原始消息逐条发送，需要保留消息数据喵～ 📱
+                        payload["valid_messages"] = to_plain(valid_messages)
 
-                            if api_result:
-                                # 发送成功，标记批次ID防止重复喵～ ✅
-                                self.message_sender._add_sent_message(
-                                    target_session, batch_id
-                                )
-                                # 清除失败缓存喵～ 🧹
-                                self.cache_manager.remove_failed_message(
-                                    target_session, task_id, session_id
-                                )
-                                logger.info(
-                                    f"成功将消息转发到 {target_session} 喵～ ✅"
-                                )
-                            else:
-                                logger.error(
-                                    f"发送转发消息到 {target_session} 失败喵～ 😿"
-                                )
-                                # 只有真正失败时才记录失败缓存喵～ 💾
-                                self.cache_manager.add_failed_message(
-                                    target_session, task_id, session_id
-                                )
-
-                        else:
-                            # 非QQ平台使用常规方式发送喵～ 📱
-                            try:
-                                non_qq_result = (
-                                    await self.message_sender.send_to_non_qq_platform(
-                                        target_session, source_name, valid_messages
-                                    )
-                                )
-                                if non_qq_result:
-                                    # 非QQ平台发送成功后才标记批次ID喵～ 🆔
-                                    self.message_sender._add_sent_message(
-                                        target_session, batch_id
-                                    )
-                                    logger.info(
-                                        f"成功将消息转发到 {target_session} 喵～ ✅"
-                                    )
-                                else:
-                                    logger.error(
-                                        f"发送转发消息到 {target_session} 失败喵～ 😿"
-                                    )
-                                    # 非QQ平台发送失败时也记录失败缓存喵～ 💾
-                                    self.cache_manager.add_failed_message(
-                                        target_session, task_id, session_id
-                                    )
-                            except Exception as send_error:
-                                logger.error(
-                                    f"发送转发消息到 {target_session} 出错喵: {send_error} 😿"
-                                )
-                                # 发送出错时记录失败缓存喵～ 💾
-                                self.cache_manager.add_failed_message(
-                                    target_session, task_id, session_id
-                                )
+                    # 队列可能推迟或跨重启投递，引用的临时文件先复制一份喵～ 📌
+                    payload = await self.queue_media.pin(
+                        (target_session, batch_hash), payload
+                    )
+                    if self.send_queue.enqueue(
+                        target_session, task_id, session_id, batch_hash, payload
+                    ):
+                        queued_count += 1
+                    else:
+                        logger.warning(
+                            f"批次 {batch_hash} 已在 {target_session} 的发送队列中，跳过喵～ 🚫"
+                        )
 
-                    except Exception as e:
-                        # 外层异常处理：记录严重错误但不重复添加失败缓存 😿
-                        logger.error(f"转发过程中发生严重错误喵: {e}")
-                        logger.error(traceback.format_exc())
-                        # 注意：不再重复添加失败缓存，因为内层已经处理了具体的发送失败情况
+                logger.info(
+                    f"任务 {task_id}: 已将 {queued_count} 个转发任务加入发送队列喵～ 📮"
+                )
 
-                # 清除已处理的消息缓存喵～ 🧹
-                if (
-                    task_id in self.plugin.message_cache
-                    and session_id in self.plugin.message_cache[task_id]
-                ):
-                    self.plugin.message_cache[task_id][session_id] = []
+                # 只清除已转发的这一批消息，构建期间新缓存的消息继续等待喵～ 🧹
+                sessions = self.plugin.message_cache.get(task_id, {})
+                if sessions.get(session_id) is messages:
+                    if isinstance(messages, SessionCache):
+                        removed = messages.discard_forwarded(forward_upto)
+                    else:
+                        removed = len(messages[:forward_upto])
+                        del messages[:forward_upto]
+                    self.flush_scheduler.cancel((task_id, session_id))
                     logger.info(
-                        f"任务 {task_id}: 已清除会话 {session_id} 的消息缓存喵～ ✨"
+                        f"任务 {task_id}: 已从会话 {session_id} 的缓存中清除 {removed} 条已转发消息，"
+                        f"剩余 {len(messages)} 条喵～ ✨"
                     )
+                    if messages:
+                        # 剩下的消息按自己的时间重新安排刷新定时器喵～ ⏰
+                        self.schedule_flush(task, task_id, session_id)
 
                 self.plugin.save_message_cache()
 
@@ -546,3 +638,174 @@ class ForwardManager:
                     logger.debug(f"完成转发函数，清除标记: {function_key} 喵～ ✅")
             except Exception as cleanup_error:
                 logger.error(f"清理转发函数标记时出错: {cleanup_error} 喵～ 😿")
+
+    async def _deliver_job(self, job: dict) -> bool | float:
+        """
+        投递发送队列中的一个转发任务喵～ 📤
+        由发送队列的工作协程调用，负责把节点真正发到目标会话！
+
+        Args:
+            job: 发送队列中的任务字典喵
+
+        Returns:
+            任务已处理完成（成功或已转入失败缓存）返回True，
+            需要稍后重新投递返回False，目标熔断中时返回需要推迟的秒数喵～
+
+        Note:
+            发送失败的批次会连同节点快照交给重试管理器，重试时原样重发喵！ 🔄
+        """
+        target_session = job["target_session"]
+        task_id = job["task_id"]
+        session_id = job["source_session"]
+        batch_hash = job["batch_hash"]
+        payload = job["payload"]
+
+        # 生成这次转发的批次ID喵～ 🆔
+        batch_id = f"forward_{target_session}_{batch_hash}"
+
+        # 至少一次投递：已经确认发送过的批次直接跳过喵～ 🛡️
+        if self.message_sender._is_message_sent(target_session, batch_id):
+            logger.info(f"批次 {batch_id} 已发送过，跳过重复投递喵～ ⏭️")
+            return True
+
+        # 目标熔断中：不走发送策略，直接推迟到冷却结束喵～ 🔌
+        circuit_breaker = self.message_sender.circuit_breaker
+        if not circuit_breaker.allow(target_session):
+            wait = max(1.0, circuit_breaker.retry_after(target_session))
+            logger.debug(f"目标 {target_session} 熔断中，推迟 {wait:.0f} 秒投递喵～ ⏸️")
+            return wait
+
+        result = await self._send_payload(target_session, payload)
+        if result is None:
+            # 找不到平台适配器，交给发送队列稍后重新投递喵～ ⏳
+            return False
+
+        if result:
+            # 发送成功，标记批次ID防止重复喵～ ✅
+            self.message_sender._add_sent_message(target_session, batch_id)
+            logger.info(f"成功将消息转发到 {target_session} 喵～ ✅")
+        else:
+            # 只有真正失败时才记录失败快照喵～ 💾
+            await self.retry_manager.record_failure(
+                target_session, task_id, session_id, batch_hash, payload
+            )
+        return True
+
+    async def _on_job_exhausted(self, job: dict):
+        """
+        发送队列放弃投递时的回调，把批次快照交给重试管理器喵～ 🧾
+
+        Args:
+            job: 用完投递次数的队列任务喵
+
+        Note:
+            源消息缓存在入队时已经清掉了，不转交的话这批消息就彻底丢了喵！ ⚠️
+        """
+        await self.retry_manager.record_failure(
+            job["target_session"],
+            job["task_id"],
+            job["source_session"],
+            job["batch_hash"],
+            job["payload"],
+        )
+
+    def _on_job_removed(self, job: dict):
+        """
+        队列任务被删除后的回调，释放它复制的媒体文件喵～ 🗑️
+
+        Args:
+            job: 已经删除的队列任务喵
+        """
+        self.queue_media.release((job["target_session"], job["batch_hash"]))
+
+    async def _send_payload(self, target_session: str, payload: dict) -> bool | None:
+        """
+        按目标平台发送一个批次快照喵～ 🎯
+        投递和重试共用这一个发送入口！
+
+        Args:
+            target_session: 目标会话ID喵
+            payload: 批次快照，包含 source_name、nodes 以及非QQ平台的 valid_messages 喵
+
+        Returns:
+            发送成功返回True，失败返回False，找不到平台适配器时返回None喵
+
+        Note:
+            发送结果会记录到目标的熔断器中喵～ 🔌
+        """
+        result = await self._send_payload_to_platform(target_session, payload)
+        if result is not None:
+            circuit_breaker = self.message_sender.circuit_breaker
+            if result:
+                circuit_breaker.record_success(target_session)
+            else:
+                circuit_breaker.record_failure(
+                    target_session,
+                    self.message_sender.last_send_errors.pop(target_session, None),
+                )
+        return result
+
+    async def _send_payload_to_platform(
+        self, target_session: str, payload: dict
+    ) -> bool | None:
+        """
+        根据目标平台选择发送方式喵～ 📡
+
+        Args:
+            target_session: 目标会话ID喵
+            payload: 批次快照喵
+
+        Returns:
+            发送成功返回True，失败返回False，找不到平台适配器时返回None喵
+        """
+        nodes_list = payload.get("nodes", [])
+        source_name = payload.get("source_name", "")
+        valid_messages = payload.get("valid_messages", [])
+
+        target_platform, target_type, target_id = target_session.split(":", 2)
+
+        # 通过平台解析缓存获取适配器信息，找不到时由解析器输出诊断喵～ 🧭
+        platform_info = self.plugin.platform_resolver.resolve(target_platform)
+        if platform_info is None:
+            return None
+
+        # 统一一个发送判定：原逻辑只看字符串 == aiocqhttp；现在也看真实 adapter_type
+        is_aiocqhttp = (
+            target_platform == "aiocqhttp" or platform_info.adapter_type == "aiocqhttp"
+        )
+
+        # 根据平台选择发送方式喵～ 🎯
+        if is_aiocqhttp:
+            # 若启用单条消息模式，则跳过合并转发，直接逐条发送
+            if self.plugin.config.get("send_single_messages", False):
+                logger.info(
+                    f"send_single_messages 已启用，跳过合并转发，改用单条发送 -> {target_session}"
+                )
+                # 根据用户偏好：默认不发送提示头
+                header_text = ""
+                single_ok = await self.message_sender.send_with_fallback(
+                    target_session, nodes_list, None, header_text
+                )
+                if not single_ok:
+                    logger.error(f"单条消息模式发送失败: {target_session} 😿")
+                return single_ok
+
+            logger.debug(f"开始尝试发送QQ合并转发消息到 {target_session} 喵～ 📡")
+            api_result = await self.send_forward_message_via_api(
+                target_session, nodes_list
+            )
+            if not api_result:
+                logger.error(f"发送转发消息到 {target_session} 失败喵～ 😿")
+            return api_result
+
+        # 非QQ平台使用常规方式发送喵～ 📱
+        try:
+            non_qq_result = await self.message_sender.send_to_non_qq_platform(
+                target_session, source_name, valid_messages
+            )
+            if not non_qq_result:
+                logger.error(f"发送转发消息到 {target_session} 失败喵～ 😿")
+            return non_qq_result
+        except Exception as send_error:
+            logger.error(f"发送转发消息到 {target_session} 出错喵: {send_error} 😿")
+            return False
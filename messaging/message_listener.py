@@ -1,13 +1,15 @@
 import re
 import time
-from typing import Any
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 from astrbot.api.message_components import Plain
 
 # 更新导入路径喵～ 📦
+from ..utils.metrics import metrics
+from .cache_records import CachedMessage
 from .message_serializer import async_serialize_message
+from .session_cache import SessionCache, is_empty_message
 
 
 class MessageListener:
@@ -166,6 +168,7 @@ class MessageListener:
         Note:
             会自动过滤重复消息和插件指令喵～ 🔍
         """
+        metrics.inc("events_received_total")
         try:
             # 获取消息ID，避免重复处理喵～ 🆔
             try:
@@ -205,6 +208,7 @@ class MessageListener:
             # 检查消息是否已经处理过喵～ 🔍
             if self._is_message_processed(message_id):
                 logger.debug(f"消息 {message_id} 已经处理过，跳过喵～ ⏭️")
+                metrics.inc("dedup_hits_total")
                 return
 
             # 检查是否是机器人自己发送的消息，避免循环发送喵～ 🔄
@@ -246,11 +250,9 @@ class MessageListener:
 
                 # 从插件上下文动态获取机器人ID进行额外检查喵～ 🤖
                 try:
-                    if hasattr(self.plugin, "context"):
-                        dynamic_bot_id = str(
-                            self.plugin.context.get_platform("aiocqhttp")
-                            .get_client()
-                            .self_id
+                    if hasattr(self.plugin, "platform_resolver"):
+                        dynamic_bot_id = self.plugin.platform_resolver.get_self_id(
+                            "aiocqhttp"
                         )
                         if sender_id and sender_id == dynamic_bot_id:
                             logger.warning(
@@ -308,9 +310,15 @@ class MessageListener:
 
             # 获取消息平台名称，判断是否为 aiocqhttp喵～ 🤖
             # platform_name = event.get_platform_name()
-            self.message_count += 1  # 获取已启用的任务喵～ ✅
-            enabled_tasks = self.plugin.get_all_enabled_tasks()
-            logger.debug(f"获取到 {len(enabled_tasks)} 个已启用任务喵～ 📊")
+            self.message_count += 1
+            # 用任务注册表的监听索引找出要缓存这条消息的已启用任务喵～ 🗺️
+            matched_tasks = self.plugin.task_registry.route(
+                event.unified_msg_origin,
+                event.get_group_id(),
+                event.get_sender_id(),
+                event.get_message_type().name == "GROUP_MESSAGE",
+            )
+            logger.debug(f"匹配到 {len(matched_tasks)} 个已启用任务喵～ 📊")
 
             # 优先使用事件的message_str属性喵～ 📝
             if not plain_text and hasattr(event.message_obj, "message_str"):
@@ -417,306 +425,295 @@ class MessageListener:
 
             # 开始针对每个任务进行处理喵～ 🎯
             task_matched = False
-            for task in enabled_tasks:
+            for task in matched_tasks:
                 task_id = task.get("id")
+                task_matched = True
+                metrics.inc("route_matches_total")
+                # 确保消息非空 - 优先使用各种方式确保获取到内容喵～ 📝
+                session_id = event.unified_msg_origin
 
-                # 检查是否应该监听此消息喵～ 🔍
-                should_monitor = self._should_monitor_message(task, event)
-                should_monitor_user = self._should_monitor_user(task, event)
-                should_monitor_group_user = self._should_monitor_group_user(task, event)
-
-                logger.debug(
-                    f"任务 {task_id} 监听判断结果喵: 常规监听={should_monitor}, 用户监听={should_monitor_user}, 群内用户监听={should_monitor_group_user} 📊"
-                )
+                # 重置特殊表情标记，单独检测每个任务喵～ 🔄
+                task_has_mface = has_mface
 
-                if should_monitor or should_monitor_user or should_monitor_group_user:
-                    task_matched = True
-                    # 确保消息非空 - 优先使用各种方式确保获取到内容喵～ 📝
-                    session_id = event.unified_msg_origin
-
-                    # 重置特殊表情标记，单独检测每个任务喵～ 🔄
-                    task_has_mface = has_mface
-
-                    # 初始化缓存喵～ 💾
-                    if task_id not in self.plugin.message_cache:
-                        self.plugin.message_cache[task_id] = {}
-                    if session_id not in self.plugin.message_cache[task_id]:
-                        self.plugin.message_cache[task_id][session_id] = []
+                # 初始化缓存喵～ 💾
+                if task_id not in self.plugin.message_cache:
+                    self.plugin.message_cache[task_id] = {}
+                if session_id not in self.plugin.message_cache[task_id]:
+                    self.plugin.message_cache[task_id][session_id] = SessionCache()
 
-                    # 获取消息详情喵～ 📊
-                    timestamp = int(time.time())
-                    mface_components = [
-                        msg for msg in serialized_messages if msg.get("is_mface")
-                    ]
+                # 获取消息详情喵～ 📊
+                timestamp = int(time.time())
+                mface_components = [
+                    msg for msg in serialized_messages if msg.get("is_mface")
+                ]
 
-                    logger.debug(
-                        f"详细消息对象喵: {event.message_obj.__dict__ if hasattr(event.message_obj, '__dict__') else 'No __dict__'} 📋"
-                    )
+                logger.debug(
+                    f"详细消息对象喵: {event.message_obj.__dict__ if hasattr(event.message_obj, '__dict__') else 'No __dict__'} 📋"
+                )
 
-                    # 序列化消息 - 保存之前已探测到的特殊表情喵～ 📦
+                # 序列化消息 - 保存之前已探测到的特殊表情喵～ 📦
+                with metrics.timer("serialize_seconds"):
                     task_serialized_messages = await async_serialize_message(
                         messages if messages else [], event
                     )
 
-                    # 合并普通消息和特殊表情消息喵～ 🔗
-                    for mface_msg in mface_components:
-                        task_serialized_messages.append(mface_msg)
+                # 合并普通消息和特殊表情消息喵～ 🔗
+                for mface_msg in mface_components:
+                    task_serialized_messages.append(mface_msg)
 
-                    serialized_messages = task_serialized_messages
+                serialized_messages = task_serialized_messages
 
-                    # 方法1: 直接从message属性获取喵～ 📋
-                    if (
-                        not task_has_mface
-                        and hasattr(event.message_obj, "message")
-                        and isinstance(event.message_obj.message, list)
-                    ):
-                        for msg in event.message_obj.message:
-                            if isinstance(msg, dict) and msg.get("type") == "mface":
-                                task_has_mface = True
-                                logger.warning(f"从message列表找到mface喵: {msg} 😸")
-                                # 提取数据喵～ 📊
-                                data = msg.get("data", {})
-                                url = data.get("url", "")
-                                summary = data.get("summary", "[表情]")
-                                emoji_id = data.get("emoji_id", "")
-                                package_id = data.get("emoji_package_id", "")
-                                key = data.get("key", "")
-                                mface_as_image = {
-                                    "type": "image",
-                                    "url": url,
-                                    "summary": summary,
-                                    "emoji_id": emoji_id,
-                                    "emoji_package_id": package_id,
-                                    "key": key,
-                                    "is_mface": True,
-                                    "is_gif": True,
-                                    "flash": True,
-                                }
-                                serialized_messages.append(mface_as_image)
+                # 方法1: 直接从message属性获取喵～ 📋
+                if (
+                    not task_has_mface
+                    and hasattr(event.message_obj, "message")
+                    and isinstance(event.message_obj.message, list)
+                ):
+                    for msg in event.message_obj.message:
+                        if isinstance(msg, dict) and msg.get("type") == "mface":
+                            task_has_mface = True
+                            logger.warning(f"从message列表找到mface喵: {msg} 😸")
+                            # 提取数据喵～ 📊
+                            data = msg.get("data", {})
+                            url = data.get("url", "")
+                            summary = data.get("summary", "[表情]")
+                            emoji_id = data.get("emoji_id", "")
+                            package_id = data.get("emoji_package_id", "")
+                            key = data.get("key", "")
+                            mface_as_image = {
+                                "type": "image",
+                                "url": url,
+                                "summary": summary,
+                                "emoji_id": emoji_id,
+                                "emoji_package_id": package_id,
+                                "key": key,
+                                "is_mface": True,
+                                "is_gif": True,
+                                "flash": True,
+                            }
+                            serialized_messages.append(mface_as_image)
 
-                    # 方法2: 检查raw_message对象结构喵～ 🔍
-                    if (
-                        not task_has_mface
-                        and hasattr(event.message_obj, "raw_message")
-                        and event.message_obj.raw_message
-                    ):
-                        try:
-                            raw_message = event.message_obj.raw_message
-                            logger.warning(f"原始消息类型喵: {type(raw_message)} 📦")
+                # 方法2: 检查raw_message对象结构喵～ 🔍
+                if (
+                    not task_has_mface
+                    and hasattr(event.message_obj, "raw_message")
+                    and event.message_obj.raw_message
+                ):
+                    try:
+                        raw_message = event.message_obj.raw_message
+                        logger.warning(f"原始消息类型喵: {type(raw_message)} 📦")
 
-                            if hasattr(raw_message, "message") and isinstance(
-                                raw_message.message, list
+                        if hasattr(raw_message, "message") and isinstance(
+                            raw_message.message, list
+                        ):
+                            msg_list = raw_message.message
+                        # 再尝试从raw_message字典中获取message列表喵～ 📚
+                        elif isinstance(raw_message, dict) and "message" in raw_message:
+                            msg_list = raw_message["message"]
+                        else:
+                            msg_list = []
+
+                        # 处理获取到的消息列表喵～ 📋
+                        for raw_msg in msg_list:
+                            # 处理图片消息并提取filename喵～ 🖼️
+                            if (
+                                isinstance(raw_msg, dict)
+                                and raw_msg.get("type") == "image"
+                                and "data" in raw_msg
                             ):
-                                msg_list = raw_message.message
-                            # 再尝试从raw_message字典中获取message列表喵～ 📚
+                                extracted_filename = raw_msg["data"].get("filename")
+                                if extracted_filename:
+                                    logger.debug(
+                                        f"从原始消息提取到filename喵: {extracted_filename} 📁"
+                                    )
+                                    # 在序列化消息中找到对应的图片并添加filename喵～ 🔗
+                                    for i, msg in enumerate(serialized_messages):
+                                        if msg.get("type") == "image":
+                                            serialized_messages[i]["filename"] = (
+                                                extracted_filename
+                                            )
+                                            logger.debug(
+                                                f"已将filename {extracted_filename} 添加到图片消息喵～ ✅"
+                                            )
+                                            break
+
+                            # 处理特殊表情(mface)喵～ 😸
                             elif (
-                                isinstance(raw_message, dict)
-                                and "message" in raw_message
+                                isinstance(raw_msg, dict)
+                                and raw_msg.get("type") == "mface"
                             ):
-                                msg_list = raw_message["message"]
-                            else:
-                                msg_list = []
-
-                            # 处理获取到的消息列表喵～ 📋
-                            for raw_msg in msg_list:
-                                # 处理图片消息并提取filename喵～ 🖼️
-                                if (
-                                    isinstance(raw_msg, dict)
-                                    and raw_msg.get("type") == "image"
-                                    and "data" in raw_msg
-                                ):
-                                    extracted_filename = raw_msg["data"].get("filename")
-                                    if extracted_filename:
-                                        logger.debug(
-                                            f"从原始消息提取到filename喵: {extracted_filename} 📁"
-                                        )
-                                        # 在序列化消息中找到对应的图片并添加filename喵～ 🔗
-                                        for i, msg in enumerate(serialized_messages):
-                                            if msg.get("type") == "image":
-                                                serialized_messages[i]["filename"] = (
-                                                    extracted_filename
-                                                )
-                                                logger.debug(
-                                                    f"已将filename {extracted_filename} 添加到图片消息喵～ ✅"
-                                                )
-                                                break
-
-                                # 处理特殊表情(mface)喵～ 😸
-                                elif (
-                                    isinstance(raw_msg, dict)
-                                    and raw_msg.get("type") == "mface"
-                                ):
-                                    task_has_mface = True
-                                    logger.warning(
-                                        f"从raw_message列表找到mface喵: {raw_msg} 😸"
-                                    )
-                                    # 提取表情数据喵～ 📊
-                                    data = raw_msg.get("data", {})
-                                    url = raw_msg.get("url", "") or data.get("url", "")
-                                    summary = raw_msg.get("summary", "") or data.get(
-                                        "summary", "[表情]"
-                                    )
-                                    emoji_id = raw_msg.get("emoji_id", "") or data.get(
-                                        "emoji_id", ""
-                                    )
-                                    package_id = raw_msg.get(
-                                        "emoji_package_id", ""
-                                    ) or data.get("emoji_package_id", "")
-                                    key = raw_msg.get("key", "") or data.get("key", "")
-
-                                    mface_as_image = {
-                                        "type": "image",
-                                        "url": url,
-                                        "summary": summary,
-                                        "emoji_id": emoji_id,
-                                        "emoji_package_id": package_id,
-                                        "key": key,
-                                        "is_mface": True,
-                                        "is_gif": True,
-                                        "flash": True,
-                                    }
-                                    serialized_messages.append(mface_as_image)
-                        except Exception as e:
-                            logger.error(f"处理原始消息时出错: {e}", exc_info=True)
-
-                        # 方法3: 尝试从raw_message字符串中解析mface
-                        if not task_has_mface and hasattr(
-                            event.message_obj, "raw_message"
-                        ):
-                            raw_str = str(event.message_obj.raw_message)
-                            if "[CQ:mface" in raw_str or "mface" in raw_str.lower():
                                 task_has_mface = True
-                                # 尝试提取mface参数
-                                url_match = re.search(
-                                    r"url=(https?://[^,\]]+)", raw_str
+                                logger.warning(
+                                    f"从raw_message列表找到mface喵: {raw_msg} 😸"
+                                )
+                                # 提取表情数据喵～ 📊
+                                data = raw_msg.get("data", {})
+                                url = raw_msg.get("url", "") or data.get("url", "")
+                                summary = raw_msg.get("summary", "") or data.get(
+                                    "summary", "[表情]"
                                 )
-                                summary_match = re.search(r"summary=([^,\]]+)", raw_str)
-                                url = url_match.group(1) if url_match else ""
-                                summary = (
-                                    summary_match.group(1)
-                                    if summary_match
-                                    else "[表情]"
+                                emoji_id = raw_msg.get("emoji_id", "") or data.get(
+                                    "emoji_id", ""
                                 )
+                                package_id = raw_msg.get(
+                                    "emoji_package_id", ""
+                                ) or data.get("emoji_package_id", "")
+                                key = raw_msg.get("key", "") or data.get("key", "")
 
                                 mface_as_image = {
                                     "type": "image",
                                     "url": url,
                                     "summary": summary,
+                                    "emoji_id": emoji_id,
+                                    "emoji_package_id": package_id,
+                                    "key": key,
                                     "is_mface": True,
                                     "is_gif": True,
                                     "flash": True,
                                 }
                                 serialized_messages.append(mface_as_image)
+                    except Exception as e:
+                        logger.error(f"处理原始消息时出错: {e}", exc_info=True)
+
+                    # 方法3: 尝试从raw_message字符串中解析mface
+                    if not task_has_mface and hasattr(event.message_obj, "raw_message"):
+                        raw_str = str(event.message_obj.raw_message)
+                        if "[CQ:mface" in raw_str or "mface" in raw_str.lower():
+                            task_has_mface = True
+                            # 尝试提取mface参数
+                            url_match = re.search(r"url=(https?://[^,\]]+)", raw_str)
+                            summary_match = re.search(r"summary=([^,\]]+)", raw_str)
+                            url = url_match.group(1) if url_match else ""
+                            summary = (
+                                summary_match.group(1) if summary_match else "[表情]"
+                            )
 
-                    # 如果序列化后没有内容，但原始消息有内容，则直接创建一个纯文本组件
+                            mface_as_image = {
+                                "type": "image",
+                                "url": url,
+                                "summary": summary,
+                                "is_mface": True,
+                                "is_gif": True,
+                                "flash": True,
+                            }
+                            serialized_messages.append(mface_as_image)
+
+                # 如果序列化后没有内容，但原始消息有内容，则直接创建一个纯文本组件
+                if (
+                    not serialized_messages
+                    or (
+                        len(serialized_messages) == 1
+                        and serialized_messages[0].get("type") == "plain"
+                        and not serialized_messages[0].get("text")
+                    )
+                ) and plain_text:
+                    serialized_messages = [{"type": "plain", "text": plain_text}]
+                    # 检查是否应该从原始消息中提取更多信息
                     if (
-                        not serialized_messages
-                        or (
-                            len(serialized_messages) == 1
-                            and serialized_messages[0].get("type") == "plain"
-                            and not serialized_messages[0].get("text")
-                        )
-                    ) and plain_text:
-                        serialized_messages = [{"type": "plain", "text": plain_text}]
-                        # 检查是否应该从原始消息中提取更多信息
-                        if (
-                            hasattr(event.message_obj, "raw_message")
-                            and event.message_obj.raw_message
+                        hasattr(event.message_obj, "raw_message")
+                        and event.message_obj.raw_message
+                    ):
+                        raw_text = str(event.message_obj.raw_message)
+                        if len(raw_text) > len(plain_text):
+                            serialized_messages[0]["text"] = raw_text
+
+                # 生成消息概要
+                message_outline = (
+                    plain_text[:30] + ("..." if len(plain_text) > 30 else "")
+                    if plain_text
+                    else ""
+                )
+                if not message_outline and serialized_messages:
+                    # 尝试从序列化消息中生成概要
+                    has_content = False
+                    for msg in serialized_messages:
+                        if msg.get("type") == "plain" and msg.get("text"):
+                            text = msg.get("text", "")
+                            message_outline = text[:30] + (
+                                "..." if len(text) > 30 else ""
+                            )
+                            has_content = True
+                            break
+                        elif (
+                            msg.get("type") == "image"
+                            and msg.get("is_mface")
+                            and msg.get("summary")
                         ):
-                            raw_text = str(event.message_obj.raw_message)
-                            if len(raw_text) > len(plain_text):
-                                serialized_messages[0]["text"] = raw_text
-
-                    # 生成消息概要
-                    message_outline = (
-                        plain_text[:30] + ("..." if len(plain_text) > 30 else "")
-                        if plain_text
-                        else ""
-                    )
-                    if not message_outline and serialized_messages:
-                        # 尝试从序列化消息中生成概要
-                        has_content = False
+                            # 新增: 为特殊表情添加专门的概要
+                            message_outline = msg.get("summary", "[表情]")
+                            has_content = True
+                            break
+
+                    if not has_content and not serialized_messages:
+                        # 如果仍然没有概要，使用通用消息类型描述
+                        non_text_types = []
                         for msg in serialized_messages:
-                            if msg.get("type") == "plain" and msg.get("text"):
-                                text = msg.get("text", "")
-                                message_outline = text[:30] + (
-                                    "..." if len(text) > 30 else ""
-                                )
-                                has_content = True
-                                break
-                            elif (
-                                msg.get("type") == "image"
-                                and msg.get("is_mface")
-                                and msg.get("summary")
-                            ):
-                                # 新增: 为特殊表情添加专门的概要
-                                message_outline = msg.get("summary", "[表情]")
-                                has_content = True
-                                break
-
-                        if not has_content and not serialized_messages:
-                            # 如果仍然没有概要，使用通用消息类型描述
-                            non_text_types = []
-                            for msg in serialized_messages:
-                                if msg.get("type") != "plain" or not msg.get("text"):
-                                    msg_type = msg.get("type", "unknown")
-                                    if msg.get("is_mface"):
-                                        non_text_types.append("特殊表情")
-                                    else:
-                                        non_text_types.append(msg_type)
-
-                            message_outline = (
-                                f"[{', '.join(non_text_types)}]"
-                                if non_text_types
-                                else "[消息]"
-                            )
+                            if msg.get("type") != "plain" or not msg.get("text"):
+                                msg_type = msg.get("type", "unknown")
+                                if msg.get("is_mface"):
+                                    non_text_types.append("特殊表情")
+                                else:
+                                    non_text_types.append(msg_type)
+
+                        message_outline = (
+                            f"[{', '.join(non_text_types)}]"
+                            if non_text_types
+                            else "[消息]"
+                        )
 
-                    # 处理特殊表情的标记
-                    if task_has_mface or has_mface:
-                        # 添加特殊标记
-                        for msg in serialized_messages:
-                            if msg.get("is_mface"):
-                                # 确保所有必要的字段都存在
-                                if not msg.get("summary"):
-                                    msg["summary"] = "[表情]"
-                                if not msg.get("is_gif"):
-                                    msg["is_gif"] = True
-                                if not msg.get("flash"):
-                                    msg["flash"] = True
-
-                    # 检查消息长度限制并使用智能清理策略喵～ 🧠
-                    max_messages = task.get(
-                        "max_messages",
-                        self.plugin.config.get("default_max_messages", 20),
-                    )
-                    cached_message = {
-                        "id": message_id,
-                        "timestamp": timestamp,
-                        "sender_name": event.get_sender_name(),
-                        "sender_id": event.get_sender_id(),  # 添加发送者ID
-                        "messages": serialized_messages,
-                        "message_outline": message_outline,
-                        "onebot_fields": onebot_fields,  # 添加 OneBot 原始字段
-                    }
-
-                    self.plugin.message_cache[task_id][session_id].append(
-                        cached_message
-                    )
-                    logger.info(
-                        f"已缓存消息到任务 {task_id}, 会话 {session_id}, 缓存大小: {len(self.plugin.message_cache[task_id][session_id])}"
-                    )
+                # 处理特殊表情的标记
+                if task_has_mface or has_mface:
+                    # 添加特殊标记
+                    for msg in serialized_messages:
+                        if msg.get("is_mface"):
+                            # 确保所有必要的字段都存在
+                            if not msg.get("summary"):
+                                msg["summary"] = "[表情]"
+                            if not msg.get("is_gif"):
+                                msg["is_gif"] = True
+                            if not msg.get("flash"):
+                                msg["flash"] = True
+
+                # 检查消息长度限制并使用智能清理策略喵～ 🧠
+                max_messages = task.get(
+                    "max_messages",
+                    self.plugin.config.get("default_max_messages", 20),
+                )
+                # 使用紧凑的记录类型保存，减少缓存的内存占用喵～ 🗜️
+                cached_message = CachedMessage(
+                    id=message_id,
+                    timestamp=timestamp,
+                    sender_name=event.get_sender_name(),
+                    sender_id=event.get_sender_id(),  # 添加发送者ID
+                    messages=serialized_messages,
+                    message_outline=message_outline,
+                    onebot_fields=onebot_fields,  # 添加 OneBot 原始字段
+                )
 
-                    # 应用智能缓存清理策略喵～ 🧠✨
-                    self._smart_cache_cleanup(task_id, session_id, max_messages)
+                self.plugin.message_cache[task_id][session_id].append(cached_message)
+                metrics.inc("cache_inserts_total")
+                logger.info(
+                    f"已缓存消息到任务 {task_id}, 会话 {session_id}, 缓存大小: {len(self.plugin.message_cache[task_id][session_id])}"
+                )
 
-                    # 立即保存缓存，确保不丢失数据
-                    self.plugin.save_message_cache()
+                # 应用智能缓存清理策略喵～ 🧠✨
+                self._smart_cache_cleanup(task_id, session_id, max_messages)
 
-                    # 检查是否达到转发条件
-                    if self.plugin.forward_manager:
-                        await self.plugin.forward_manager.forward_messages(
-                            task_id, session_id
-                        )
+                # 更新会话活跃时间喵～ 📈
+                self.plugin.activity_tracker.touch((task_id, session_id), timestamp)
+
+                # 立即保存缓存，确保不丢失数据
+                self.plugin.save_message_cache()
+
+                # 检查是否达到转发条件：会话缓存自带计数，达到阈值才发出转发请求喵～ 📬
+                # 未达到阈值时交给刷新调度器按等待时间和批次大小触发喵～ ⏰
+                cache = self.plugin.message_cache[task_id][session_id]
+                forward_manager = self.plugin.forward_manager
+                if forward_manager:
+                    if cache.forwardable_count() >= max_messages:
+                        forward_manager.request_forward(task_id, session_id)
+                    else:
+                        forward_manager.schedule_flush(task, task_id, session_id)
 
             if not task_matched:
                 logger.debug("没有任务匹配当前消息，消息未被缓存")
@@ -743,19 +740,22 @@ class MessageListener:
                 if task_id not in self.plugin.message_cache:
                     self.plugin.message_cache[task_id] = {}
                 if session_id not in self.plugin.message_cache[task_id]:
-                    self.plugin.message_cache[task_id][session_id] = []
+                    self.plugin.message_cache[task_id][session_id] = SessionCache()
 
                 # 缓存文件上传通知
-                cached_message = {
-                    "id": f"upload_{int(time.time())}",
-                    "timestamp": int(time.time()),
-                    "sender_name": event.get_sender_name(),
-                    "messages": [file_message],
-                    "message_outline": f"[群文件] {file_info.get('name', '')}",
-                }
+                cached_message = CachedMessage(
+                    id=f"upload_{int(time.time())}",
+                    timestamp=int(time.time()),
+                    sender_name=event.get_sender_name(),
+                    messages=[file_message],
+                    message_outline=f"[群文件] {file_info.get('name', '')}",
+                )
 
                 self.plugin.message_cache[task_id][session_id].append(cached_message)
                 logger.info(f"已缓存文件上传通知到任务 {task_id}")
+                self.plugin.activity_tracker.touch(
+                    (task_id, session_id), cached_message["timestamp"]
+                )
 
                 # 为文件上传通知也应用智能缓存清理策略喵～ 🧠✨
                 max_messages = task.get(
@@ -769,249 +769,14 @@ class MessageListener:
 
     def _is_message_processed(self, message_id: str) -> bool:
         """检查消息是否已经被处理过"""
-        # 检查所有任务的已处理消息ID列表
-        for key in self.plugin.config:
-            if key.startswith("processed_message_ids_"):
-                processed_list = self.plugin.config.get(key, [])
-                for processed_msg in processed_list:
-                    if (
-                        isinstance(processed_msg, dict)
-                        and processed_msg.get("id") == message_id
-                    ):
-                        return True
-        return False
+        return self.plugin.runtime_state.is_processed(message_id)
 
     def _mark_message_processed(self, message_id: str, task_id: str):
         """标记消息为已处理
         Args:
             message_id: 消息ID
         """
-        key = f"processed_message_ids_{task_id}"
-        if key not in self.plugin.config:
-            self.plugin.config[key] = []
-
-        timestamp = int(time.time())
-        self.plugin.config[key].append({"id": message_id, "timestamp": timestamp})
-
-        # 保持列表大小，只保留最近的100条记录
-        if len(self.plugin.config[key]) > 100:
-            self.plugin.config[key] = self.plugin.config[key][-100:]
-
-    def _should_monitor_user(
-        self, task: dict[str, Any], event: AstrMessageEvent
-    ) -> bool:
-        """检查是否应该监听特定用户的消息"""
-        session_id = event.unified_msg_origin
-        logger.debug(f"判断会话 {session_id} 是否应被监听")
-
-        # 获取群组ID和用户ID
-        group_id = event.get_group_id()
-
-        # 注意：群内特定用户监听由 _should_monitor_group_user 方法专门处理，
-        # 这里只处理常规的群聊和私聊监听，不处理群内用户监听喵～ ⚠️
-
-        # 最重要的修复：直接检查会话ID是否存在于任务的monitor_groups中
-        if session_id in task.get("monitor_groups", []):
-            logger.debug(f"会话ID {session_id} 直接存在于群组监听列表中，应监听此会话")
-            return True
-
-        # 检查会话ID是否存在于私聊监听列表中
-        if session_id in task.get("monitor_private_users", []):
-            logger.debug(f"会话ID {session_id} 直接存在于私聊监听列表中，应监听此会话")
-            return True
-
-        # 最后检查完整的session_id是否直接匹配monitor_sessions
-        if session_id in task.get("monitor_sessions", []):
-            return True
-
-        # 检查群组监听 - 使用多种格式尝试匹配
-        if group_id:
-            group_id_str = str(group_id) if group_id else ""
-            if group_id_str and any(
-                str(g) == group_id_str for g in task.get("monitor_groups", [])
-            ):
-                logger.debug(f"群号 {group_id} 在监听列表中，应监听此会话")
-                return True
-
-            # 检查完整会话ID格式 - 关键修改！
-            for g in task.get("monitor_groups", []):
-                expected_id = f"aiocqhttp:GroupMessage:{g}"
-                if session_id == expected_id:
-                    return True
-
-            # 尝试其他可能的格式
-            possible_formats = [
-                f"aiocqhttp:GroupMessage:{group_id}",
-                f"aiocqhttp:group_message:{group_id}",
-                group_id_str,
-            ]
-            for fmt in possible_formats:
-                if fmt in task.get("monitor_groups", []):
-                    return True
-
-        # 检查私聊用户监听
-        user_id = event.get_sender_id()
-        if user_id:
-            user_id_str = str(user_id) if user_id else ""
-            if user_id_str and any(
-                str(u) == user_id_str for u in task.get("monitor_private_users", [])
-            ):
-                logger.debug(f"用户ID {user_id} 在私聊监听列表中，应监听此会话")
-                return True
-
-            # 检查会话完整ID是否在监听列表中
-            if any(
-                session_id == f"aiocqhttp:FriendMessage:{u}"
-                for u in task.get("monitor_private_users", [])
-            ):
-                return True
-
-            # 尝试其他可能的格式
-            possible_formats = [
-                f"aiocqhttp:FriendMessage:{user_id}",
-                f"aiocqhttp:friend_message:{user_id}",
-                user_id_str,
-            ]
-            for fmt in possible_formats:
-                if fmt in task.get("monitor_private_users", []):
-                    logger.debug(f"会话ID格式 {fmt} 在私聊监听列表中，应监听此会话")
-                    return True
-
-        # 最后再检查一次完整的session_id是否直接匹配
-        if session_id in task.get("monitor_sessions", []):
-            return True
-
-        return False
-
-    def _should_monitor_group_user(
-        self, task: dict[str, Any], event: AstrMessageEvent
-    ) -> bool:
-        """检查是否监听群内特定用户喵～ 🎯"""
-        message_type_name = event.get_message_type().name
-        group_id = event.get_group_id()
-        session_id = event.unified_msg_origin
-        sender_id = event.get_sender_id()
-
-        # 只处理群消息
-        if message_type_name != "GROUP_MESSAGE":
-            logger.debug(f"非群消息 ({message_type_name})，跳过群内用户监听检查喵～")
-            return False
-
-        group_id_str = str(group_id)
-        sender_id_str = str(sender_id)
-
-        logger.debug(
-            f"检查群内用户监听喵: 群{group_id_str}, 用户{sender_id_str}, 会话{session_id} 🔍"
-        )
-
-        # 重要修改：同时检查纯群号和完整会话ID两种格式
-        monitored_users = task.get("monitored_users_in_groups", {}).get(
-            group_id_str, []
-        )
-
-        # 如果纯群号没找到，尝试使用完整会话ID
-        if not monitored_users:
-            monitored_users = task.get("monitored_users_in_groups", {}).get(
-                session_id, []
-            )
-            if monitored_users:
-                logger.debug(f"在完整会话ID {session_id} 中找到用户监听配置喵 📋")
-            else:
-                logger.debug(
-                    f"群 {group_id_str} 或会话 {session_id} 没有配置特定用户监听喵 ❌"
-                )
-
-        # 如果没有指定用户列表，则不监听任何人
-        if not monitored_users:
-            logger.debug(f"群 {group_id_str} 没有配置特定用户监听，跳过喵～ ⏭️")
-            return False
-
-        logger.debug(f"群 {group_id_str} 的监听用户列表喵: {monitored_users} 👥")
-
-        # 检查当前发送者是否在监听列表中
-        is_monitored = sender_id_str in [str(uid) for uid in monitored_users]
-
-        if is_monitored:
-            logger.info(
-                f"✅ 群 {group_id_str} 中的用户 {sender_id_str} 在监听列表中，应该监听此消息喵！ 🎯"
-            )
-        else:
-            logger.debug(
-                f"❌ 群 {group_id_str} 中的用户 {sender_id_str} 不在监听列表中，跳过此消息喵～ ⏭️"
-            )
-
-        return is_monitored
-
-    def _should_monitor_message(
-        self, task: dict[str, Any], event: AstrMessageEvent
-    ) -> bool:
-        """检查是否应该监听此消息喵～（新的统一逻辑）"""
-        session_id = event.unified_msg_origin
-        # sender_id = event.get_sender_id()
-
-        # 解析会话ID信息
-        parsed_info = self._parse_session_id_info(session_id)
-        if not parsed_info:
-            logger.debug(f"无法解析会话ID: {session_id}")
-            return False
-
-        # 根据会话类型检查对应的监听列表
-        if parsed_info["is_group"]:
-            group_id = parsed_info["id"]
-            if group_id in task.get("monitor_groups", []):
-                logger.debug(f"群聊 {group_id} 在监听列表中，应监听此会话")
-                return True
-
-            # 注意：群内用户监听由 _should_monitor_group_user 方法专门处理，
-            # 这里不处理群内用户监听配置喵～ ⚠️
-        else:
-            user_id = parsed_info["id"]
-            if user_id in task.get("monitor_private_users", []):
-                logger.debug(f"私聊用户 {user_id} 在监听列表中，应监听此会话")
-                return True
-
-        # 向后兼容：检查旧的 monitor_sessions 列表
-        if session_id in task.get("monitor_sessions", []):
-            return True
-
-        return False
-
-    def _parse_session_id_info(self, session_id: str) -> dict[str, Any]:
-        """解析完整会话ID，提取平台、类型和ID信息
-
-        Args:
-            session_id: 形如 "aiocqhttp:GroupMessage:123456" 的会话ID
-
-        Returns:
-            包含解析信息的字典，格式为:
-            {
-                "platform": "aiocqhttp",
-                "message_type": "GroupMessage",
-                "id": "123456",
-                "is_group": True,
-                "full_id": "aiocqhttp:GroupMessage:123456"
-            }
-            如果解析失败则返回None"""
-        if not session_id or not isinstance(session_id, str):
-            return None
-
-        parts = session_id.split(":")
-        if len(parts) != 3:
-            logger.debug(f"会话ID格式不正确: {session_id}，期望格式: platform:type:id")
-            return None
-
-        platform, message_type, id_part = parts
-
-        # 判断是否为群聊
-        is_group = "group" in message_type.lower()
-
-        return {
-            "platform": platform,
-            "message_type": message_type,
-            "id": id_part,
-            "is_group": is_group,
-            "full_id": session_id,
-        }
+        self.plugin.runtime_state.mark_processed(task_id, message_id)
 
     def _is_empty_message(self, cached_message: dict) -> bool:
         """
@@ -1024,31 +789,7 @@ class MessageListener:
             如果是空消息返回True，否则返回False喵
         """
         try:
-            messages = cached_message.get("messages", [])
-
-            # 如果没有消息组件，肯定是空消息喵～
-            if not messages:
-                return True
-
-            # 检查是否只包含群文件上传通知喵～
-            for msg in messages:
-                if isinstance(msg, dict):
-                    msg_type = msg.get("type")
-                    notice_type = msg.get("notice_type")
-
-                    # 群文件上传通知被认为是空消息喵～
-                    if msg_type == "notice" and notice_type == "group_upload":
-                        continue
-                    else:
-                        # 如果有其他类型的消息，就不是空消息喵～
-                        return False
-                else:
-                    # 如果有非字典的消息，就不是空消息喵～
-                    return False
-
-            # 如果只有群文件上传通知，就是空消息喵～
-            return True
-
+            return is_empty_message(cached_message)
         except Exception as e:
             # 出错时保守处理，认为不是空消息喵～
             logger.debug(f"检测空消息时出错喵: {e}")
@@ -1057,72 +798,26 @@ class MessageListener:
     def _smart_cache_cleanup(self, task_id: str, session_id: str, max_messages: int):
         """
         智能清理缓存策略喵～ 🧠✨
-        优先删除空消息，然后删除旧的有效消息，确保有效消息数量符合阈值要求喵！
+        空消息只保留最近两条，超出容量时淘汰最老的有效消息，确保有效消息数量不少于阈值喵！
 
         Args:
             task_id: 任务ID喵
             session_id: 会话ID喵
             max_messages: 消息阈值喵
+
+        Note:
+            会话缓存是环形缓存，淘汰只需要从队头弹出，不再扫描和排序整个列表喵～ ⚡
         """
         try:
-            cache = self.plugin.message_cache[task_id][session_id]
-            cache_capacity = max(max_messages * 3, 20)  # 缓存容量 = 阈值 × 3，最小20喵
-
-            logger.debug(
-                f"开始智能缓存清理检查喵: 当前缓存 {len(cache)}，容量限制 {cache_capacity}，阈值 {max_messages}"
-            )
-
-            # 分类消息：有效消息和空消息喵～
-            valid_messages = []
-            empty_messages = []
-
-            for msg in cache:
-                if self._is_empty_message(msg):
-                    empty_messages.append(msg)
-                else:
-                    valid_messages.append(msg)
-
-            logger.debug(
-                f"消息分类结果喵: 有效消息 {len(valid_messages)}，空消息 {len(empty_messages)}"
-            )
-
-            removed_count = 0
-
-            # 第一步：清理所有空消息（但保留一些以免丢失上下文）喵～
-            if len(empty_messages) > 2:  # 最多保留2条空消息作为上下文喵～
-                empty_to_remove = len(empty_messages) - 2
-                # 按时间戳排序，删除最老的空消息喵～
-                empty_messages.sort(key=lambda x: x.get("timestamp", 0))
-                for i in range(empty_to_remove):
-                    cache.remove(empty_messages[i])
-                    removed_count += 1
-
-                logger.debug(f"删除了 {empty_to_remove} 条空消息喵～")
-
-            # 第二步：如果缓存超过容量限制，删除旧的有效消息喵～
-            if len(cache) > cache_capacity:
-                need_to_remove = len(cache) - cache_capacity
-
-                # 重新获取当前缓存中的有效消息喵～
-                current_valid = []
-                for msg in cache:
-                    if not self._is_empty_message(msg):
-                        current_valid.append(msg)
-
-                # 确保删除后有效消息数量不少于阈值喵～
-                can_remove = max(0, len(current_valid) - max_messages)
-                actual_remove = min(need_to_remove, can_remove)
-
-                if actual_remove > 0:
-                    # 按时间戳排序，删除最老的有效消息喵～
-                    current_valid.sort(key=lambda x: x.get("timestamp", 0))
-                    for i in range(actual_remove):
-                        cache.remove(current_valid[i])
-                        removed_count += 1
-
-                    logger.debug(f"删除了 {actual_remove} 条旧的有效消息喵～")
+            sessions = self.plugin.message_cache[task_id]
+            cache = sessions[session_id]
+            if not isinstance(cache, SessionCache):
+                # 兼容旧的列表缓存，转换一次即可喵～ 🔄
+                cache = sessions[session_id] = SessionCache(cache)
 
+            removed_count = cache.trim(max_messages)
             if removed_count > 0:
+                metrics.inc("cache_evictions_total", removed_count)
                 logger.info(
                     f"智能缓存清理完成喵: 删除了 {removed_count} 条消息，当前缓存 {len(cache)} 条"
                 )
@@ -1,8 +1,94 @@
 # 导入消息工具模块喵～ 📦
+import copy
+import json
 import time
 
 from astrbot.api import logger
 
+from ..utils.ttl_cache import TTLCache
+
+
+def _estimate_response_size(response) -> int:
+    """
+    估算 OneBot 响应占用的字节数喵～ 📏
+
+    Args:
+        response: API 响应数据喵
+
+    Returns:
+        序列化后的字节数估算值喵
+    """
+    try:
+        return len(json.dumps(response, ensure_ascii=False, default=str))
+    except Exception:
+        return 1024
+
+
+# get_forward_msg / get_msg 的响应缓存喵～ 🗃️
+# 同一个转发包或被引用消息经常被反复转发、引用，命中缓存就不用再请求 API 了
+_forward_response_cache = TTLCache(
+    max_entries=512,
+    ttl=600,
+    max_bytes=8 * 1024 * 1024,
+    sizeof=_estimate_response_size,
+)
+_message_response_cache = TTLCache(
+    max_entries=1024,
+    ttl=600,
+    max_bytes=4 * 1024 * 1024,
+    sizeof=_estimate_response_size,
+)
+
+
+# 响应里可能装着消息内容的字段喵～ 📋
+_RESPONSE_CONTENT_FIELDS = ("messages", "message", "nodes", "content")
+
+
+def _has_content(response) -> bool:
+    """
+    判断 OneBot 响应是否带有消息内容，空响应不写入缓存喵～ 🔍
+
+    Args:
+        response: API 响应数据喵
+
+    Returns:
+        响应为空、或者消息字段全都为空时返回False喵
+    """
+    if not response:
+        return False
+    if not isinstance(response, dict):
+        return True
+    if isinstance(response.get("data"), dict):
+        return _has_content(response["data"])
+    fields = [name for name in _RESPONSE_CONTENT_FIELDS if name in response]
+    return not fields or any(response[name] for name in fields)
+
+
+async def _cached_call_action(cache: TTLCache, client, action: str, **params):
+    """
+    带缓存和并发合并的 OneBot API 调用喵～ 🤝
+
+    Args:
+        cache: 使用的响应缓存喵
+        client: 带 api.call_action 的客户端喵
+        action: API 名称喵
+        **params: API 参数喵
+
+    Returns:
+        API 响应的副本，调用方可以放心修改喵
+
+    Note:
+        缓存键包含 API 名称和参数名，同一个ID用不同参数请求时互不影响；
+        空响应（包括消息列表为空的响应）和调用异常都不会被缓存喵！ ⚠️
+    """
+    key = (action, *sorted((name, str(value)) for name, value in params.items()))
+    response = await cache.get_or_load(
+        key,
+        lambda: client.api.call_action(action, **params),
+        should_cache=_has_content,
+    )
+    return copy.deepcopy(response)
+
 
 async def async_detect_message_field(data: dict, platform_name: str = None) -> str:
     """
@@ -167,8 +253,11 @@ async def fetch_forward_message_nodes(forward_id, event):
         # 方法1: 尝试使用get_forward_msg API喵～ 📤
         forward_payload = {"id": forward_id}
         try:
-            forward_response = await client.api.call_action(
-                "get_forward_msg", **forward_payload
+            forward_response = await _cached_call_action(
+                _forward_response_cache,
+                client,
+                "get_forward_msg",
+                **forward_payload,
             )
             logger.debug(
                 f"成功通过get_forward_msg获取转发消息喵: {forward_response} ✅"
@@ -359,7 +448,9 @@ async def fetch_message_detail(message_id, event):
         client = event.bot
         # 获取消息详情喵～ 🔍
         payload = {"message_id": message_id}
-        response = await client.api.call_action("get_msg", **payload)
+        response = await _cached_call_action(
+            _message_response_cache, client, "get_msg", **payload
+        )
         logger.debug(f"获取到消息详情喵: {response} 📋")
 
         # 智能检测并处理转发消息喵～ 📤
@@ -380,8 +471,11 @@ async def fetch_message_detail(message_id, event):
                     if forward_id:
                         forward_payload = {"message_id": forward_id}
                         try:
-                            forward_response = await client.api.call_action(
-                                "get_forward_msg", **forward_payload
+                            forward_response = await _cached_call_action(
+                                _forward_response_cache,
+                                client,
+                                "get_forward_msg",
+                                **forward_payload,
                             )
                             # 将转发消息的内容添加到原始响应中喵～ 📝
                             response["forward_content"] = forward_response
@@ -0,0 +1,382 @@
+"""
+单个会话的消息环形缓存喵～ 🔁
+有效消息和空消息（群文件上传通知等）分开保存，插入、淘汰和计数都是 O(1)！
+"""
+
+import heapq
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+from .cache_records import CachedMessage, json_default as _record_json_default
+
+
+def is_empty_message(cached_message: Mapping) -> bool:
+    """
+    检测消息是否为空消息（如群文件上传通知）喵～ 🔍
+
+    Args:
+        cached_message: 缓存的消息喵
+
+    Returns:
+        如果是空消息返回True，否则返回False喵
+    """
+    messages = cached_message.get("messages", [])
+
+    # 如果没有消息组件，肯定是空消息喵～
+    if not messages:
+        return True
+
+    # 只包含群文件上传通知的消息也算空消息喵～
+    for msg in messages:
+        if not isinstance(msg, Mapping):
+            return False
+        if msg.get("type") != "notice" or msg.get("notice_type") != "group_upload":
+            return False
+    return True
+
+
+def _value_size(value: Any) -> int:
+    """按 JSON 的写法估算一个值的字节数，不真正序列化喵～ 📏"""
+    if isinstance(value, str):
+        # 纯 ASCII（例如 base64）不用编码就知道字节数喵～ ⚡
+        return (len(value) if value.isascii() else len(value.encode("utf-8"))) + 2
+    # 括号加上 ": " 和 ", " 分隔符，和 json.dumps 的默认格式一致喵～ 🧮
+    if isinstance(value, Mapping):
+        if not value:
+            return 2
+        return sum(
+            _value_size(str(key)) + _value_size(item) + 4 for key, item in value.items()
+        )
+    if isinstance(value, list | tuple):
+        if not value:
+            return 2
+        return sum(_value_size(item) + 2 for item in value)
+    if value is None:
+        return 4
+    return len(str(value))
+
+
+def estimate_size(cached_message: Mapping) -> int:
+    """
+    估算一条缓存消息序列化后的字节数喵～ 📏
+
+    Args:
+        cached_message: 缓存的消息喵
+
+    Returns:
+        UTF-8 编码的 JSON 大致字节数喵
+
+    Note:
+        只累加各个字段的长度，不处理转义字符；大块的 base64 不会被复制或编码喵～ ⚡
+    """
+    return _value_size(cached_message)
+
+
+class SessionCache:
+    """
+    会话消息缓存喵～ 🔁
+    用法和原来的消息列表一样（append、len、遍历、[-1]），但内部是两个双端队列！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📥 有效消息进入有序的双端队列，超出容量时从最老的一端淘汰
+    - 📭 空消息只保留最近的 EMPTY_KEEP 条作为上下文
+    - 🔢 有效消息数量随时可以 O(1) 获取，不需要扫描整个列表
+    - 📏 第一次读取 total_bytes 后才开始增量统计字节数，用于按批次大小触发转发
+
+    Note:
+        遍历时按插入顺序合并两个队列，和原来列表的顺序一致喵～ 📋
+        从文件加载的缓存用 SessionCache.lazy 创建，第一次使用时才转换成紧凑记录，
+        没有被访问过的会话保存时直接写回原始数据喵！ 💤
+    """
+
+    # 最多保留的空消息数量喵～ 📭
+    EMPTY_KEEP = 2
+
+    __slots__ = ("_valid", "_empty", "_seq", "_bytes", "_pending")
+
+    def __init__(self, messages: Iterable[Mapping] = ()):
+        """
+        初始化会话缓存喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            messages: 初始消息（按时间顺序）喵
+        """
+        # (插入序号, 消息, 字节数)，序号用于合并遍历时保持顺序喵～ 🔢
+        # 没有开始统计字节数时字节数都是0喵～ 📏
+        self._valid: deque[tuple[int, Mapping, int]] = deque()
+        self._empty: deque[tuple[int, Mapping, int]] = deque()
+        self._seq = 0
+        # None 表示还没有人用过 total_bytes，不用给每条消息做序列化喵～ 💤
+        self._bytes: int | None = None
+        self._pending: list | None = None
+        for message in messages:
+            self.append(message)
+
+    @classmethod
+    def lazy(cls, messages: list) -> "SessionCache":
+        """
+        用从文件读取的原始消息列表创建缓存，第一次使用时才转换喵～ 💤
+
+        Args:
+            messages: 原始消息字典列表（按时间顺序）喵
+
+        Returns:
+            会话缓存喵
+        """
+        cache = cls()
+        if messages:
+            cache._pending = messages
+        return cache
+
+    @property
+    def hydrated(self) -> bool:
+        """原始消息是否已经转换成紧凑记录喵～ 💧"""
+        return self._pending is None
+
+    def _hydrate(self) -> None:
+        """把原始消息转换成紧凑记录并放进队列喵～ 💧"""
+        pending, self._pending = self._pending, None
+        for message in pending:
+            self.append(
+                CachedMessage.from_dict(message)
+                if isinstance(message, dict)
+                else message
+            )
+
+    def append(self, message: Mapping) -> None:
+        """
+        追加一条消息喵～ 📥
+
+        Args:
+            message: 缓存消息喵
+
+        Note:
+            空消息超过 EMPTY_KEEP 条时会丢弃最老的一条喵～ 📭
+        """
+        if self._pending is not None:
+            self._hydrate()
+        size = 0
+        if self._bytes is not None:
+            size = estimate_size(message)
+            self._bytes += size
+        entry = (self._seq, message, size)
+        self._seq += 1
+        if is_empty_message(message):
+            self._empty.append(entry)
+            if len(self._empty) > self.EMPTY_KEEP:
+                self._drop(self._empty.popleft())
+        else:
+            self._valid.append(entry)
+
+    def add(self, message: Mapping, max_messages: int) -> int:
+        """
+        追加一条消息并按容量淘汰旧消息喵～ 📥
+
+        Args:
+            message: 缓存消息喵
+            max_messages: 任务的转发阈值喵
+
+        Returns:
+            本次淘汰的消息数量喵
+        """
+        self.append(message)
+        return self.trim(max_messages)
+
+    def trim(self, max_messages: int) -> int:
+        """
+        按容量淘汰最老的有效消息喵～ 🧹
+
+        Args:
+            max_messages: 任务的转发阈值喵
+
+        Returns:
+            淘汰的消息数量喵
+
+        Note:
+            容量 = 阈值 × 3（最小20）；淘汰后有效消息不会少于阈值喵！ ⚠️
+        """
+        if self._pending is not None:
+            self._hydrate()
+        capacity = max(max_messages * 3, 20)
+        removed = 0
+        while len(self) > capacity and len(self._valid) > max_messages:
+            self._drop(self._valid.popleft())
+            removed += 1
+        return removed
+
+    @property
+    def valid_count(self) -> int:
+        """有效消息数量喵～ 🔢"""
+        if self._pending is not None:
+            self._hydrate()
+        return len(self._valid)
+
+    def forwardable_count(self) -> int:
+        """
+        带有消息组件、可以被转发的消息数量喵～ 🔢
+
+        Returns:
+            有效消息数量加上带组件的空消息（最多 EMPTY_KEEP 条）数量喵
+        """
+        if self._pending is not None:
+            self._hydrate()
+        return len(self._valid) + sum(
+            1 for _, message, _ in self._empty if message.get("messages")
+        )
+
+    @property
+    def total_bytes(self) -> int:
+        """
+        缓存消息序列化后的大致字节数喵～ 📏
+
+        Note:
+            只有设置了批次大小上限才会用到，第一次读取时才计算已有消息的大小，
+            之后追加和淘汰时增量更新喵～ 💤
+        """
+        if self._pending is not None:
+            self._hydrate()
+        if self._bytes is None:
+            self._valid = deque(
+                (seq, message, estimate_size(message))
+                for seq, message, _ in self._valid
+            )
+            self._empty = deque(
+                (seq, message, estimate_size(message))
+                for seq, message, _ in self._empty
+            )
+            self._bytes = sum(entry[2] for entry in self._valid) + sum(
+                entry[2] for entry in self._empty
+            )
+        return self._bytes
+
+    def _drop(self, entry: tuple[int, Mapping, int]) -> None:
+        """从字节统计中减去被移除的消息喵～ 📏"""
+        if self._bytes is not None:
+            self._bytes -= entry[2]
+
+    def oldest_timestamp(self) -> float | None:
+        """
+        获取最早一条缓存消息的时间戳喵～ ⏰
+
+        Returns:
+            时间戳，缓存为空时返回None喵
+        """
+        if self._pending is not None:
+            self._hydrate()
+        candidates = [queue[0] for queue in (self._valid, self._empty) if queue]
+        if not candidates:
+            return None
+        oldest = min(candidates, key=lambda entry: entry[0])[1]
+        return oldest.get("timestamp")
+
+    @property
+    def next_seq(self) -> int:
+        """下一条消息的插入序号，用来标记转发快照的边界喵～ 🔖"""
+        if self._pending is not None:
+            self._hydrate()
+        return self._seq
+
+    def discard_forwarded(self, upto_seq: int) -> int:
+        """
+        删除已经转发的那一批消息喵～ 🧹
+
+        Args:
+            upto_seq: 转发前记录的 next_seq，插入序号小于它的消息会被删除喵
+
+        Returns:
+            删除的消息数量喵
+
+        Note:
+            构建节点期间新缓存的消息序号不小于边界，会继续留在缓存里喵～ 🛡️
+        """
+        if self._pending is not None:
+            self._hydrate()
+        removed = 0
+        for queue in (self._valid, self._empty):
+            while queue and queue[0][0] < upto_seq:
+                self._drop(queue.popleft())
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """清空缓存喵～ 🧹"""
+        self._pending = None
+        self._valid.clear()
+        self._empty.clear()
+        if self._bytes is not None:
+            self._bytes = 0
+
+    def to_list(self) -> list[Mapping]:
+        """
+        按插入顺序导出消息列表喵～ 📋
+
+        Returns:
+            消息列表喵
+        """
+        return list(self)
+
+    def __iter__(self) -> Iterator[Mapping]:
+        if self._pending is not None:
+            self._hydrate()
+        if not self._empty:
+            return (message for _, message, _ in self._valid)
+        if not self._valid:
+            return (message for _, message, _ in self._empty)
+        return (
+            message
+            for _, message, _ in heapq.merge(
+                self._valid, self._empty, key=lambda entry: entry[0]
+            )
+        )
+
+    def __len__(self) -> int:
+        if self._pending is not None:
+            self._hydrate()
+        return len(self._valid) + len(self._empty)
+
+    def __bool__(self) -> bool:
+        # 未转换的原始消息非空时，转换后也一定非空喵～ 💤
+        return bool(self._pending or self._valid or self._empty)
+
+    def __getitem__(self, index):
+        if self._pending is not None:
+            self._hydrate()
+        if index == -1 and self:
+            # 最新的一条消息，常用于判断会话活跃度喵～ ⏰
+            candidates = [queue[-1] for queue in (self._valid, self._empty) if queue]
+            return max(candidates, key=lambda entry: entry[0])[1]
+        return self.to_list()[index]
+
+    def last_timestamp(self) -> float | None:
+        """
+        获取最新一条缓存消息的时间戳，不会触发转换喵～ ⏰
+
+        Returns:
+            时间戳，缓存为空时返回None喵
+        """
+        if self._pending is not None:
+            last = self._pending[-1]
+            return last.get("timestamp") if isinstance(last, Mapping) else None
+        return self[-1].get("timestamp") if self else None
+
+    def __repr__(self) -> str:
+        return f"SessionCache({self.to_list()!r})"
+
+
+def json_default(value: Any) -> Any:
+    """
+    给 json.dump 使用的 default 函数，支持会话缓存和缓存记录喵～ 💾
+
+    Args:
+        value: json 无法直接序列化的值喵
+
+    Returns:
+        转换后的列表或字典喵
+    """
+    if isinstance(value, SessionCache):
+        # 没有被访问过的会话直接写回原始数据，不用转换喵～ 💤
+        if value._pending is not None:
+            return value._pending
+        return value.to_list()
+    return _record_json_default(value)
@@ -0,0 +1,260 @@
+"""
+流量录制模块喵～ 🎙️
+把收到的消息事件（OneBot 原始数据和 AstrBot 组件列表）写进 gzip 压缩的 JSONL 文件，
+可以选择匿名化，录下来的文件可以用 benchmarks.replay 离线回放！
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Any
+
+from astrbot.api import logger
+
+# 录制文件格式版本喵～ 🏷️
+TRACE_VERSION = 1
+
+# 匿名化时替换成假ID的字段喵～ 🆔
+_ID_KEYS = frozenset(
+    {
+        "user_id",
+        "group_id",
+        "self_id",
+        "qq",
+        "sender_id",
+        "uin",
+        "target_id",
+        "operator_id",
+    }
+)
+# 匿名化时替换成等长占位符的文本字段喵～ 📝
+_TEXT_KEYS = frozenset(
+    {
+        "text",
+        "message",
+        "raw_message",
+        "message_str",
+        "nickname",
+        "card",
+        "name",
+        "sender_nickname",
+        "title",
+        "content",
+    }
+)
+# 匿名化时替换成假地址的媒体字段喵～ 🔗
+_MEDIA_KEYS = frozenset({"url", "file", "path", "base64"})
+
+# 组件属性里可以原样写进 JSON 的类型喵～ 📦
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def encode_component(component: Any) -> dict | None:
+    """
+    把 AstrBot 消息组件编码成 {"type": 类名, "data": 属性} 喵～ 🧩
+
+    Args:
+        component: 消息组件喵
+
+    Returns:
+        编码后的字典，无法编码时返回None喵
+
+    Note:
+        只保留简单类型的属性，嵌套的组件列表（引用链、节点内容）会递归编码喵～ 🔄
+    """
+    try:
+        attrs = vars(component)
+    except TypeError:
+        return None
+
+    data = {}
+    for key, value in attrs.items():
+        if key.startswith("_") or key == "type":
+            continue
+        if isinstance(value, _PLAIN_TYPES):
+            data[key] = value
+        elif isinstance(value, list):
+            if all(isinstance(item, _PLAIN_TYPES) for item in value):
+                data[key] = value
+            else:
+                data[key] = [
+                    encoded
+                    for encoded in (encode_component(item) for item in value)
+                    if encoded is not None
+                ]
+        elif isinstance(value, dict):
+            try:
+                json.dumps(value)
+                data[key] = value
+            except (TypeError, ValueError):
+                continue
+    return {"type": type(component).__name__, "data": data}
+
+
+class TrafficRecorder:
+    """
+    消息流量录制器喵～ 🎙️
+    开始录制后，每条交给监听器的消息都会追加一行到 gzip 压缩的 JSONL 文件！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📼 记录 OneBot 原始事件、AstrBot 组件列表和收到的时间
+    - 🕶️ 可选匿名化：QQ号和群号换成稳定的假ID，文本换成等长占位符，媒体地址换成假地址
+    - 🛑 录满上限条数后自动停止
+
+    Note:
+        第一行是文件头（版本、开始时间、是否匿名化），之后每行一个事件喵～ 📋
+    """
+
+    def __init__(self, data_dir: str):
+        """
+        初始化录制器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            data_dir: 插件数据目录，录制文件保存在其中的 captures 目录喵
+        """
+        self.capture_dir = os.path.join(data_dir, "captures")
+        self.path: str | None = None
+        self.anonymize = False
+        self.max_events = 0
+        self.count = 0
+        self.started_at = 0.0
+        self._file = None
+        self._salt = b""
+
+    @property
+    def active(self) -> bool:
+        """是否正在录制喵～ 🔴"""
+        return self._file is not None
+
+    def start(self, anonymize: bool = False, max_events: int = 0) -> str:
+        """
+        开始录制喵～ 🔴
+
+        Args:
+            anonymize: 是否匿名化喵
+            max_events: 最多录制的事件数，0 表示不限制喵
+
+        Returns:
+            录制文件路径喵
+
+        Note:
+            已经在录制时会先停止之前的录制喵～ ⚠️
+        """
+        if self.active:
+            self.stop()
+
+        os.makedirs(self.capture_dir, exist_ok=True)
+        self.started_at = time.time()
+        filename = time.strftime("trace_%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        self.path = os.path.join(self.capture_dir, f"{filename}.jsonl.gz")
+        self.anonymize = anonymize
+        self.max_events = max(0, int(max_events))
+        self.count = 0
+        # 每次录制用新的盐，同一个文件里的假ID保持一致喵～ 🧂
+        self._salt = os.urandom(16)
+
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._write(
+            {
+                "kind": "header",
+                "version": TRACE_VERSION,
+                "started": self.started_at,
+                "anonymized": anonymize,
+            }
+        )
+        logger.info(f"开始录制消息流量到 {self.path}（匿名化: {anonymize}）喵～ 🎙️")
+        return self.path
+
+    def stop(self) -> tuple[str | None, int]:
+        """
+        停止录制并关闭文件喵～ ⏹️
+
+        Returns:
+            (录制文件路径, 录制的事件数) 喵
+        """
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception as e:
+                logger.error(f"关闭录制文件失败喵: {e} 😿")
+            self._file = None
+            logger.info(f"停止录制，共录制 {self.count} 条消息到 {self.path} 喵～ ⏹️")
+        return self.path, self.count
+
+    def record(self, event) -> None:
+        """
+        录制一条消息事件喵～ 📼
+
+        Args:
+            event: AstrBot 消息事件喵
+
+        Note:
+            录制失败只记录日志，不影响消息处理喵～ 🛡️
+        """
+        if self._file is None:
+            return
+
+        try:
+            message_obj = getattr(event, "message_obj", None)
+            raw = getattr(message_obj, "raw_message", None)
+            record = {
+                "kind": "event",
+                "t": time.time(),
+                "session": getattr(event, "unified_msg_origin", ""),
+                "message_type": event.get_message_type().name,
+                "message_str": getattr(event, "message_str", "") or "",
+                "raw": raw if isinstance(raw, dict) else None,
+                "components": [
+                    encoded
+                    for encoded in (
+                        encode_component(comp) for comp in event.get_messages() or []
+                    )
+                    if encoded is not None
+                ],
+            }
+            if self.anonymize:
+                record = self._anonymize(record)
+            self._write(record)
+            self.count += 1
+        except Exception as e:
+            logger.error(f"录制消息失败喵: {e} 😿")
+            return
+
+        if self.max_events and self.count >= self.max_events:
+            logger.info(f"已录制 {self.count} 条消息，达到上限自动停止喵～ 🛑")
+            self.stop()
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def _fake_id(self, value: Any) -> Any:
+        """同一次录制里，同一个ID总是映射到同一个假ID，并保持原来的类型喵～ 🆔"""
+        text = str(value)
+        if not text or text in ("all", "0"):
+            return value
+        digest = hashlib.sha1(self._salt + text.encode("utf-8")).digest()
+        fake = 10**8 + int.from_bytes(digest[:4], "big") % (9 * 10**8)
+        return fake if isinstance(value, int) else str(fake)
+
+    def _anonymize(self, value: Any, key: str | None = None) -> Any:
+        """递归匿名化录制内容喵～ 🕶️"""
+        if isinstance(value, dict):
+            return {k: self._anonymize(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._anonymize(item, key) for item in value]
+        if key is None or value is None or isinstance(value, bool):
+            return value
+        if key in _ID_KEYS:
+            return self._fake_id(value)
+        if key == "session" and isinstance(value, str) and ":" in value:
+            prefix, _, session_id = value.rpartition(":")
+            return f"{prefix}:{self._fake_id(session_id)}"
+        if isinstance(value, str) and value:
+            if key in _MEDIA_KEYS:
+                digest = hashlib.sha1(self._salt + value.encode("utf-8")).hexdigest()
+                return f"anon://{digest[:16]}"
+            if key in _TEXT_KEYS:
+                return "*" * len(value)
+        return value
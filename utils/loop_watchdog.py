@@ -0,0 +1,267 @@
+"""
+事件循环看门狗模块喵～ 🐕
+定期测量 asyncio 事件循环的延迟，事件循环被同步调用卡住时抓取调用栈，
+并归到插件的处理阶段，用来确认 TurnRig 没有拖慢其他 AstrBot 插件！
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+
+from astrbot.api import logger
+
+from .metrics import Histogram, metrics
+
+# 插件模块到处理阶段的对应关系喵～ 🗺️
+_STAGES = {
+    "message_listener": "listener",
+    "message_serializer": "serialize",
+    "message_utils": "serialize",
+    "session_cache": "cache",
+    "cache_records": "cache",
+    "cache_manager": "cache",
+    "activity_tracker": "cache",
+    "message_builder": "build",
+    "nickname_cache": "build",
+    "forward_manager": "forward",
+    "retry_manager": "retry",
+    "retry_scheduler": "retry",
+    "message_sender": "send",
+    "send_queue": "send",
+    "download_helper": "download",
+    "traffic_recorder": "capture",
+    "config_manager": "config",
+    "command_handlers": "command",
+    "main": "plugin",
+}
+
+# 栈归属时跳过的模块（看门狗自己和指标）喵～ 🙈
+_SKIP_MODULES = frozenset({"loop_watchdog", "metrics"})
+
+
+@dataclass
+class BlockingEvent:
+    """
+    一次事件循环阻塞的记录喵～ 📋
+    """
+
+    timestamp: float
+    lag: float
+    stage: str
+    location: str
+    stack: list[str] = field(default_factory=list)
+
+
+def attribute_stack(stack: traceback.StackSummary, root: str) -> tuple[str, str]:
+    """
+    把调用栈归到插件的处理阶段喵～ 🔍
+
+    Args:
+        stack: 事件循环线程被卡住时的调用栈喵
+        root: 插件根目录喵
+
+    Returns:
+        (阶段, 位置)，最内层的插件帧决定阶段，没有插件帧时阶段为 external 喵
+
+    Note:
+        external 说明卡住事件循环的是 AstrBot 或其他插件，不是 TurnRig 喵～ 🙅
+    """
+    root = os.path.abspath(root) + os.sep
+    for frame in reversed(stack):
+        filename = os.path.abspath(frame.filename)
+        if not filename.startswith(root):
+            continue
+        module = os.path.splitext(os.path.basename(filename))[0]
+        if module in _SKIP_MODULES:
+            continue
+        location = f"{os.path.relpath(filename, root)}:{frame.lineno} {frame.name}"
+        return _STAGES.get(module, module), location
+
+    if stack:
+        innermost = stack[-1]
+        return "external", f"{innermost.filename}:{innermost.lineno} {innermost.name}"
+    return "external", ""
+
+
+class LoopWatchdog:
+    """
+    事件循环看门狗喵～ 🐕
+    探测协程按固定间隔睡眠并测量实际醒来的延迟，后台线程发现心跳停住时抓取事件循环线程的调用栈！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - ⏱️ 把每次探测的延迟记进直方图，在 /turnrig status 里显示分位数
+    - 📸 延迟超过阈值时记录卡住事件循环的调用栈
+    - 🗺️ 把调用栈归到监听、序列化、缓存、发送、下载等处理阶段
+
+    Note:
+        后台线程只抓取调用栈，计数和日志都在探测协程醒来后在事件循环里完成，指标不需要加锁喵！ ✨
+    """
+
+    def __init__(
+        self,
+        root: str,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        max_events: int = 50,
+    ):
+        """
+        初始化看门狗喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            root: 插件根目录，用来判断调用栈里哪些帧属于插件喵
+            interval: 探测间隔（秒）喵
+            threshold: 判定为阻塞的延迟阈值（秒）喵
+            max_events: 保留的最近阻塞记录条数喵
+        """
+        self.root = root
+        self.interval = max(0.01, interval)
+        self.threshold = max(0.01, threshold)
+        self.lag = Histogram()
+        self.events: deque[BlockingEvent] = deque(maxlen=max(1, max_events))
+        self.blocked_total = 0
+
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop_thread_id = 0
+        self._heartbeat = 0.0
+        # 后台线程抓到的栈：(对应的心跳, 调用栈) 喵～ 📸
+        self._pending: tuple[float, traceback.StackSummary] | None = None
+
+    @classmethod
+    def from_config(cls, config: dict, root: str) -> "LoopWatchdog":
+        """
+        按插件配置创建看门狗喵～ ⚙️
+
+        Args:
+            config: 插件配置，读取 loop_lag_interval_ms 和 loop_lag_threshold_ms 喵
+            root: 插件根目录喵
+
+        Returns:
+            看门狗实例喵
+        """
+        return cls(
+            root,
+            interval=config.get("loop_lag_interval_ms", 100) / 1000,
+            threshold=config.get("loop_lag_threshold_ms", 100) / 1000,
+        )
+
+    @property
+    def running(self) -> bool:
+        """看门狗是否在运行喵～ 🐕"""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """
+        启动探测协程和后台线程喵～ 🚀
+
+        Note:
+            必须在事件循环线程里调用喵～ ⚠️
+        """
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._thread = threading.Thread(
+            target=self._watch, name="turnrig-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"事件循环看门狗已启动，阈值 {self.threshold * 1000:.0f}ms 喵～ 🐕")
+
+    def stop(self) -> None:
+        """停止探测协程和后台线程喵～ 🛑"""
+        self._stop.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _probe(self) -> None:
+        """按固定间隔睡眠，醒来时测量延迟喵～ ⏱️"""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            heartbeat = self._heartbeat
+            self._heartbeat = now
+
+            self.lag.record(lag)
+            metrics.observe("loop_lag_seconds", lag)
+            if lag >= self.threshold:
+                pending = self._pending
+                self._pending = None
+                stack = pending[1] if pending and pending[0] == heartbeat else None
+                self._record_blocking(lag, stack)
+
+    def _watch(self) -> None:
+        """后台线程：心跳停住超过阈值时抓取事件循环线程的调用栈喵～ 📸"""
+        poll = max(0.005, self.threshold / 4)
+        captured_for = None
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            if heartbeat == captured_for:
+                continue
+            if time.monotonic() - heartbeat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._pending = (heartbeat, traceback.extract_stack(frame))
+            captured_for = heartbeat
+
+    def _record_blocking(
+        self, lag: float, stack: traceback.StackSummary | None
+    ) -> None:
+        """在事件循环里记录一次阻塞喵～ 📝"""
+        if stack:
+            stage, location = attribute_stack(stack, self.root)
+            lines = [
+                f"{frame.filename}:{frame.lineno} {frame.name}" for frame in stack[-8:]
+            ]
+        else:
+            # 阻塞太短，后台线程没来得及抓栈喵～ 🤷
+            stage, location, lines = "unknown", "", []
+
+        self.events.append(BlockingEvent(time.time(), lag, stage, location, lines))
+        self.blocked_total += 1
+        metrics.inc("loop_blocked_total", stage=stage)
+        logger.warning(
+            f"事件循环被阻塞了 {lag * 1000:.0f}ms 喵，阶段: {stage} {location} 🐢"
+        )
+        if lines:
+            logger.debug("阻塞时的调用栈喵:\n" + "\n".join(lines))
+
+    def render_text(self) -> str:
+        """
+        把延迟分位数和最近的阻塞整理成文本喵～ 📝
+
+        Returns:
+            状态文本，没有启用时返回空字符串喵
+        """
+        if not self.running and not self.lag.count:
+            return ""
+
+        lag = self.lag
+        result = (
+            "\n事件循环延迟喵～：\n"
+            f"- p50 {lag.percentile(0.5) * 1000:.1f}ms, "
+            f"p95 {lag.percentile(0.95) * 1000:.1f}ms, "
+            f"p99 {lag.percentile(0.99) * 1000:.1f}ms, "
+            f"max {lag.max * 1000:.1f}ms（{lag.count} 次探测）\n"
+            f"- 超过 {self.threshold * 1000:.0f}ms 的阻塞: {self.blocked_total} 次\n"
+        )
+        for event in list(self.events)[-3:]:
+            when = time.strftime("%H:%M:%S", time.localtime(event.timestamp))
+            result += f"  {when} {event.lag * 1000:.0f}ms {event.stage}"
+            result += f" {event.location}\n" if event.location else "\n"
+        return result
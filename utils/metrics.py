@@ -0,0 +1,353 @@
+"""
+进程内指标模块喵～ 📊
+提供计数器、仪表和 HDR 风格的直方图，可以汇总成文本或导出为 Prometheus 文本格式！
+"""
+
+import math
+import os
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# 直方图的子桶精度：每个 2 的幂区间分成 32 个桶，相对误差不超过约 3% 喵～ 🎯
+_SUB_BITS = 6
+_SUB_COUNT = 1 << _SUB_BITS
+_HALF_COUNT = _SUB_COUNT >> 1
+
+# 导出 Prometheus 直方图时使用的秒数边界喵～ 📏
+PROMETHEUS_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _bucket_index(value: int) -> int:
+    """对数线性分桶：小于 64 的值各占一个桶，之后每个 2 的幂区间 32 个桶喵～ 🪣"""
+    if value < _SUB_COUNT:
+        return value
+    shift = value.bit_length() - _SUB_BITS
+    return _SUB_COUNT + (shift - 1) * _HALF_COUNT + (value >> shift) - _HALF_COUNT
+
+
+def _bucket_bounds(index: int) -> tuple[int, int]:
+    """桶覆盖的整数区间 [下界, 上界) 喵～ 📐"""
+    if index < _SUB_COUNT:
+        return index, index + 1
+    offset = index - _SUB_COUNT
+    shift = offset // _HALF_COUNT + 1
+    low = (offset % _HALF_COUNT + _HALF_COUNT) << shift
+    return low, low + (1 << shift)
+
+
+class Histogram:
+    """
+    HDR 风格的延迟直方图喵～ 📈
+    以微秒为单位稀疏地记录到对数线性桶里，内存和记录开销都与样本数无关！ ฅ(^•ω•^ฅ
+
+    Note:
+        分位数返回所在桶的中点（限制在记录到的最小值和最大值之间），相对误差约 3% 喵～ 🎯
+    """
+
+    __slots__ = ("_buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self._buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        记录一次耗时喵～ ⏱️
+
+        Args:
+            seconds: 耗时（秒）喵
+        """
+        seconds = max(0.0, seconds)
+        index = _bucket_index(int(seconds * 1_000_000))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """
+        获取分位数喵～ 📊
+
+        Args:
+            q: 0 到 1 之间的分位，例如 0.95 喵
+
+        Returns:
+            分位数（秒），没有样本时返回0喵
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                low, high = _bucket_bounds(index)
+                middle = (low + high - 1) / 2 / 1_000_000
+                return min(max(middle, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def cumulative(self, bounds: tuple[float, ...]) -> list[int]:
+        """
+        按给定的秒数边界统计累计样本数（Prometheus 的 le 桶）喵～ 📏
+
+        Args:
+            bounds: 升序的秒数边界喵
+
+        Returns:
+            每个边界以内的累计样本数喵
+        """
+        counts = [0] * len(bounds)
+        for index, count in self._buckets.items():
+            # 桶的上界落在哪个边界之内，就计入哪个边界喵～ 🪣
+            upper = (_bucket_bounds(index)[1] - 1) / 1_000_000
+            for i, bound in enumerate(bounds):
+                if upper <= bound:
+                    counts[i] += count
+                    break
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        return counts
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表喵～ 📊
+    计数器、仪表和直方图都按名字和标签懒创建，记录时只是一次字典查找！
+
+    这个小助手会帮你：
+    - 🔢 累加事件数、字节数等计数器
+    - 🌡️ 读取队列深度等仪表（取值时才调用回调）
+    - 📈 记录各阶段耗时的直方图
+    - 📝 汇总成 /turnrig metrics 的文本，或写出 Prometheus 文本格式
+
+    Note:
+        只在事件循环线程里使用，不需要加锁喵！ ✨
+    """
+
+    def __init__(self, prefix: str = "turnrig"):
+        """
+        初始化注册表喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            prefix: 导出时的指标名前缀喵
+        """
+        self.prefix = prefix
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+        self._histograms: dict[str, dict[LabelKey, Histogram]] = {}
+        self._gauges: dict[str, Callable[[], float]] = {}
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(labels: dict[str, object]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        累加计数器喵～ 🔢
+
+        Args:
+            name: 指标名喵
+            value: 增加的值喵
+            **labels: 标签喵
+        """
+        series = self._counters.setdefault(name, {})
+        key = self._key(labels) if labels else ()
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """
+        记录一次耗时到直方图喵～ ⏱️
+
+        Args:
+            name: 指标名喵
+            seconds: 耗时（秒）喵
+            **labels: 标签喵
+        """
+        series = self._histograms.setdefault(name, {})
+        key = self._key(labels) if labels else ()
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """
+        计时上下文，退出时把耗时记录到直方图喵～ ⏱️
+
+        Args:
+            name: 指标名喵
+            **labels: 标签喵
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def gauge(self, name: str, callback: Callable[[], float]) -> None:
+        """
+        注册仪表，取值时调用回调喵～ 🌡️
+
+        Args:
+            name: 指标名喵
+            callback: 返回当前值的函数喵
+        """
+        self._gauges[name] = callback
+
+    def counter_value(self, name: str, **labels) -> float:
+        """获取计数器的当前值，不带标签时返回所有标签的总和喵～ 🔢"""
+        series = self._counters.get(name, {})
+        if labels:
+            return series.get(self._key(labels), 0)
+        return sum(series.values())
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        """获取直方图，不存在时返回None喵～ 📈"""
+        return self._histograms.get(name, {}).get(self._key(labels))
+
+    def reset(self) -> None:
+        """清空计数器和直方图，保留已注册的仪表喵～ 🧹"""
+        self._counters.clear()
+        self._histograms.clear()
+        self.started_at = time.time()
+
+    def _gauge_values(self) -> dict[str, float]:
+        values = {}
+        for name, callback in self._gauges.items():
+            try:
+                values[name] = float(callback())
+            except Exception:
+                continue
+        return values
+
+    @staticmethod
+    def _format_labels(key: LabelKey) -> str:
+        return ",".join(f"{k}={v}" for k, v in key)
+
+    def render_text(self) -> str:
+        """
+        汇总成适合聊天窗口的文本喵～ 📝
+
+        Returns:
+            指标摘要文本喵
+        """
+        uptime = int(time.time() - self.started_at)
+        lines = [f"📊 TurnRig 指标（统计 {uptime} 秒）"]
+
+        if self._counters:
+            lines.append("\n【计数】")
+            for name in sorted(self._counters):
+                for key, value in sorted(self._counters[name].items()):
+                    label = f"{{{self._format_labels(key)}}}" if key else ""
+                    lines.append(f"· {name}{label}: {value:g}")
+
+        gauges = self._gauge_values()
+        if gauges:
+            lines.append("\n【当前值】")
+            for name, value in sorted(gauges.items()):
+                lines.append(f"· {name}: {value:g}")
+
+        if self._histograms:
+            lines.append("\n【耗时 ms】 次数 / p50 / p95 / p99 / max")
+            for name in sorted(self._histograms):
+                for key, h in sorted(self._histograms[name].items()):
+                    label = f"{{{self._format_labels(key)}}}" if key else ""
+                    lines.append(
+                        f"· {name}{label}: {h.count} / {h.percentile(0.5) * 1000:.1f}"
+                        f" / {h.percentile(0.95) * 1000:.1f}"
+                        f" / {h.percentile(0.99) * 1000:.1f} / {h.max * 1000:.1f}"
+                    )
+
+        if len(lines) == 1:
+            lines.append("还没有记录到任何指标喵～ 📭")
+        return "\n".join(lines)
+
+    def render_prometheus(self) -> str:
+        """
+        导出为 Prometheus 文本格式喵～ 📤
+
+        Returns:
+            Prometheus exposition 格式的文本喵
+        """
+
+        def labels(key: LabelKey, extra: str = "") -> str:
+            parts = [f'{k}="{v}"' for k, v in key]
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        for name in sorted(self._counters):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for key, value in sorted(self._counters[name].items()):
+                lines.append(f"{metric}{labels(key)} {value:g}")
+
+        for name, value in sorted(self._gauge_values().items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value:g}")
+
+        for name in sorted(self._histograms):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for key, h in sorted(self._histograms[name].items()):
+                for bound, count in zip(
+                    PROMETHEUS_BUCKETS, h.cumulative(PROMETHEUS_BUCKETS), strict=True
+                ):
+                    le = f'le="{bound:g}"'
+                    lines.append(f"{metric}_bucket{labels(key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{metric}_bucket{labels(key, le)} {h.count}")
+                lines.append(f"{metric}_sum{labels(key)} {h.total:.6f}")
+                lines.append(f"{metric}_count{labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        原子地写出 Prometheus 文本文件，供 node_exporter 的 textfile 采集器读取喵～ 💾
+
+        Args:
+            path: 输出文件路径喵
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+# 插件内共享的指标注册表喵～ 📊
+metrics = MetricsRegistry()
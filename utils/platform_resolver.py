@@ -0,0 +1,226 @@
+"""
+平台解析缓存模块喵～ 🧭
+按平台名缓存平台、客户端、适配器类型和机器人ID，发消息时不用每次都遍历所有已加载的平台！
+"""
+
+import time
+from typing import Any, NamedTuple
+
+from astrbot.api import logger
+
+
+class PlatformInfo(NamedTuple):
+    """
+    解析好的平台信息喵～ 📇
+    """
+
+    platform: Any
+    client: Any
+    adapter_type: str | None
+    self_id: str | None
+
+
+class PlatformResolver:
+    """
+    平台/客户端解析缓存喵～ 🧭
+    把平台名映射到 (client, 适配器类型, self_id)，热路径只需要一次字典查找！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 🔍 首次使用时做一次完整的平台发现
+    - 💾 缓存平台、客户端、适配器类型和机器人ID
+    - 🔄 适配器重连（self_id 变化）或过期后自动重新发现
+    - 🩺 找不到平台时输出已加载平台的诊断信息
+
+    Note:
+        找不到的平台不会被缓存，适配器上线后下一次调用即可解析成功喵！ ✨
+    """
+
+    def __init__(self, context, ttl: float = 300):
+        """
+        初始化平台解析器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            context: AstrBot上下文对象喵
+            ttl: 缓存有效期（秒），过期后重新发现以兜底重连情况喵
+        """
+        self.context = context
+        self.ttl = ttl
+        self._cache: dict[str, tuple[PlatformInfo, float]] = {}
+
+    def resolve(self, platform_name: str) -> PlatformInfo | None:
+        """
+        解析平台信息喵～ 🧭
+
+        Args:
+            platform_name: 平台名称，例如 aiocqhttp 喵
+
+        Returns:
+            平台信息，找不到平台时返回None喵
+        """
+        entry = self._cache.get(platform_name)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        info = self._discover(platform_name)
+        if info is None:
+            self._cache.pop(platform_name, None)
+            return None
+
+        # 还没拿到 self_id（适配器未连接）时只短暂缓存喵～ ⏳
+        ttl = self.ttl if info.self_id else min(self.ttl, 5)
+        self._cache[platform_name] = (info, time.monotonic() + ttl)
+        return info
+
+    def get_client(self, platform_name: str = "aiocqhttp"):
+        """
+        获取平台客户端喵～ 🤖
+
+        Args:
+            platform_name: 平台名称喵
+
+        Returns:
+            客户端对象，找不到时返回None喵
+        """
+        info = self.resolve(platform_name)
+        return info.client if info else None
+
+    def get_self_id(self, platform_name: str = "aiocqhttp") -> str | None:
+        """
+        获取机器人自身ID喵～ 🆔
+
+        Args:
+            platform_name: 平台名称喵
+
+        Returns:
+            机器人ID字符串，未知时返回None喵
+        """
+        info = self.resolve(platform_name)
+        return info.self_id if info else None
+
+    def observe_self_id(self, platform_name: str, self_id) -> None:
+        """
+        根据收到事件里的 self_id 检测适配器重连喵～ 🔄
+
+        Args:
+            platform_name: 平台名称喵
+            self_id: 事件中携带的机器人ID喵
+
+        Note:
+            和缓存的 self_id 不一致说明适配器换号或重连了，缓存会失效喵！ ⚠️
+        """
+        if not self_id:
+            return
+        entry = self._cache.get(platform_name)
+        if entry is not None and entry[0].self_id != str(self_id):
+            logger.info(
+                f"检测到平台 {platform_name} 的机器人ID变化，刷新平台缓存喵～ 🔄"
+            )
+            self.invalidate(platform_name)
+
+    def invalidate(self, platform_name: str | None = None) -> None:
+        """
+        使缓存失效喵～ 🧹
+
+        Args:
+            platform_name: 平台名称，为None时清空全部缓存喵
+        """
+        if platform_name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(platform_name, None)
+
+    def _discover(self, platform_name: str) -> PlatformInfo | None:
+        """
+        通过反射完整地发现平台信息喵～ 🔍
+
+        Args:
+            platform_name: 平台名称喵
+
+        Returns:
+            平台信息，找不到时返回None喵
+        """
+        ctx = self.context
+        platform = None
+        adapter_type = None
+
+        if ctx:
+            try:
+                platform = ctx.get_platform(platform_name)
+            except Exception:
+                platform = None
+
+            if not platform and hasattr(ctx, "get_platform_inst"):
+                try:
+                    platform = ctx.get_platform_inst(platform_name)
+                except Exception:
+                    platform = None
+
+            if platform and hasattr(platform, "meta"):
+                try:
+                    meta_obj = platform.meta()
+
+                    for attr in ("name", "type", "adapter", "platform_type"):
+                        val = getattr(meta_obj, attr, None)
+                        if val:
+                            adapter_type = val
+                            break
+                    if not adapter_type:
+                        adapter_type = getattr(meta_obj, "id", None)
+                except Exception:
+                    adapter_type = None
+
+        if not platform:
+            self._log_missing_platform(platform_name)
+            return None
+
+        client = None
+        self_id = None
+        try:
+            client = platform.get_client()
+            raw_self_id = getattr(client, "self_id", None)
+            self_id = str(raw_self_id) if raw_self_id else None
+        except Exception as e:
+            logger.debug(f"获取平台 {platform_name} 的客户端失败喵: {e}")
+
+        return PlatformInfo(platform, client, adapter_type, self_id)
+
+    def _log_missing_platform(self, platform_name: str) -> None:
+        """
+        找不到平台时输出已加载平台的诊断信息喵～ 🩺
+
+        Args:
+            platform_name: 平台名称喵
+        """
+        diagnostics = []
+        try:
+            pm = getattr(self.context, "platform_manager", None)
+            collected = set()
+            for attr in ("platforms", "_platforms", "instances"):
+                container = getattr(pm, attr, None)
+                if isinstance(container, dict):
+                    for k, v in container.items():
+                        if k in collected:
+                            continue
+                        collected.add(k)
+                        typ = None
+                        try:
+                            if hasattr(v, "meta"):
+                                m = v.meta()
+                                typ = (
+                                    getattr(m, "name", None)
+                                    or getattr(m, "type", None)
+                                    or getattr(m, "adapter", None)
+                                )
+                        except Exception:
+                            typ = None
+                        diagnostics.append(f"{k}=>{typ or '?'}")
+            if diagnostics:
+                logger.warning(
+                    f"未找到平台适配器喵: {platform_name} 😿 | 已加载: {', '.join(diagnostics)}"
+                )
+            else:
+                logger.warning(
+                    f"未找到平台适配器喵: {platform_name} 😿 (无法获取平台管理器诊断)"
+                )
+        except Exception:
+            logger.warning(f"未找到平台适配器喵: {platform_name} 😿 (诊断阶段异常)")
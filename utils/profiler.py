@@ -0,0 +1,217 @@
+"""
+按需性能分析模块喵～ 🔬
+通过 /turnrig profile 在运行中的机器人上采集一段时间的性能数据，
+写成 pstats 或折叠调用栈（collapsed stack）文件保存到插件数据目录！
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from astrbot.api import logger
+
+# 支持的分析模式喵～ 🔬
+PROFILE_MODES = ("cprofile", "sample")
+
+
+class PipelineProfiler:
+    """
+    流水线性能分析器喵～ 🔬
+    同一时间只有一次分析，到了时限会自动停止并写出文件！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - 📊 cprofile 模式：在事件循环线程上启用 cProfile，写出 .pstats 文件
+    - 🎯 sample 模式：后台线程定时采样事件循环线程的调用栈，只保留经过监听、转发、发送入口的样本，
+      写出可以直接交给 flamegraph.pl / speedscope 的 .collapsed 文件
+    - ⏰ 到时自动停止，不会一直拖慢机器人
+
+    Note:
+        cProfile 按线程生效，会记录分析期间事件循环上运行的所有代码（包括其他插件），
+        查看时按 on_all_message、forward_messages 等入口的累计耗时排序即可喵～ 📋
+    """
+
+    def __init__(self, data_dir: str):
+        """
+        初始化分析器喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            data_dir: 插件数据目录，分析文件保存在其中的 profiles 目录喵
+        """
+        self.profile_dir = os.path.join(data_dir, "profiles")
+        self.mode: str | None = None
+        self.path: str | None = None
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.samples = 0
+        self._roots: dict = {}
+        self._profile: cProfile.Profile | None = None
+        self._stacks: Counter = Counter()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def watch(self, stage: str, func) -> None:
+        """
+        登记采样模式下要保留的入口函数喵～ 🎯
+
+        Args:
+            stage: 阶段名，会作为折叠调用栈的根喵
+            func: 入口函数或绑定方法喵
+        """
+        self._roots[getattr(func, "__func__", func).__code__] = stage
+
+    @property
+    def active(self) -> bool:
+        """是否正在分析喵～ 🔴"""
+        return self.mode is not None
+
+    def start(
+        self, mode: str = "cprofile", seconds: float = 60, interval: float = 0.005
+    ) -> str:
+        """
+        开始分析喵～ 🔴
+
+        Args:
+            mode: cprofile 或 sample 喵
+            seconds: 分析时长（秒），到时自动停止喵
+            interval: sample 模式的采样间隔（秒）喵
+
+        Returns:
+            分析文件路径喵
+
+        Note:
+            必须在事件循环线程里调用，已经在分析时会先停止之前的分析喵～ ⚠️
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的分析模式: {mode}")
+        if self.active:
+            self.stop()
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.started_at = time.time()
+        self.duration = seconds
+        self.samples = 0
+        filename = time.strftime("profile_%Y%m%d_%H%M%S", time.localtime())
+        suffix = "pstats" if mode == "cprofile" else "collapsed"
+        self.path = os.path.join(self.profile_dir, f"{filename}.{suffix}")
+        self.mode = mode
+
+        if mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._stacks = Counter()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample,
+                args=(threading.get_ident(), interval),
+                name="turnrig-profiler",
+                daemon=True,
+            )
+            self._thread.start()
+
+        self._timer = asyncio.get_running_loop().call_later(seconds, self._auto_stop)
+        logger.info(f"开始性能分析（{mode}，{seconds} 秒）喵～ 🔬")
+        return self.path
+
+    def stop(self) -> tuple[str | None, str]:
+        """
+        停止分析并写出文件喵～ ⏹️
+
+        Returns:
+            (分析文件路径, 耗时最多的几项摘要) 喵
+        """
+        if not self.active:
+            return self.path, ""
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        summary = ""
+        try:
+            if self.mode == "cprofile":
+                self._profile.disable()
+                self._profile.dump_stats(self.path)
+                summary = self._summarize_profile()
+            else:
+                self._stop.set()
+                self._thread.join(timeout=1)
+                with open(self.path, "w", encoding="utf-8") as f:
+                    for stack, count in self._stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+                summary = self._summarize_samples()
+        except Exception as e:
+            logger.error(f"写出性能分析文件失败喵: {e} 😿")
+        finally:
+            self._profile = None
+            self._thread = None
+            self.mode = None
+
+        logger.info(f"性能分析已停止，文件: {self.path} 喵～ ⏹️")
+        return self.path, summary
+
+    def _auto_stop(self) -> None:
+        self._timer = None
+        logger.info("性能分析到达时限，自动停止喵～ ⏰")
+        self.stop()
+
+    def _sample(self, thread_id: int, interval: float) -> None:
+        """后台线程：定时采样事件循环线程的调用栈喵～ 🎯"""
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(thread_id)
+            frames = []
+            root = None
+            while frame is not None:
+                frames.append(frame)
+                stage = self._roots.get(frame.f_code)
+                if stage is not None:
+                    # 取最外层的入口，嵌套调用（如手动转发）不重复计入喵～ 🪆
+                    root = (stage, len(frames))
+                frame = frame.f_back
+            self.samples += 1
+            if root is None:
+                continue
+            stage, depth = root
+            names = [
+                f"{os.path.basename(f.f_code.co_filename)}:{f.f_code.co_name}"
+                for f in reversed(frames[:depth])
+            ]
+            self._stacks[";".join([stage, *names])] += 1
+
+    def _summarize_profile(self, limit: int = 5) -> str:
+        """按累计耗时列出插件里最耗时的函数喵～ 📊"""
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        rows = []
+        for (filename, line, name), (_, calls, _, cumulative, _) in stats.stats.items():
+            if filename.startswith(root):
+                rows.append((cumulative, calls, filename, line, name))
+        rows.sort(reverse=True)
+        return "\n".join(
+            f"· {os.path.relpath(filename, root)}:{line} {name}: "
+            f"{cumulative * 1000:.0f}ms / {calls} 次"
+            for cumulative, calls, filename, line, name in rows[:limit]
+        )
+
+    def _summarize_samples(self, limit: int = 5) -> str:
+        """按样本数列出各入口和最常出现的栈顶函数喵～ 📊"""
+        stages: Counter = Counter()
+        leaves: Counter = Counter()
+        for stack, count in self._stacks.items():
+            parts = stack.split(";")
+            stages[parts[0]] += count
+            leaves[parts[-1]] += count
+        total = sum(stages.values())
+        lines = [f"· 入口样本: {total}/{self.samples}"]
+        lines += [f"· {stage}: {count}" for stage, count in stages.most_common()]
+        lines += [
+            f"· 栈顶 {leaf}: {count}" for leaf, count in leaves.most_common(limit)
+        ]
+        return "\n".join(lines)
@@ -0,0 +1,237 @@
+"""
+通用的过期缓存模块喵～ 🗃️
+昵称、OneBot 响应、图片路径这些缓存共用的 LRU + TTL 实现，还能合并同一个键的并发加载！
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存喵～ 🗃️
+    同时限制条目数量和（可选的）总字节数，还能合并并发的加载请求！ ฅ(^•ω•^ฅ
+
+    这个小助手会帮你：
+    - ⏰ 条目超过 TTL 自动失效
+    - 📦 超过数量或字节预算时淘汰最久未使用的条目
+    - 🤝 同一个键同时只会发起一次加载，其余请求等待同一个结果
+
+    Note:
+        只在事件循环线程中使用，不需要加锁喵！ ✨
+        过期时间使用墙上时钟，方便持久化后再恢复喵～ 💾
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        max_bytes: int = 0,
+        sizeof: Callable[[Any], int] | None = None,
+    ):
+        """
+        初始化缓存喵！(ฅ^•ω•^ฅ)
+
+        Args:
+            max_entries: 最大条目数喵
+            ttl: 默认有效期（秒）喵
+            max_bytes: 总字节预算，0 表示不限制喵
+            sizeof: 估算单个值字节数的函数，启用字节预算时需要喵
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.max_bytes = max(0, int(max_bytes))
+        self._sizeof = sizeof or (lambda value: 0)
+        # key -> (value, 过期时间, 字节数) 喵～ 📋
+        self._data: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self._total_bytes = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    @property
+    def total_bytes(self) -> int:
+        """当前缓存占用的估算字节数喵～ 📏"""
+        return self._total_bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取缓存喵～ 🔍
+
+        Args:
+            key: 缓存键喵
+            default: 不存在或已过期时返回的默认值喵
+
+        Returns:
+            缓存的值或默认值喵
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[1] <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        写入缓存喵～ 📝
+
+        Args:
+            key: 缓存键喵
+            value: 缓存值喵
+            ttl: 本条目的有效期，为None时使用默认值喵
+        """
+        self.set_until(key, value, time.time() + (self.ttl if ttl is None else ttl))
+
+    def set_until(self, key: Hashable, value: Any, expires_at: float) -> None:
+        """
+        写入缓存并指定绝对过期时间喵～ 📝
+
+        Args:
+            key: 缓存键喵
+            value: 缓存值喵
+            expires_at: 过期的时间戳喵
+        """
+        size = self._sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # 单个值就超过预算，不缓存喵～ 🚫
+            self._remove(key)
+            return
+
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires_at, size)
+        self._total_bytes += size
+        self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        删除并返回缓存条目喵～ 🗑️
+
+        Args:
+            key: 缓存键喵
+            default: 不存在时返回的默认值喵
+
+        Returns:
+            被删除的值或默认值喵
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[0]
+
+    def clear(self) -> None:
+        """清空缓存喵～ 🧹"""
+        self._data.clear()
+        self._total_bytes = 0
+
+    def items(self) -> list[tuple[Hashable, Any, float]]:
+        """
+        获取所有未过期的条目喵～ 📋
+
+        Returns:
+            (键, 值, 过期时间) 列表，按从旧到新的使用顺序喵
+        """
+        now = time.time()
+        return [
+            (key, value, expires_at)
+            for key, (value, expires_at, _) in self._data.items()
+            if expires_at > now
+        ]
+
+    def purge_expired(self) -> int:
+        """
+        清理所有已过期的条目喵～ 🧹
+
+        Returns:
+            清理的条目数量喵
+        """
+        now = time.time()
+        expired = [key for key, entry in self._data.items() if entry[1] <= now]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None = None,
+        cache_none: bool = False,
+        should_cache: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        """
+        读取缓存，未命中时调用加载函数喵～ 🤝
+        同一个键的并发请求会共享同一次加载！
+
+        Args:
+            key: 缓存键喵
+            loader: 无参数的异步加载函数喵
+            ttl: 本条目的有效期，为None时使用默认值喵
+            cache_none: 是否缓存 None 结果喵
+            should_cache: 判断加载结果是否写入缓存的函数，返回False时只返回不缓存喵
+
+        Returns:
+            缓存或新加载的值喵
+
+        Note:
+            加载抛出的异常会传递给所有等待者，且不会被缓存喵！ ⚠️
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告喵～
+            future.exception()
+            raise
+        else:
+            if (value is not None or cache_none) and (
+                should_cache is None or should_cache(value)
+            ):
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def _evict(self) -> None:
+        while len(self._data) > self.max_entries or (
+            self.max_bytes and self._total_bytes > self.max_bytes
+        ):
+            key, entry = self._data.popitem(last=False)
+            self._total_bytes -= entry[2]